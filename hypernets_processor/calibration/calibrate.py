@@ -10,6 +10,7 @@ from hypernets_processor.data_io.data_templates import DataTemplates
 from hypernets_processor.data_io.hypernets_writer import HypernetsWriter
 from hypernets_processor.data_io.dataset_util import DatasetUtil
 from hypernets_processor.plotting.plotting import Plotting
+from hypernets_processor.utils.profiling import profile_method
 
 import punpy
 import numpy as np
@@ -87,6 +88,7 @@ class Calibrate:
 
         return np.mean(dataset["digital_number"].values[:, ids], axis=2)[:, 0]
 
+    @profile_method("dark_matching")
     def preprocess_l0(self, datasetl0, datasetl0_bla, dataset_calib):
         """
         Identifies and removes faulty measurements (e.g. due to cloud cover).
@@ -3,15 +3,18 @@ Data template class
 """
 
 from hypernets_processor.version import __version__
+from hypernets_processor.context import Context
 from hypernets_processor.data_io.data_templates import DataTemplates
 from hypernets_processor.test.test_functions import setup_test_context, teardown_test_context
 from hypernets_processor.data_io.hypernets_writer import HypernetsWriter
+from hypernets_processor.calibration.calibration_registry import CALIBRATION_REGISTRY
 
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import logging
 import numpy as np
 import os
 import glob
-import punpy
-import xarray
 
 '''___Authorship___'''
 __author__ = "Pieter De Vis"
@@ -22,59 +25,41 @@ __email__ = "Pieter.De.Vis@npl.co.uk"
 __status__ = "Development"
 
 version=0.1
+FINGERPRINT_FILE = "calibration_fingerprint.txt"
 
 class CalibrationConverter:
     def __init__(self,context):
         dir_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
         self.path_ascii=os.path.join(dir_path,'calibration_files_ascii','HYPSTAR_cal')
         self.path_netcdf=os.path.join(dir_path,'hypernets_processor/calibration/calibration_files','HYPSTAR_cal')
-        context.set_config_value("product_format","netcdf")
         self.templ = DataTemplates(context)
         self.writer = HypernetsWriter(context)
         self.context=context
+        self._ascii_cache = {}
 
     def read_calib_files(self):
+        """
+        Returns the calibration data valid at the time of the current sequence, from the
+        process-wide calibration registry (files are only read once per process)
+        """
         hypstar = "hypstar_"+str(self.context.get_config_value("hypstar_cal_number"))
         hypstar_path = os.path.join(self.path_netcdf,hypstar)
+        time = self.context.get_config_value("time")
+        if self.context.get_config_value("calibration_cache_size") is not None:
+            CALIBRATION_REGISTRY.max_files = self.context.get_config_value("calibration_cache_size")
+
         name = "HYPERNETS_CAL_"+hypstar.upper()+"_RAD_v"+str(version)+".nc"
-        calibration_data_rad = xarray.open_dataset(os.path.join(hypstar_path,name))
+        calibration_data_rad = CALIBRATION_REGISTRY.get_calibration(os.path.join(hypstar_path,name),time)
         name = "HYPERNETS_CAL_"+hypstar.upper()+"_IRR_v"+str(version)+".nc"
-        calibration_data_irr = xarray.open_dataset(os.path.join(hypstar_path,name))
-
-        calibration_data_times=calibration_data_rad["calibrationdates"].values
-        nonlin_times=calibration_data_rad["nonlineardates"].values
-        wav_times=calibration_data_rad["wavdates"].values
-        calibration_data_rad=calibration_data_rad.sel(calibrationdates=
-                                                       calibration_data_times[-1])
-        calibration_data_rad = calibration_data_rad.sel(nonlineardates=
-                                                         nonlin_times[-1])
-        calibration_data_rad = calibration_data_rad.sel(wavdates=
-                                                         wav_times[-1])
-        calibration_data_irr=calibration_data_irr.sel(calibrationdates=
-                                                       calibration_data_times[-1])
-        calibration_data_irr=calibration_data_irr.sel(nonlineardates=
-                                                       nonlin_times[-1])
-        calibration_data_irr = calibration_data_irr.sel(wavdates=
-                                                         wav_times[-1])
+        calibration_data_irr = CALIBRATION_REGISTRY.get_calibration(os.path.join(hypstar_path,name),time)
+
         if self.context.get_config_value("network") == "l":
             name = "HYPERNETS_CAL_"+hypstar.upper()+"_RAD_SWIR_v"+str(version)+".nc"
-            calibration_data_rad_swir = xarray.open_dataset(os.path.join(hypstar_path,name))
+            calibration_data_rad_swir = CALIBRATION_REGISTRY.get_calibration(
+                os.path.join(hypstar_path,name),time)
             name = "HYPERNETS_CAL_"+hypstar.upper()+"_IRR_SWIR_v"+str(version)+".nc"
-            calibration_data_irr_swir = xarray.open_dataset(os.path.join(hypstar_path,name))
-            calibration_data_times = calibration_data_rad_swir["calibrationdates"].values
-            nonlin_times = calibration_data_rad_swir["nonlineardates"].values
-            calibration_data_rad_swir = calibration_data_rad_swir.sel(
-                calibrationdates=calibration_data_times[-1])
-            calibration_data_rad_swir = calibration_data_rad_swir.sel(
-                nonlineardates=nonlin_times[-1])
-            calibration_data_rad_swir = calibration_data_rad_swir.sel(
-                wavdates=wav_times[-1])
-            calibration_data_irr_swir = calibration_data_irr_swir.sel(
-                calibrationdates=calibration_data_times[-1])
-            calibration_data_irr_swir = calibration_data_irr_swir.sel(
-                nonlineardates=nonlin_times[-1])
-            calibration_data_irr_swir = calibration_data_irr_swir.sel(
-                wavdates=wav_times[-1])
+            calibration_data_irr_swir = CALIBRATION_REGISTRY.get_calibration(
+                os.path.join(hypstar_path,name),time)
 
             return (calibration_data_rad,
                     calibration_data_irr,
@@ -84,36 +69,123 @@ class CalibrationConverter:
         else:
             return calibration_data_rad, calibration_data_irr
 
-    def convert_all_calibration_data(self):
+    def convert_all_calibration_data(self,incremental=False,parallel_cores=1):
+        """
+        Converts the ASCII calibration files of all hypstars to NetCDF
+
+        :type incremental: bool
+        :param incremental: only convert hypstars whose ASCII files changed since their last conversion
+        :type parallel_cores: int
+        :param parallel_cores: number of processes to convert hypstars in parallel
+        """
+        hypstars = sorted([os.path.basename(path) for path in glob.glob(
+            os.path.join(self.path_ascii,"hypstar_*"))])
+        if incremental:
+            hypstars = [hypstar for hypstar in hypstars if not self.is_up_to_date(hypstar)]
+
+        if (parallel_cores > 1) and (len(hypstars) > 1):
+            args = [(dict(self.context.config_values),self.path_ascii,self.path_netcdf,hypstar)
+                    for hypstar in hypstars]
+            with ProcessPoolExecutor(max_workers=min(parallel_cores,len(hypstars))) as executor:
+                for hypstar in executor.map(_convert_hypstar,*zip(*args)):
+                    self.context.logger.info("Converted calibration files: "+hypstar)
+        else:
+            for hypstar in hypstars:
+                self.convert_hypstar(hypstar)
+
+    def convert_hypstar(self,hypstar):
+        """
+        Converts the ASCII calibration files of one hypstar to NetCDF, and stores the
+        fingerprint of the ASCII files it was converted from
+
+        :type hypstar: str
+        :param hypstar: hypstar directory name, e.g. hypstar_220241
+        """
         measurandstrings=["radiance","irradiance"]
-        hypstars = [os.path.basename(path) for path in glob.glob(
-            os.path.join(self.path_ascii,"hypstar_*"))]
-        for hypstar in hypstars:
-            print("processing "+hypstar)
-            hypstar_path=os.path.join(self.path_netcdf,hypstar)
-            if not os.path.exists(hypstar_path):
-                os.makedirs(hypstar_path)
-
-            for measurandstring in measurandstrings:
-                if measurandstring=="radiance":
-                    tag="_RAD_"
-                else:
-                    tag="_IRR_"
+        self.context.logger.info("Converting calibration files: "+hypstar)
+        hypstar_path=os.path.join(self.path_netcdf,hypstar)
+        if not os.path.exists(hypstar_path):
+            os.makedirs(hypstar_path)
 
+        for measurandstring in measurandstrings:
+            if measurandstring=="radiance":
+                tag="_RAD_"
+            else:
+                tag="_IRR_"
+
+            calib_data = self.prepare_calibration_data(measurandstring,
+                                                       hypstar=hypstar[8::])
+            calib_data.attrs["product_name"] = "HYPERNETS_CAL_"+hypstar.upper()\
+                                               +tag+"v"+str(version)
+            self.writer.write(calib_data,directory=hypstar_path,overwrite=True,fmt="netcdf")
+            if hypstar[8]=="2":
+                tag=tag+"SWIR_"
                 calib_data = self.prepare_calibration_data(measurandstring,
-                                                           hypstar=hypstar[8::])
-                calib_data.attrs["product_name"] = "HYPERNETS_CAL_"+hypstar.upper()\
-                                                   +tag+"v"+str(version)
-                self.writer.write(calib_data,directory=hypstar_path,overwrite=True)
-                if hypstar[8]=="2":
-                    tag=tag+"SWIR_"
-                    calib_data = self.prepare_calibration_data(measurandstring,
-                                                               hypstar=hypstar[8::],
-                                                               swir=True)
-                    calib_data.attrs["product_name"] = "HYPERNETS_CAL_"+\
-                                                hypstar.upper()+tag+"v"+str(version)
-                    self.writer.write(calib_data,directory=hypstar_path,overwrite=True)
+                                                           hypstar=hypstar[8::],
+                                                           swir=True)
+                calib_data.attrs["product_name"] = "HYPERNETS_CAL_"+\
+                                            hypstar.upper()+tag+"v"+str(version)
+                self.writer.write(calib_data,directory=hypstar_path,overwrite=True,fmt="netcdf")
+
+        # only mark as converted once all files are written
+        self.writer.flush()
+        with open(os.path.join(hypstar_path,FINGERPRINT_FILE),"w") as f:
+            f.write(self.input_fingerprint(hypstar))
+        self._ascii_cache = {}
 
+    def output_names(self,hypstar):
+        """
+        Returns the names of the NetCDF calibration files converted for a hypstar
+        """
+        tags = ["_RAD_","_IRR_"]
+        if hypstar[8]=="2":
+            tags += ["_RAD_SWIR_","_IRR_SWIR_"]
+        return ["HYPERNETS_CAL_"+hypstar.upper()+tag+"v"+str(version)+".nc" for tag in tags]
+
+    def input_fingerprint(self,hypstar):
+        """
+        Returns a fingerprint of the ASCII calibration files of a hypstar (and of the
+        converter version)
+        """
+        fingerprint = hashlib.sha1(str(version).encode())
+        hypstar_dir = os.path.join(self.path_ascii,hypstar)
+        for path in sorted(glob.glob(os.path.join(hypstar_dir,"**","*.dat"),recursive=True)):
+            fingerprint.update(os.path.relpath(path,hypstar_dir).encode())
+            with open(path,"rb") as f:
+                fingerprint.update(f.read())
+        return fingerprint.hexdigest()
+
+    def is_up_to_date(self,hypstar):
+        """
+        Returns True if the NetCDF calibration files of a hypstar exist and were
+        converted from its current ASCII calibration files
+        """
+        hypstar_path = os.path.join(self.path_netcdf,hypstar)
+        fingerprint_path = os.path.join(hypstar_path,FINGERPRINT_FILE)
+        if not os.path.exists(fingerprint_path):
+            return False
+        for name in self.output_names(hypstar):
+            if not os.path.exists(os.path.join(hypstar_path,name)):
+                return False
+        with open(fingerprint_path) as f:
+            return f.read().strip() == self.input_fingerprint(hypstar)
+
+    def read_ascii(self,path):
+        """
+        Reads a numeric ASCII calibration file (comment lines starting with #), once per conversion
+        """
+        if path not in self._ascii_cache:
+            self._ascii_cache[path] = np.loadtxt(path,comments="#",ndmin=2)
+        return self._ascii_cache[path]
+
+    def find_ascii(self,hypstar,kind,date,pattern):
+        """
+        Returns the path of the ASCII calibration file of a hypstar for a calibration
+        date, or None if there is none
+        """
+        paths = glob.glob(os.path.join(self.path_ascii,"hypstar_"+str(hypstar),kind,date,
+                                       "hypstar_"+str(hypstar)+pattern))
+        return paths[0] if len(paths) > 0 else None
 
     def prepare_calibration_data(self,measurandstring,hypstar,swir=False):
         if swir:
@@ -121,147 +193,123 @@ class CalibrationConverter:
         else:
             sensortag = "vnir"
 
-        directory = self.path_ascii
-        caldatepaths = [os.path.basename(path) for path in glob.glob(
-            os.path.join(directory,"hypstar_"+str(hypstar)+"/radiometric/*"))]
-        nonlindates=[]
-        caldates=[]
-
-        for caldatepath in caldatepaths:
-            caldate=caldatepath
-            nonlinpath=glob.glob(os.path.join(directory,
-                                   "hypstar_"+str(hypstar)+"\\radiometric\\"+str(
-                                       caldatepath)+"\\hypstar_"+str(
-                                       hypstar)+"_nonlin_corr_coefs_*.dat"))[0]
-            if os.path.exists(nonlinpath):
-                nonlindates=np.append(nonlindates,caldate)
-                non_linear_cals = np.genfromtxt(nonlinpath)[:,0]
-
-            if measurandstring == "radiance":
-                calpath=glob.glob(os.path.join(directory,"hypstar_"+str(
-                    hypstar)+"\\radiometric\\"+str(caldatepath)+"\\hypstar_"+str(
-                    hypstar)+"_radcal_L_*_%s.dat"%(sensortag)))[0]
-
-            else:
-                calpath=glob.glob(os.path.join(directory,"hypstar_"+str(
-                    hypstar)+"\\radiometric\\"+str(caldatepath)+"\\hypstar_"+str(
-                    hypstar)+"_radcal_E_*_%s.dat"%(sensortag)))[0]
+        if measurandstring == "radiance":
+            calpattern = "_radcal_L_*_%s.dat"%(sensortag)
+        else:
+            calpattern = "_radcal_E_*_%s.dat"%(sensortag)
 
-            if os.path.exists(calpath):
-                caldates=np.append(caldates,caldate)
-                gains = np.genfromtxt(calpath)
-                wavs = gains[:,1]
+        directory = self.path_ascii
+        caldatepaths = sorted([os.path.basename(path) for path in glob.glob(
+            os.path.join(directory,"hypstar_"+str(hypstar),"radiometric","*"))])
+        wavcaldatepaths = sorted([os.path.basename(path) for path in glob.glob(
+            os.path.join(directory,"hypstar_"+str(hypstar),"wavelength","*"))])
 
-        wavcaldatepaths = [os.path.basename(path) for path in glob.glob(
-            os.path.join(directory,"hypstar_"+str(hypstar)+"/wavelength/*"))]
-        wavcaldates = []
+        nonlinpaths = [self.find_ascii(hypstar,"radiometric",caldate,"_nonlin_corr_coefs_*.dat")
+                       for caldate in caldatepaths]
+        calpaths = [self.find_ascii(hypstar,"radiometric",caldate,calpattern)
+                    for caldate in caldatepaths]
+        wavcalpaths = [self.find_ascii(hypstar,"wavelength",caldate,"_wl_coefs_*.dat")
+                       for caldate in wavcaldatepaths]
 
-        for wavcaldatepath in wavcaldatepaths:
-            wavcaldate = wavcaldatepath
-            wavcalpath = glob.glob(os.path.join(directory,"hypstar_"+str(
-                hypstar)+"\\wavelength\\"+str(wavcaldatepath)+"\\hypstar_"+str(
-                hypstar)+"_wl_coefs_*.dat"))[0]
-            if os.path.exists(wavcalpath):
-                wavcaldates = np.append(wavcaldates,wavcaldate)
-                wav_cals = np.genfromtxt(wavcalpath)[:,0]
+        nonlindates = [caldate for caldate,path in zip(caldatepaths,nonlinpaths) if path is not None]
+        caldates = [caldate for caldate,path in zip(caldatepaths,calpaths) if path is not None]
+        wavcaldates = [caldate for caldate,path in zip(wavcaldatepaths,wavcalpaths) if path is not None]
+        nonlinpaths = [path for path in nonlinpaths if path is not None]
+        calpaths = [path for path in calpaths if path is not None]
+        wavcalpaths = [path for path in wavcalpaths if path is not None]
 
+        wavs = self.read_ascii(calpaths[-1])[:,1]
+        non_linear_cals = self.read_ascii(nonlinpaths[-1])[:,0]
+        wav_cals = self.read_ascii(wavcalpaths[-1])[:,0]
 
         calibration_data = self.templ.calibration_dataset(wavs,non_linear_cals,wav_cals,
                                                     caldates,nonlindates,wavcaldates)
-        i_nonlin=0
-        for caldatepath in caldatepaths:
-            nonlinpath = glob.glob(os.path.join(directory,"hypstar_"+str(
-                hypstar)+"\\radiometric\\"+str(caldatepath)+"\\hypstar_"+str(
-                hypstar)+"_nonlin_corr_coefs_*.dat"))[0]
-            if os.path.exists(nonlinpath):
-                non_linear_cals = np.genfromtxt(nonlinpath)[:,0]
-                calibration_data["non_linearity_coefficients"].values[i_nonlin] =  non_linear_cals
-                i_nonlin+=1
-
-        i_wavcoef=0
-        for wavcaldatepath in wavcaldatepaths:
-            wavcaldate = wavcaldatepath
-            wavcalpath = glob.glob(os.path.join(directory,"hypstar_"+str(
-                hypstar)+"\\wavelength\\"+str(wavcaldatepath)+"\\hypstar_"+str(
-                hypstar)+"_wl_coefs_*.dat"))[0]
-            if os.path.exists(wavcalpath):
-                wav_cals = np.genfromtxt(wavcalpath)
-                if measurandstring == "radiance" and not swir:
-                    wav_cals = wav_cals[:,0]
-                if measurandstring == "irradiance" and not swir:
-                    wav_cals = wav_cals[:,1]
-                if measurandstring == "radiance" and swir:
-                    wav_cals=wav_cals[:,2]
-                if measurandstring == "irradiance" and swir:
-                    wav_cals=wav_cals[:,3]
-                calibration_data["wavelength_coefficients"].values[
-                    i_wavcoef] = wav_cals
-                i_wavcoef += 1
-
-        i_cal=0
-        for caldatepath in caldatepaths:
-            if measurandstring == "radiance":
-                calpath = glob.glob(os.path.join(directory,"hypstar_"+str(
-                    hypstar)+"\\radiometric\\"+str(caldatepath)+"\\hypstar_"+str(
-                    hypstar)+"_radcal_L_*_%s.dat"%(sensortag)))[0]
-            else:
-                calpath = glob.glob(os.path.join(directory,"hypstar_"+str(
-                    hypstar)+"\\radiometric\\"+str(caldatepath)+"\\hypstar_"+str(
-                    hypstar)+"_radcal_E_*_%s.dat"%(sensortag)))[0]
-
-            if os.path.exists(calpath):
-                caldates = np.append(caldates,caldate)
-                gains = np.genfromtxt(calpath)
-
-                calibration_data["wavelengths"].values[i_cal] = gains[:,1]
-                calibration_data["wavpix"].values[i_cal] = gains[:,0]
-                calibration_data["gains"].values[i_cal] = gains[:,2]
-                #calibration_data["u_random_gains"].values = None
-                #calibration_data["corr_random_gains"].values = None
-    
-                calibration_data["u_systematic_indep_gains"].values[i_cal] = gains[:,2]*(
-                            gains[:,6]**2+gains[:,7]**2+gains[:,8]**2+gains[:,9]**2+
-                            gains[:,10]**2+gains[:,11]**2+gains[:,12]**2+gains[:,13]**2+
-                            gains[:,14]**2+gains[:,15]**2+gains[:,16]**2+gains[:,17]**2+
-                            gains[:,19]**2)**0.5/100
-
-                cov_diag = punpy.convert_corr_to_cov(np.eye(len(gains[:,2])),
-                                                     gains[:,2]*(gains[:,19])/100)
-    
-                cov_other = punpy.convert_corr_to_cov(np.eye(len(gains[:,2])),
-                            gains[:,2]*(gains[:,8]**2+gains[:,9]**2+gains[:,11]**2+
-                                        gains[:,16]**2+gains[:,17]**2)**0.5/100)
-    
-                cov_full = punpy.convert_corr_to_cov(
-                            np.ones((len(gains[:,2]),len(gains[:,2]))),
-                            gains[:,2]*(gains[:,7]**2+gains[:,10]**2+gains[:,12]**2+
-                                        gains[:,13]**2+gains[:,14]**2+gains[:,15]**2)**0.5/100)
-    
-                cov_filament = punpy.convert_corr_to_cov(
-                            np.ones((len(gains[:,2]),len(gains[:,2]))),
-                            gains[:,2]*(gains[:,6]**2)**0.5/100)
-    
-                calibration_data["corr_systematic_indep_gains"].values[i_cal] = \
-                    punpy.correlation_from_covariance(cov_diag+cov_other+cov_full+cov_filament)
-    
-                calibration_data["u_systematic_corr_rad_irr_gains"].values[i_cal] = gains[:,2]*(
-                            gains[:,4]**2+gains[:,5]**2+gains[:,18]**2)**0.5/100
-    
-                cov_other = punpy.convert_corr_to_cov(np.eye(len(gains[:,2])),gains[:,2]*(
-                            gains[:,4]**2+gains[:,18]**2)**0.5/100)
-    
-                cov_filament = punpy.convert_corr_to_cov(
-                            np.ones((len(gains[:,2]),len(gains[:,2]))),
-                            gains[:,2]*(gains[:,5]**2)**0.5/100)
-    
-                calibration_data["corr_systematic_corr_rad_irr_gains"].values[i_cal] = \
-                    punpy.correlation_from_covariance(cov_other+cov_filament)
-                i_cal+=1
+
+        for i_nonlin,nonlinpath in enumerate(nonlinpaths):
+            calibration_data["non_linearity_coefficients"].values[i_nonlin] = \
+                self.read_ascii(nonlinpath)[:,0]
+
+        if measurandstring == "radiance":
+            wavcol = 2 if swir else 0
+        else:
+            wavcol = 3 if swir else 1
+        for i_wavcoef,wavcalpath in enumerate(wavcalpaths):
+            calibration_data["wavelength_coefficients"].values[i_wavcoef] = \
+                self.read_ascii(wavcalpath)[:,wavcol]
+
+        for i_cal,calpath in enumerate(calpaths):
+            gains = self.read_ascii(calpath)
+
+            calibration_data["wavelengths"].values[i_cal] = gains[:,1]
+            calibration_data["wavpix"].values[i_cal] = gains[:,0]
+            calibration_data["gains"].values[i_cal] = gains[:,2]
+            #calibration_data["u_random_gains"].values = None
+            #calibration_data["corr_random_gains"].values = None
+
+            calibration_data["u_systematic_indep_gains"].values[i_cal] = gains[:,2]*(
+                        gains[:,6]**2+gains[:,7]**2+gains[:,8]**2+gains[:,9]**2+
+                        gains[:,10]**2+gains[:,11]**2+gains[:,12]**2+gains[:,13]**2+
+                        gains[:,14]**2+gains[:,15]**2+gains[:,16]**2+gains[:,17]**2+
+                        gains[:,19]**2)**0.5/100
+
+            # uncorrelated (diagonal) and fully correlated covariance components
+            u_diag = gains[:,2]*(gains[:,19])/100
+            u_other = gains[:,2]*(gains[:,8]**2+gains[:,9]**2+gains[:,11]**2+
+                                  gains[:,16]**2+gains[:,17]**2)**0.5/100
+            u_full = gains[:,2]*(gains[:,7]**2+gains[:,10]**2+gains[:,12]**2+
+                                 gains[:,13]**2+gains[:,14]**2+gains[:,15]**2)**0.5/100
+            u_filament = gains[:,2]*(gains[:,6]**2)**0.5/100
+
+            calibration_data["corr_systematic_indep_gains"].values[i_cal] = \
+                correlation_from_components(u_diag**2+u_other**2,[u_full,u_filament])
+
+            calibration_data["u_systematic_corr_rad_irr_gains"].values[i_cal] = gains[:,2]*(
+                        gains[:,4]**2+gains[:,5]**2+gains[:,18]**2)**0.5/100
+
+            u_other = gains[:,2]*(gains[:,4]**2+gains[:,18]**2)**0.5/100
+            u_filament = gains[:,2]*(gains[:,5]**2)**0.5/100
+
+            calibration_data["corr_systematic_corr_rad_irr_gains"].values[i_cal] = \
+                correlation_from_components(u_other**2,[u_filament])
 
         return calibration_data
 
+
+def correlation_from_components(var_diag,u_full):
+    """
+    Returns the correlation matrix of the sum of an uncorrelated component with
+    variances var_diag and fully correlated components with uncertainties u_full
+
+    :type var_diag: numpy.ndarray
+    :param var_diag: variances of uncorrelated component
+    :type u_full: list
+    :param u_full: uncertainties of fully correlated components
+    :return: correlation matrix
+    :rtype: numpy.ndarray
+    """
+    cov = np.diag(var_diag)
+    for u in u_full:
+        cov += np.outer(u,u)
+    sd = np.sqrt(np.diag(cov))
+    return cov/np.outer(sd,sd)
+
+
+def _convert_hypstar(config_values,path_ascii,path_netcdf,hypstar):
+    """
+    Converts the calibration files of one hypstar in a worker process
+    """
+    context = Context(logger=logging.getLogger(__name__))
+    for name,value in config_values.items():
+        context.set_config_value(name,value)
+    calcon = CalibrationConverter(context)
+    calcon.path_ascii = path_ascii
+    calcon.path_netcdf = path_netcdf
+    calcon.convert_hypstar(hypstar)
+    return hypstar
+
+
 if __name__ == '__main__':
     context = setup_test_context()
     calcov=CalibrationConverter(context)
-    calcov.convert_all_calibration_data()
+    calcov.convert_all_calibration_data(incremental=True,parallel_cores=os.cpu_count())
     teardown_test_context(context)
\ No newline at end of file
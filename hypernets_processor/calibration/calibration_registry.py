@@ -0,0 +1,118 @@
+"""
+Calibration registry class
+"""
+
+from hypernets_processor.version import __version__
+
+from collections import OrderedDict
+import numpy as np
+import os
+import threading
+import xarray
+
+'''___Authorship___'''
+__author__ = "Pieter De Vis"
+__created__ = "19/10/2026"
+__version__ = __version__
+__maintainer__ = "Pieter De Vis"
+__email__ = "Pieter.De.Vis@npl.co.uk"
+__status__ = "Development"
+
+CALIBRATION_DATE_DIMS = ["calibrationdates", "nonlineardates", "wavdates"]
+DEFAULT_MAX_FILES = 8
+
+
+class CalibrationRegistry:
+    """
+    Process-wide registry of calibration datasets. Each calibration file is read once
+    and kept in memory, together with the materialised slices for the calibration
+    dates that have been requested. Entries are reloaded when the file changes, and
+    the least recently used files are dropped when more than max_files are held. The
+    registry is locked, so it may be used by concurrent threads.
+
+    :type max_files: int
+    :param max_files: maximum number of calibration files held in memory
+    """
+
+    def __init__(self, max_files=DEFAULT_MAX_FILES):
+        self.max_files = max_files
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_calibration(self, path, time=None):
+        """
+        Returns the calibration data from a calibration file valid at a given time, i.e.
+        for each calibration date dimension the last date not after time (the first date
+        if time precedes all of them, the last date if time is None)
+
+        :type path: str
+        :param path: calibration file path
+        :type time: datetime.datetime
+        :param time: acquisition time of the data to calibrate
+
+        :return: calibration dataset for the selected dates
+        :rtype: xarray.Dataset
+        """
+
+        with self._lock:
+            entry = self._get_entry(path)
+
+            selection = {dim: self._select_date(dates, time) for dim, dates in entry["dates"].items()}
+            key = tuple(selection[dim] for dim in sorted(selection))
+
+            if key not in entry["slices"]:
+                entry["slices"][key] = entry["dataset"].sel(selection).load()
+
+            calibration = entry["slices"][key]
+
+        return calibration.copy(deep=False)
+
+    def clear(self):
+        """
+        Removes all calibration files from the registry
+        """
+
+        with self._lock:
+            self._entries.clear()
+
+    def _get_entry(self, path):
+        # called with self._lock held
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+
+        entry = self._entries.get(path)
+        if (entry is None) or (entry["signature"] != signature):
+            with xarray.open_dataset(path) as ds:
+                dataset = ds.load()
+            dates = {dim: np.sort(dataset[dim].values) for dim in CALIBRATION_DATE_DIMS
+                     if dim in dataset.dims}
+            entry = {"signature": signature, "dataset": dataset, "dates": dates, "slices": {}}
+            self._entries[path] = entry
+
+        self._entries.move_to_end(path)
+        while len(self._entries) > max(self.max_files, 1):
+            self._entries.popitem(last=False)
+
+        return entry
+
+    @staticmethod
+    def _select_date(dates, time):
+        if time is None:
+            return dates[-1]
+
+        if dates.dtype.kind == "M":
+            time = np.datetime64(time)
+        else:
+            # calibration dates are labelled as e.g. 2020_07, which sort before any time in that month
+            time = time.strftime("%Y_%m_%d_%H%M%S")
+
+        i = np.searchsorted(dates, time, side="right") - 1
+        return dates[max(i, 0)]
+
+
+CALIBRATION_REGISTRY = CalibrationRegistry()
+
+
+if __name__ == "__main__":
+    pass
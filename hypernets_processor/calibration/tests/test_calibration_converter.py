@@ -0,0 +1,140 @@
+"""
+Tests for CalibrationConverter class
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+import logging
+from unittest.mock import patch
+from hypernets_processor.version import __version__
+from hypernets_processor.context import Context
+from hypernets_processor.calibration.calibration_converter import CalibrationConverter, FINGERPRINT_FILE
+import xarray as xr
+import numpy as np
+
+'''___Authorship___'''
+__author__ = "Pieter De Vis"
+__created__ = "19/10/2026"
+__version__ = __version__
+__maintainer__ = "Pieter De Vis"
+__email__ = "pieter.de.vis@npl.co.uk"
+__status__ = "Development"
+
+
+def write_ascii_tree(path_ascii, hypstar, gain=1.):
+    """
+    Writes ASCII calibration files of a VNIR hypstar, with one radiometric and one wavelength calibration
+    """
+    pixels = np.arange(5)
+    radcal = np.full((len(pixels), 20), 0.5)
+    radcal[:, 0] = pixels
+    radcal[:, 1] = 400. + pixels
+    radcal[:, 2] = gain
+
+    radiometric = os.path.join(path_ascii, hypstar, "radiometric", "2020_07")
+    wavelength = os.path.join(path_ascii, hypstar, "wavelength", "2020_09")
+    os.makedirs(radiometric)
+    os.makedirs(wavelength)
+    np.savetxt(os.path.join(radiometric, hypstar + "_radcal_L_200728_vnir.dat"), radcal)
+    np.savetxt(os.path.join(radiometric, hypstar + "_radcal_E_200729_vnir.dat"), radcal)
+    np.savetxt(os.path.join(radiometric, hypstar + "_nonlin_corr_coefs_200728.dat"), np.ones((3, 1)))
+    np.savetxt(os.path.join(wavelength, hypstar + "_wl_coefs_200910.dat"), np.ones((2, 4)))
+
+
+def return_calibration_converter(tmpdir):
+    context = Context(logger=logging.getLogger(__name__))
+    calcon = CalibrationConverter(context)
+    calcon.path_ascii = os.path.join(tmpdir, "ascii")
+    calcon.path_netcdf = os.path.join(tmpdir, "netcdf")
+    return calcon
+
+
+class TestCalibrationConverter(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.calcon = return_calibration_converter(self.tmpdir)
+        write_ascii_tree(self.calcon.path_ascii, "hypstar_120241")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_convert_hypstar(self):
+        self.calcon.convert_hypstar("hypstar_120241")
+
+        hypstar_path = os.path.join(self.calcon.path_netcdf, "hypstar_120241")
+        self.assertCountEqual(os.listdir(hypstar_path),
+                              self.calcon.output_names("hypstar_120241") + [FINGERPRINT_FILE])
+
+        ds = xr.open_dataset(os.path.join(hypstar_path, "HYPERNETS_CAL_HYPSTAR_120241_RAD_v0.1.nc"))
+        np.testing.assert_array_equal(ds["gains"].values, np.ones((1, 5)))
+        ds.close()
+
+    def test_input_fingerprint(self):
+        fingerprint = self.calcon.input_fingerprint("hypstar_120241")
+        self.assertEqual(self.calcon.input_fingerprint("hypstar_120241"), fingerprint)
+
+        shutil.rmtree(os.path.join(self.calcon.path_ascii, "hypstar_120241"))
+        write_ascii_tree(self.calcon.path_ascii, "hypstar_120241", gain=2.)
+        self.assertNotEqual(self.calcon.input_fingerprint("hypstar_120241"), fingerprint)
+
+    def test_is_up_to_date(self):
+        self.assertFalse(self.calcon.is_up_to_date("hypstar_120241"))
+
+        self.calcon.convert_hypstar("hypstar_120241")
+        self.assertTrue(self.calcon.is_up_to_date("hypstar_120241"))
+
+        # missing output
+        os.remove(os.path.join(self.calcon.path_netcdf, "hypstar_120241", "HYPERNETS_CAL_HYPSTAR_120241_IRR_v0.1.nc"))
+        self.assertFalse(self.calcon.is_up_to_date("hypstar_120241"))
+
+    def test_convert_all_calibration_data_incremental(self):
+        write_ascii_tree(self.calcon.path_ascii, "hypstar_120242")
+        self.calcon.convert_all_calibration_data(incremental=True)
+        self.assertTrue(self.calcon.is_up_to_date("hypstar_120241"))
+        self.assertTrue(self.calcon.is_up_to_date("hypstar_120242"))
+
+        # unchanged inputs skipped
+        with patch.object(CalibrationConverter, "convert_hypstar") as mock_convert:
+            self.calcon.convert_all_calibration_data(incremental=True)
+        mock_convert.assert_not_called()
+
+        # changed inputs reconverted
+        shutil.rmtree(os.path.join(self.calcon.path_ascii, "hypstar_120242"))
+        write_ascii_tree(self.calcon.path_ascii, "hypstar_120242", gain=2.)
+        self.assertFalse(self.calcon.is_up_to_date("hypstar_120242"))
+
+        with patch.object(CalibrationConverter, "convert_hypstar", autospec=True,
+                          side_effect=CalibrationConverter.convert_hypstar) as mock_convert:
+            self.calcon.convert_all_calibration_data(incremental=True)
+        mock_convert.assert_called_once_with(self.calcon, "hypstar_120242")
+        self.assertTrue(self.calcon.is_up_to_date("hypstar_120242"))
+
+        ds = xr.open_dataset(os.path.join(self.calcon.path_netcdf, "hypstar_120242",
+                                          "HYPERNETS_CAL_HYPSTAR_120242_RAD_v0.1.nc"))
+        np.testing.assert_array_equal(ds["gains"].values, np.full((1, 5), 2.))
+        ds.close()
+
+    def test_convert_all_calibration_data_parallel(self):
+        write_ascii_tree(self.calcon.path_ascii, "hypstar_120242")
+        self.calcon.convert_all_calibration_data(parallel_cores=2)
+
+        for hypstar in ["hypstar_120241", "hypstar_120242"]:
+            self.assertTrue(self.calcon.is_up_to_date(hypstar))
+
+        # same files as converted serially
+        serial = return_calibration_converter(os.path.join(self.tmpdir, "serial"))
+        serial.path_ascii = self.calcon.path_ascii
+        serial.convert_all_calibration_data()
+
+        for name in self.calcon.output_names("hypstar_120242"):
+            ds = xr.open_dataset(os.path.join(self.calcon.path_netcdf, "hypstar_120242", name))
+            ds_serial = xr.open_dataset(os.path.join(serial.path_netcdf, "hypstar_120242", name))
+            xr.testing.assert_equal(ds, ds_serial)
+            ds.close()
+            ds_serial.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Tests for CalibrationRegistry class
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import datetime
+from unittest.mock import patch
+from hypernets_processor.version import __version__
+from hypernets_processor.calibration.calibration_registry import CalibrationRegistry
+import xarray as xr
+import numpy as np
+
+'''___Authorship___'''
+__author__ = "Pieter De Vis"
+__created__ = "19/10/2026"
+__version__ = __version__
+__maintainer__ = "Pieter De Vis"
+__email__ = "pieter.de.vis@npl.co.uk"
+__status__ = "Development"
+
+
+def write_calibration_file(path, gains):
+    ds = xr.Dataset({"gains": (("calibrationdates", "wavelength"), gains),
+                     "non_linearity_coefficients": (("nonlineardates", "nonlinearcoef"), np.ones((2, 3))),
+                     "wavelength_coefficients": (("wavdates", "wavcoef"), np.ones((1, 2)))},
+                    coords={"calibrationdates": ["2020_07", "2020_09"],
+                            "nonlineardates": ["2020_07", "2020_09"],
+                            "wavdates": ["2020_09"]})
+    ds.to_netcdf(path)
+
+
+class TestCalibrationRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "cal.nc")
+        write_calibration_file(self.path, np.array([[1., 1.], [2., 2.]]))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_get_calibration_latest(self):
+        registry = CalibrationRegistry()
+        cal = registry.get_calibration(self.path)
+        self.assertEqual(cal["calibrationdates"].values, "2020_09")
+        np.testing.assert_array_equal(cal["gains"].values, [2., 2.])
+
+    def test_get_calibration_time_matched(self):
+        registry = CalibrationRegistry()
+        cal = registry.get_calibration(self.path, datetime.datetime(2020, 8, 15))
+        self.assertEqual(cal["calibrationdates"].values, "2020_07")
+        self.assertEqual(cal["wavdates"].values, "2020_09")
+
+        cal = registry.get_calibration(self.path, datetime.datetime(2020, 9, 1))
+        self.assertEqual(cal["calibrationdates"].values, "2020_09")
+
+        cal = registry.get_calibration(self.path, datetime.datetime(2019, 1, 1))
+        self.assertEqual(cal["calibrationdates"].values, "2020_07")
+
+    def test_get_calibration_file_changed(self):
+        registry = CalibrationRegistry()
+        registry.get_calibration(self.path)
+        write_calibration_file(self.path, np.array([[1., 1.], [3., 3.]]))
+        os.utime(self.path, ns=(0, 0))
+        cal = registry.get_calibration(self.path)
+        np.testing.assert_array_equal(cal["gains"].values, [3., 3.])
+
+    def test_get_calibration_max_files(self):
+        registry = CalibrationRegistry(max_files=1)
+        path2 = os.path.join(self.tmpdir, "cal2.nc")
+        write_calibration_file(path2, np.array([[1., 1.], [2., 2.]]))
+        registry.get_calibration(self.path)
+        registry.get_calibration(path2)
+        self.assertEqual(len(registry._entries), 1)
+
+    def test_get_calibration_threads(self):
+        registry = CalibrationRegistry(max_files=1)
+        path2 = os.path.join(self.tmpdir, "cal2.nc")
+        write_calibration_file(path2, np.array([[1., 1.], [3., 3.]]))
+
+        errors = []
+        barrier = threading.Barrier(8, timeout=10)
+
+        def run(path):
+            try:
+                barrier.wait()
+                for i in range(20):
+                    registry.get_calibration(path)
+            except Exception as e:
+                errors.append(e)
+
+        # concurrent callers evicting each other's entries
+        threads = [threading.Thread(target=run, args=(path,)) for path in [self.path, path2] * 4]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(registry._entries), 1)
+
+    def test_get_calibration_threads_load_once(self):
+        registry = CalibrationRegistry()
+        barrier = threading.Barrier(4, timeout=10)
+
+        def run():
+            barrier.wait()
+            registry.get_calibration(self.path)
+
+        with patch("hypernets_processor.calibration.calibration_registry.xarray.open_dataset",
+                   side_effect=xr.open_dataset) as mock_open:
+            threads = [threading.Thread(target=run) for i in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(mock_open.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
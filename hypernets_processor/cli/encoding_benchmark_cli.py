@@ -0,0 +1,59 @@
+"""
+encoding benchmark cli
+"""
+
+from hypernets_processor.version import __version__
+from hypernets_processor.data_io.format.encoding_profiles import ENCODING_PROFILES
+from hypernets_processor.main.encoding_benchmark_main import main
+import argparse
+
+
+'''___Authorship___'''
+__author__ = "Sam Hunt"
+__created__ = "19/10/2026"
+__version__ = __version__
+__maintainer__ = "Sam Hunt"
+__email__ = "sam.hunt@npl.co.uk"
+__status__ = "Development"
+
+
+def configure_parser():
+    """
+    Configure parser
+
+    :return: parser
+    :rtype: argparse.ArgumentParser
+    """
+
+    description = "Tool for benchmarking write time, read time and file size of product encoding profiles"
+
+    # Initialise argument parser
+    parser = argparse.ArgumentParser(description=description,
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument("product_path", action="store",
+                        help="Path of netcdf product to benchmark with")
+
+    parser.add_argument("-d", "--directory", action="store",
+                        help="Directory to write benchmark files to (default is the product directory)")
+
+    parser.add_argument("-p", "--profiles", action="store", nargs="+", choices=list(ENCODING_PROFILES.keys()),
+                        help="Encoding profiles to benchmark (default is all)")
+
+    return parser
+
+
+parser = configure_parser()
+parsed_args = parser.parse_args()
+
+
+def cli():
+    """
+    Command line interface for encoding benchmark
+    """
+
+    print(main(parsed_args.product_path, directory=parsed_args.directory, profiles=parsed_args.profiles))
+
+
+if __name__ == "__main__":
+    pass
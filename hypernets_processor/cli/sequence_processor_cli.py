@@ -52,6 +52,13 @@ def configure_parser():
                         help="Write all products at intermediate data processing levels before final product")
     parser.add_argument("-j", "--job-config", action="store",
                         help="Use instead of above arguments to specify job with configuration file")
+    parser.add_argument("-p", "--parallel-sequences", action="store", type=int,
+                        help="Number of worker processes to process sequences with in parallel")
+    parser.add_argument("--profile", action="store_true",
+                        help="Record processing time and memory use of each sequence to metrics database and "
+                             "print breakdown by processing stage")
+    parser.add_argument("--profile-stats", action="store",
+                        help="Path to write cProfile stats of processing to (implies --profile)")
     return parser
 
 
@@ -119,11 +126,21 @@ def cli():
             job_config.write(f)
 
     # run main
-    main(processor_config_path=PROCESSOR_CONFIG_PATH, job_config_path=job_config_path, to_archive=False)
+    msg = main(
+        processor_config_path=PROCESSOR_CONFIG_PATH,
+        job_config_path=job_config_path,
+        to_archive=False,
+        parallel_sequences=parsed_args.parallel_sequences,
+        profile=parsed_args.profile or (parsed_args.profile_stats is not None),
+        profile_stats_path=os.path.abspath(parsed_args.profile_stats) if parsed_args.profile_stats else None
+    )
 
     if tmp_job:
         os.remove(job_config_path)
 
+    if parsed_args.profile or (parsed_args.profile_stats is not None):
+        print(msg)
+
     return None
 
 
@@ -40,36 +40,25 @@ class CombineSWIR:
         combine_function = self._measurement_function_factory.get_measurement_function(
             self.context.get_config_value("measurement_function_combine"))
         input_vars = combine_function.get_argument_names()
-        input_qty = [dataset_l1b["wavelength"].values,
-                     dataset_l1b[measurandstring].values,
-                     dataset_l1b_swir["wavelength"].values,
-                     dataset_l1b_swir[measurandstring].values,
-                     self.context.get_config_value("combine_lim_wav")]
-        u_random_input_qty = [None,
-                     dataset_l1b["u_random_"+measurandstring].values,
-                     None,
-                     dataset_l1b_swir["u_random_"+measurandstring].values,
-                     None]
-        u_systematic_input_qty_indep =  [None,
-                     dataset_l1b["u_systematic_indep_"+measurandstring].values,
-                     None,
-                     dataset_l1b_swir["u_systematic_indep_"+measurandstring].values,
-                     None]
-        u_systematic_input_qty_corr =  [None,
-                     dataset_l1b["u_systematic_corr_rad_irr_"+measurandstring].values,
-                     None,
-                     dataset_l1b_swir["u_systematic_corr_rad_irr_"+measurandstring].values,
-                     None]
-        corr_systematic_input_qty_indep =  [None,
-                     dataset_l1b["corr_systematic_indep_" + measurandstring].values,
-                     None,
-                     dataset_l1b_swir["corr_systematic_indep_"+measurandstring].values,
-                     None]
-        corr_systematic_input_qty_corr = [None,
-                     dataset_l1b["corr_systematic_corr_rad_irr_" + measurandstring].values,
-                     None,
-                     dataset_l1b_swir["corr_systematic_corr_rad_irr_"+measurandstring].values,
-                     None]
+
+        # measured quantities come from the VNIR and SWIR datasets, the others are fixed parameters
+        datasets = {"radiance_VIS": dataset_l1b, "radiance_SWIR": dataset_l1b_swir}
+        fixed_qty = {"wavelength_VIS": dataset_l1b["wavelength"].values,
+                     "wavelength_SWIR": dataset_l1b_swir["wavelength"].values,
+                     "wavelength_step": self.context.get_config_value("combine_lim_wav"),
+                     "wavelength_overlap": self.context.get_config_value("combine_overlap_wav")}
+
+        def find_input(prefix):
+            return [datasets[var][prefix+measurandstring].values if var in datasets
+                    else (fixed_qty[var] if prefix == "" else None) for var in input_vars]
+
+        input_qty = find_input("")
+        u_random_input_qty = find_input("u_random_")
+        u_systematic_input_qty_indep = find_input("u_systematic_indep_")
+        u_systematic_input_qty_corr = find_input("u_systematic_corr_rad_irr_")
+        corr_systematic_input_qty_indep = find_input("corr_systematic_indep_")
+        corr_systematic_input_qty_corr = find_input("corr_systematic_corr_rad_irr_")
+        param_fixed = [var not in datasets for var in input_vars]
         #todo do this more consistently with other modules, and do a direct copy for ranges that don't overlap
         dataset_l1b_comb = self.templ.l1b_template_from_combine(measurandstring,dataset_l1b,dataset_l1b_swir)
 
@@ -80,7 +69,8 @@ class CombineSWIR:
                                           u_systematic_input_qty_corr,
                                           corr_systematic_input_qty_indep,
                                           corr_systematic_input_qty_corr,
-                                          param_fixed=[True,False,True,False,True])
+                                          param_fixed=param_fixed,
+                                          linear_operator=getattr(combine_function,"linear_operator",None))
 
         if self.context.get_config_value("write_l1b"):
             self.writer.write(dataset_l1b_comb, overwrite=True)
@@ -1,21 +1,32 @@
 
-
+from hypernets_processor.combine_SWIR.measurement_functions.splice_operator import splice_operator,apply_splice
 
 
 class SlidingAverageCombine:
 
-    def function(self,wav_VIS,rad_VIS,wav_SWIR,rad_SWIR):
+    def function(self,wavs_vis,rad_VIS,wavs_swir,rad_SWIR,wav_step,wav_overlap):
         '''
         This function implements the measurement function.
         Each of the arguments can be either a scalar or a vector (1D-array).
+        Within wav_overlap around wav_step, the VNIR and SWIR spectra are averaged with
+        a weight sliding linearly from VNIR to SWIR.
         '''
+        A_vis,A_swir = splice_operator(wavs_vis,wavs_swir,wav_step,wav_overlap)
+        return apply_splice(A_vis,A_swir,rad_VIS,rad_SWIR)
 
-        return
+    def linear_operator(self,wavs_vis,rad_VIS,wavs_swir,rad_SWIR,wav_step,wav_overlap):
+        '''
+        Returns the linear operator of the measurement function for each argument,
+        as (A, B) such that rad = A_VIS.rad_VIS.B_VIS + A_SWIR.rad_SWIR.B_SWIR
+        (None for identity, or for arguments that are not propagated).
+        '''
+        A_vis,A_swir = splice_operator(wavs_vis,wavs_swir,wav_step,wav_overlap)
+        return [None,(A_vis,None),None,(A_swir,None),None,None]
 
     @staticmethod
     def get_name():
         return "SlidingAverageCombine"
 
     def get_argument_names(self):
-        return ["wavelength_VIS","radiance_VIS","wavelength_SWIR","radiance_SWIR"]
-
+        return ["wavelength_VIS","radiance_VIS","wavelength_SWIR","radiance_SWIR","wavelength_step",
+                "wavelength_overlap"]
@@ -0,0 +1,58 @@
+import numpy as np
+import scipy.sparse
+from hypernets_processor.interpolation.measurement_functions.linear_interpolation_matrix import \
+    linear_interpolation_matrix
+
+# splice operators already built, keyed on the VNIR and SWIR grids, limit and overlap
+_SPLICE_CACHE = {}
+
+
+def splice_operator(wavs_vis, wavs_swir, wav_step, wav_overlap=0.):
+    '''
+    Returns the sparse matrices (A_VIS, A_SWIR) such that A_VIS.rad_VIS + A_SWIR.rad_SWIR
+    is the combined spectrum on the VNIR wavelengths up to wav_step followed by the
+    SWIR wavelengths above it. Within wav_overlap around wav_step, both sensors are
+    blended with a weight sliding linearly from VNIR to SWIR (each interpolated to the
+    output wavelength); with no overlap this is a plain splice. Operators are built
+    once per (VNIR grid, SWIR grid, limit, overlap).
+    '''
+    wavs_vis = np.asarray(wavs_vis, dtype=float)
+    wavs_swir = np.asarray(wavs_swir, dtype=float)
+    wav_overlap = 0. if wav_overlap is None else float(wav_overlap)
+    key = (wavs_vis.tobytes(), wavs_swir.tobytes(), float(wav_step), wav_overlap)
+    if key in _SPLICE_CACHE:
+        return _SPLICE_CACHE[key]
+
+    wavs = np.concatenate((wavs_vis[wavs_vis <= wav_step], wavs_swir[wavs_swir > wav_step]))
+
+    # weight given to the SWIR spectrum at each output wavelength
+    if wav_overlap > 0:
+        w_swir = np.clip((wavs - (wav_step - wav_overlap / 2.)) / wav_overlap, 0., 1.)
+        # only blend where both sensors cover the wavelength
+        w_swir[wavs < np.min(wavs_swir)] = 0.
+        w_swir[wavs > np.max(wavs_vis)] = 1.
+    else:
+        w_swir = (wavs > wav_step).astype(float)
+
+    A_vis = scipy.sparse.diags(1. - w_swir).dot(linear_interpolation_matrix(wavs_vis, wavs, extrapolate=False))
+    A_swir = scipy.sparse.diags(w_swir).dot(linear_interpolation_matrix(wavs_swir, wavs, extrapolate=False))
+    A_vis = scipy.sparse.csr_matrix(A_vis)
+    A_swir = scipy.sparse.csr_matrix(A_swir)
+    A_vis.eliminate_zeros()
+    A_swir.eliminate_zeros()
+
+    _SPLICE_CACHE[key] = (A_vis, A_swir)
+    return A_vis, A_swir
+
+
+def apply_splice(A_vis, A_swir, rad_VIS, rad_SWIR):
+    '''
+    Applies the splice operators to spectra with wavelength as first dimension and any
+    trailing dimensions (e.g. series and stacked MC draws).
+    '''
+    rad_VIS = np.asarray(rad_VIS)
+    rad_SWIR = np.asarray(rad_SWIR)
+    shape = rad_VIS.shape[1:]
+    rad = A_vis.dot(rad_VIS.reshape((rad_VIS.shape[0], -1))) + \
+          A_swir.dot(rad_SWIR.reshape((rad_SWIR.shape[0], -1)))
+    return rad.reshape((A_vis.shape[0],) + shape)
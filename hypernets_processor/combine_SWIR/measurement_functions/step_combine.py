@@ -1,5 +1,5 @@
 
-import numpy as np
+from hypernets_processor.combine_SWIR.measurement_functions.splice_operator import splice_operator,apply_splice
 
 
 class StepCombine:
@@ -9,8 +9,17 @@ class StepCombine:
         This function implements the measurement function.
         Each of the arguments can be either a scalar or a vector (1D-array).
         '''
-        rad=np.concatenate((rad_VIS[np.where(wavs_vis<=wav_step)],rad_SWIR[np.where(wavs_swir>wav_step)]))
-        return rad
+        A_vis,A_swir = splice_operator(wavs_vis,wavs_swir,wav_step)
+        return apply_splice(A_vis,A_swir,rad_VIS,rad_SWIR)
+
+    def linear_operator(self,wavs_vis,rad_VIS,wavs_swir,rad_SWIR,wav_step):
+        '''
+        Returns the linear operator of the measurement function for each argument,
+        as (A, B) such that rad = A_VIS.rad_VIS.B_VIS + A_SWIR.rad_SWIR.B_SWIR
+        (None for identity, or for arguments that are not propagated).
+        '''
+        A_vis,A_swir = splice_operator(wavs_vis,wavs_swir,wav_step)
+        return [None,(A_vis,None),None,(A_swir,None),None]
 
     @staticmethod
     def get_name():
@@ -18,4 +27,3 @@ class StepCombine:
 
     def get_argument_names(self):
         return ["wavelength_VIS","radiance_VIS","wavelength_SWIR","radiance_SWIR","wavelength_step"]
-
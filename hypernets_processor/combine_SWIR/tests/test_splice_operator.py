@@ -0,0 +1,90 @@
+"""
+Tests for splice_operator module
+"""
+
+import unittest
+from hypernets_processor.version import __version__
+from hypernets_processor.combine_SWIR.measurement_functions.splice_operator import splice_operator, apply_splice
+from hypernets_processor.combine_SWIR.measurement_functions.sliding_average_combine import SlidingAverageCombine
+from hypernets_processor.combine_SWIR.measurement_functions.step_combine import StepCombine
+from hypernets_processor.data_utils.propagate_uncertainties import PropagateUnc
+import numpy as np
+
+'''___Authorship___'''
+__author__ = "Pieter De Vis"
+__created__ = "19/10/2026"
+__version__ = __version__
+__maintainer__ = "Pieter De Vis"
+__email__ = "pieter.de.vis@npl.co.uk"
+__status__ = "Development"
+
+
+class TestSpliceOperator(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.wavs_vis = np.linspace(400., 1000., 61)
+        self.wavs_swir = np.linspace(953., 1303., 36)
+        self.rad_vis = rng.uniform(1., 2., (61, 3))
+        self.rad_swir = rng.uniform(1., 2., (36, 3))
+        self.u_vis = rng.uniform(0.01, 0.1, (61, 3))
+        self.u_swir = rng.uniform(0.01, 0.1, (36, 3))
+
+    def test_splice_operator_weights(self):
+        A_vis, A_swir = splice_operator(self.wavs_vis, self.wavs_swir, 980., 40.)
+        wavs = np.concatenate((self.wavs_vis[self.wavs_vis <= 980.], self.wavs_swir[self.wavs_swir > 980.]))
+        w_vis = np.asarray(A_vis.sum(axis=1)).ravel()
+        w_swir = np.asarray(A_swir.sum(axis=1)).ravel()
+
+        np.testing.assert_allclose(w_vis + w_swir, 1.)
+
+        # weights slide from VNIR to SWIR within the overlap only
+        overlap = (wavs > 960.) & (wavs < 1000.)
+        np.testing.assert_array_equal(w_swir[wavs <= 960.], 0.)
+        np.testing.assert_array_equal(w_swir[wavs >= 1000.], 1.)
+        self.assertTrue(np.all((w_swir[overlap] > 0.) & (w_swir[overlap] < 1.)))
+        self.assertTrue(np.all(np.diff(w_swir) >= 0.))
+
+    def test_splice_operator_no_overlap(self):
+        A_vis, A_swir = splice_operator(self.wavs_vis, self.wavs_swir, 980., 0.)
+        rad = apply_splice(A_vis, A_swir, self.rad_vis, self.rad_swir)
+
+        np.testing.assert_allclose(rad, np.concatenate((self.rad_vis[self.wavs_vis <= 980.],
+                                                        self.rad_swir[self.wavs_swir > 980.])))
+
+        # each output wavelength from one sensor only
+        self.assertFalse(np.any((A_vis.getnnz(axis=1) > 0) & (A_swir.getnnz(axis=1) > 0)))
+
+        # same as no overlap given and as step combine
+        A_vis_none, A_swir_none = splice_operator(self.wavs_vis, self.wavs_swir, 980., None)
+        np.testing.assert_array_equal(A_vis_none.toarray(), A_vis.toarray())
+        np.testing.assert_array_equal(A_swir_none.toarray(), A_swir.toarray())
+        np.testing.assert_allclose(
+            SlidingAverageCombine().function(self.wavs_vis, self.rad_vis, self.wavs_swir, self.rad_swir, 980., 0.),
+            StepCombine().function(self.wavs_vis, self.rad_vis, self.wavs_swir, self.rad_swir, 980.))
+
+    def test_apply_splice_linear_operator(self):
+        mf = SlidingAverageCombine()
+        args = [self.wavs_vis, self.rad_vis, self.wavs_swir, self.rad_swir, 980., 40.]
+        operators = mf.linear_operator(*args)
+        A_vis = operators[1][0].toarray()
+        A_swir = operators[3][0].toarray()
+
+        rad = mf.function(*args)
+        np.testing.assert_allclose(rad, A_vis.dot(self.rad_vis) + A_swir.dot(self.rad_swir))
+
+        # trailing dimensions, e.g. stacked MC draws
+        draws = np.stack([self.rad_vis, 2. * self.rad_vis], axis=-1)
+        draws_swir = np.stack([self.rad_swir, 2. * self.rad_swir], axis=-1)
+        rad_draws = apply_splice(operators[1][0], operators[3][0], draws, draws_swir)
+        np.testing.assert_allclose(rad_draws[..., 0], rad)
+        np.testing.assert_allclose(rad_draws[..., 1], 2. * rad)
+
+        prop = PropagateUnc(None, 10, parallel_cores=0)
+        u_rad = prop.propagate_random_linear(operators, [None, self.u_vis, None, self.u_swir, None, None])
+        np.testing.assert_allclose(u_rad, np.sqrt((A_vis ** 2).dot(self.u_vis ** 2) +
+                                                  (A_swir ** 2).dot(self.u_swir ** 2)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,7 +4,8 @@ Context class
 from hypernets_processor.version import __version__
 from hypernets_processor.utils.config import get_config_value
 from hypernets_processor.data_io.format.databases import DB_DICT_DEFS
-from hypernets_processor.data_io.hypernets_db_builder import open_database
+from hypernets_processor.data_io.hypernets_db_builder import open_database, MetadataResolver
+from hypernets_processor.utils.profiling import Profiler
 
 import configparser
 
@@ -34,8 +35,12 @@ class Context:
         self.config_values = {}
         self.logger = logger
         self.metadata_db = None
+        self.metadata_resolver = None
         self.anomaly_db = None
         self.archive_db = None
+        self.metrics_db = None
+        self.background_writer = None
+        self.profiler = Profiler()
 
         # Set defaults - to be overwritten
         self.set_defaults()
@@ -65,6 +70,10 @@ class Context:
                         )
                     )
 
+        # Metadata tables are read on first query, then queries are resolved in memory
+        if self.metadata_db is not None:
+            self.metadata_resolver = MetadataResolver(self.metadata_db)
+
     def unpack_config(self, config, protected_values=None):
         """
         Unpacks config data, sets relevant entries to values instance attribute
@@ -0,0 +1,105 @@
+"""
+BackgroundWriter class
+"""
+
+from hypernets_processor.version import __version__
+import queue
+import threading
+
+
+"""___Authorship___"""
+__author__ = "Sam Hunt"
+__created__ = "19/10/2026"
+__version__ = __version__
+__maintainer__ = "Sam Hunt"
+__email__ = "sam.hunt@npl.co.uk"
+__status__ = "Development"
+
+DEFAULT_MAX_QUEUED = 4
+
+
+class BackgroundWriter:
+    """
+    Class to run file writing tasks on a background thread, so encoding and compressing products
+    overlaps with processing. The queue of tasks is bounded, submitting a task blocks while it
+    is full, so memory held by queued products is limited.
+
+    :type max_queued: int
+    :param max_queued: maximum number of queued tasks
+    """
+
+    def __init__(self, max_queued=DEFAULT_MAX_QUEUED):
+        self.queue = queue.Queue(maxsize=max(max_queued, 1))
+        self.errors = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, function, *args, **kwargs):
+        """
+        Queues task to be run in the background, blocks while queue is full
+
+        :type function: callable
+        :param function: task function
+
+        :param args: args for function
+
+        :param kwargs: kwargs for function
+        """
+
+        with self._lock:
+            if (self._thread is None) or (not self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+        self.queue.put((function, args, kwargs))
+
+    def flush(self):
+        """
+        Waits until all queued tasks are complete, raising the first error of any failed tasks
+        """
+
+        self.queue.join()
+
+        with self._lock:
+            errors = self.errors
+            self.errors = []
+
+        if errors:
+            raise errors[0]
+
+    def close(self):
+        """
+        Flushes queued tasks and stops background thread
+        """
+
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                thread = self._thread
+                self._thread = None
+
+            if thread is not None:
+                self.queue.put(None)
+                thread.join()
+
+    def _run(self):
+        while True:
+            task = self.queue.get()
+            try:
+                if task is None:
+                    return
+
+                function, args, kwargs = task
+                function(*args, **kwargs)
+
+            except Exception as e:
+                with self._lock:
+                    self.errors.append(e)
+
+            finally:
+                self.queue.task_done()
+
+
+if __name__ == "__main__":
+    pass
@@ -6,7 +6,7 @@ from hypernets_processor.version import __version__
 import dataset
 from dataset.types import Types
 from copy import copy, deepcopy
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.engine.url import make_url
 from sqlalchemy_utils import drop_database
 from datetime import date, datetime
@@ -19,6 +19,29 @@ __maintainer__ = "Sam Hunt"
 __email__ = "sam.hunt@npl.co.uk"
 __status__ = "Development"
 
+SQLITE_TIMEOUT = 60
+SQLITE_PRAGMAS = ["PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL", "PRAGMA temp_store=MEMORY"]
+
+
+def database_kwargs(url):
+    """
+    Returns options to connect to database at url with. SQLite connections use WAL journaling (so
+    readers do not block the writer), only sync to disk at checkpoints and wait for locks held by
+    other processes (e.g. parallel sequence processing workers) rather than failing
+
+    :type url: str
+    :param url: database url
+
+    :return: dataset.connect keyword arguments
+    :rtype: dict
+    """
+
+    if make_url(url).drivername == "sqlite":
+        return {"engine_kwargs": {"connect_args": {"timeout": SQLITE_TIMEOUT}},
+                "on_connect_statements": list(SQLITE_PRAGMAS),
+                "sqlite_wal_mode": False}
+    return {}
+
 
 def create_template_db(url, schema_dict=None, schema_sql=None):
     """
@@ -109,7 +132,8 @@ class DatabaseUtil:
         else:
             raise NameError("invalid url - engine must be either sqlite or postgresql")
 
-        return dataset.connect(url.__str__())
+        url = url.render_as_string(hide_password=False)
+        return dataset.connect(url, **database_kwargs(url))
 
     @staticmethod
     def delete_db(url):
@@ -143,6 +167,7 @@ class DatabaseUtil:
            - other entries may be kwargs supported by dataset.table.Table.create_column
         
         * "primary_key" - defines the tables primary key, value is the column name.
+        * "indexes" (optional) - defines the table indexes, value is a list of the column names of each index.
         * other entries may be kwargs supported by dataset.database.Database.create_table
         """
 
@@ -186,6 +211,10 @@ class DatabaseUtil:
                 tbl.create_column(column, column_db_type, **column_dict)
                 if fk:
                     column_dict["foreign_key"] = fk_val
+
+            # Add indexes
+            for index_columns in table_dict.get("indexes", []):
+                tbl.create_index(index_columns)
         db.commit()
 
         # Update with foreign keys
@@ -202,6 +231,76 @@ class DatabaseUtil:
                                                        column_dict["foreign_key"]["reference_table"],
                                                        column_dict["foreign_key"]["reference_column"])
 
+    @staticmethod
+    def apply_schema_indexes(db, schema_dict):
+        """
+        Adds indexes defined in schema to existing database tables, where missing
+
+        :type db: dataset.Dataset
+        :param db: database
+
+        :type schema_dict: dict
+        :param schema_dict: dictionary defining database schema (see apply_schema_dict)
+        """
+
+        for table_name, table_dict in schema_dict.items():
+            if ("indexes" in table_dict) and db.has_table(table_name):
+                tbl = db.load_table(table_name)
+                for index_columns in table_dict["indexes"]:
+                    if all(column in tbl.columns for column in index_columns):
+                        tbl.create_index(index_columns)
+
+    @staticmethod
+    def find_missing_values(db, table_name, column, values, **filters):
+        """
+        Returns values not found in table column (among rows matching filters), evaluated in the
+        database as an anti-join against a temporary table of the values
+
+        :type db: dataset.Dataset
+        :param db: database
+
+        :type table_name: str
+        :param table_name: name of table to search
+
+        :type column: str
+        :param column: name of column to search
+
+        :type values: list
+        :param values: values to search for
+
+        :param filters: column values rows searched must match, e.g. site_id="GHNA"
+
+        :return: values not found
+        :rtype: list
+        """
+
+        values = list(dict.fromkeys(values))
+
+        if (values == []) or (not db.has_table(table_name)):
+            return values
+
+        tbl = db.load_table(table_name)
+        if (column not in tbl.columns) or any(f not in tbl.columns for f in filters):
+            return values
+
+        conditions = "".join([" AND t." + f + " = :" + f for f in filters])
+        query_string = "SELECT c.value FROM tmp_values c WHERE NOT EXISTS" \
+                       " (SELECT 1 FROM " + table_name + " t WHERE t." + column + " = c.value" + conditions + ")"
+
+        db.begin()
+        try:
+            conn = db.executable
+            conn.execute(text("CREATE TEMPORARY TABLE tmp_values (value TEXT)"))
+            conn.execute(text("INSERT INTO tmp_values (value) VALUES (:value)"), [{"value": v} for v in values])
+            missing = [row[0] for row in conn.execute(text(query_string), filters)]
+            conn.execute(text("DROP TABLE tmp_values"))
+        except Exception:
+            db.rollback()
+            raise
+        db.commit()
+
+        return missing
+
     @staticmethod
     def update_to_foreign_key(db, table, column, reference_table, reference_column):
         """
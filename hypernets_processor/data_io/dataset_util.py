@@ -26,7 +26,7 @@ class DatasetUtil:
     """
 
     @staticmethod
-    def create_default_array(dim_sizes, dtype, dim_names=None, fill_value=None):
+    def create_default_array(dim_sizes, dtype, dim_names=None, fill_value=None, placeholder=False):
         """
         Return default empty xarray DataArray
 
@@ -42,6 +42,10 @@ class DatasetUtil:
         :type fill_value: int/float
         :param fill_value: (optional) fill value (if None CF compliant value used)
 
+        :type placeholder: bool
+        :param placeholder: (optional) if True array data is a read-only placeholder, that holds no memory until the
+        array data is set (default False)
+
         :return: Default empty array
         :rtype: xarray.DataArray
         """
@@ -49,7 +53,10 @@ class DatasetUtil:
         if fill_value is None:
             fill_value = DatasetUtil.get_default_fill_value(dtype)
 
-        empty_array = np.full(dim_sizes, fill_value, dtype)
+        if placeholder:
+            empty_array = np.broadcast_to(np.array(fill_value, dtype), dim_sizes)
+        else:
+            empty_array = np.full(dim_sizes, fill_value, dtype)
 
         if dim_names is not None:
             default_array = DataArray(empty_array, dims=dim_names)
@@ -61,7 +68,7 @@ class DatasetUtil:
         return default_array
 
     @staticmethod
-    def create_variable(dim_sizes, dtype, dim_names=None, attributes=None, fill_value=None):
+    def create_variable(dim_sizes, dtype, dim_names=None, attributes=None, fill_value=None, placeholder=False):
         """
         Return default empty xarray Variable
 
@@ -80,6 +87,10 @@ class DatasetUtil:
         :type fill_value: int/float
         :param fill_value: (optional) fill value (if None CF compliant value used)
 
+        :type placeholder: bool
+        :param placeholder: (optional) if True variable data is a read-only placeholder, that holds no memory until the
+        variable data is set, e.g. with `ds["variable"].values = data` (default False)
+
         :return: Default empty variable
         :rtype: xarray.Variable
         """
@@ -87,7 +98,8 @@ class DatasetUtil:
         if fill_value is None:
             fill_value = DatasetUtil.get_default_fill_value(dtype)
         
-        default_array = DatasetUtil.create_default_array(dim_sizes, dtype, fill_value=fill_value)
+        default_array = DatasetUtil.create_default_array(dim_sizes, dtype, fill_value=fill_value,
+                                                         placeholder=placeholder)
 
         if dim_names is None:
             variable = Variable(DEFAULT_DIM_NAMES[-len(dim_sizes):], default_array)
@@ -101,6 +113,23 @@ class DatasetUtil:
 
         return variable
 
+    @staticmethod
+    def is_placeholder(variable):
+        """
+        Returns True if variable data is a placeholder, i.e. it has not been set since the variable was created with
+        the placeholder option
+
+        :type variable: xarray.Variable/xarray.DataArray
+        :param variable: variable
+
+        :return: placeholder status
+        :rtype: bool
+        """
+
+        data = variable.data
+        return isinstance(data, np.ndarray) and (data.size > 1) and (not data.flags.writeable) and \
+            all(stride == 0 for stride in data.strides)
+
     @staticmethod
     def create_flags_variable(dim_sizes, meanings, dim_names=None, attributes=None):
         """
@@ -206,15 +235,15 @@ class DatasetUtil:
         if dtype == np.int8:
             return np.int8(-127)
         if dtype == np.uint8:
-            return np.uint8(-1)
+            return np.uint8(np.iinfo(np.uint8).max)
         elif dtype == np.int16:
             return np.int16(-32767)
         elif dtype == np.uint16:
-            return np.uint16(-1)
+            return np.uint16(np.iinfo(np.uint16).max)
         elif dtype == np.int32:
             return np.int32(-2147483647)
         elif dtype == np.uint32:
-            return np.uint32(-1)
+            return np.uint32(np.iinfo(np.uint32).max)
         elif dtype == np.int64:
             return np.int64(-9223372036854775806)
         elif dtype == np.float32:
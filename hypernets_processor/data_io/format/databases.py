@@ -26,6 +26,7 @@ Database schema specification for Hypernets land and water network
 #    - other entries may be kwargs supported by dataset.table.Table.create_column
 #
 # * "primary_key" - defines the tables primary key, value is the column name.
+# * "indexes" (optional) - defines the table indexes, value is a list of the column names of each index.
 # * other entries may be kwargs supported by dataset.database.Database.create_table
 #
 # b. SQL definition
@@ -45,8 +46,10 @@ ANOMALY_DB = {"anomalies": {"columns": {"anomaly_id": {"type": str},
                                         "sequence_name": {"type": str},
                                         "sequence_path": {"type": str},
                                         "site_id": {"type": str},
+                                        "system_id": {"type": str},
                                         "datetime": {"type": str},
-                                        }
+                                        },
+                            "indexes": [["site_id", "sequence_name"]]
                             }
               }
 
@@ -54,8 +57,11 @@ ANOMALY_DB = {"anomalies": {"columns": {"anomaly_id": {"type": str},
 ARCHIVE_DB = {"products": {"columns": {"product_name": {"type": str},
                                        "datetime": {"type": str},
                                        "sequence_name": {"type": str},
+                                       "sequence_path": {"type": str},
                                        "site_id": {"type": str},
+                                       "system_id": {"type": str},
                                        "product_path": {"type": str},
+                                       "product_level": {"type": str},
                                        "plot_path": {"type": str},
                                        "image_path": {"type": str},
                                        "solar_zenith_angle_min": {"type": str},
@@ -66,8 +72,47 @@ ARCHIVE_DB = {"products": {"columns": {"product_name": {"type": str},
                                        "viewing_zenith_angle_max": {"type": str},
                                        "viewing_azimuth_angle_min": {"type": str},
                                        "viewing_azimuth_angle_max": {"type": str}
-                                       }
-                           }
+                                       },
+                           "indexes": [["site_id", "sequence_name"]]
+                           },
+              "sequences": {"columns": {"sequence_name": {"type": str},
+                                        "sequence_path": {"type": str},
+                                        "site_id": {"type": str},
+                                        "system_id": {"type": str},
+                                        "datetime": {"type": str},
+                                        "status": {"type": str},
+                                        },
+                            "indexes": [["site_id", "sequence_name"]]
+                            }
+              }
+
+# Metrics Database, processing time and memory use of processed sequences and their processing stages
+METRICS_DB = {"sequences": {"columns": {"sequence_name": {"type": str},
+                                        "sequence_path": {"type": str},
+                                        "site_id": {"type": str},
+                                        "system_id": {"type": str},
+                                        "datetime": {"type": str},
+                                        "processing_datetime": {"type": str},
+                                        "status": {"type": str},
+                                        "duration": {"type": float},
+                                        "rss": {"type": int},
+                                        "rss_change": {"type": int},
+                                        "process_peak_rss": {"type": int},
+                                        "traced_peak": {"type": int}
+                                        },
+                            "indexes": [["site_id", "sequence_name"]]
+                            },
+              "stages": {"columns": {"sequence_name": {"type": str},
+                                     "site_id": {"type": str},
+                                     "processing_datetime": {"type": str},
+                                     "stage": {"type": str},
+                                     "calls": {"type": int},
+                                     "duration": {"type": float},
+                                     "cpu_time": {"type": float},
+                                     "allocated": {"type": int}
+                                     },
+                         "indexes": [["site_id", "sequence_name"], ["stage"]]
+                         }
               }
 
 
@@ -76,4 +121,5 @@ ARCHIVE_DB = {"products": {"columns": {"product_name": {"type": str},
 
 DB_DICT_DEFS = {"metadata": METADATA_DB,
                 "anomaly": ANOMALY_DB,
-                "archive": ARCHIVE_DB}
+                "archive": ARCHIVE_DB,
+                "metrics": METRICS_DB}
@@ -0,0 +1,45 @@
+"""
+NetCDF encoding profile definitions for Hypernets land and water network data products
+"""
+
+# The set of defined encoding profiles is defined below in ENCODING_PROFILES. Each entry is the name of a profile, the
+# value is a dictionary that defines how product data variables are encoded when written to netCDF, with entries:
+#
+# * "complevel" - zlib compression level, 0 - 9
+# * "shuffle" - if True the shuffle filter is applied before compression (numeric variables only), so bytes of equal
+#   significance are stored together. This allows similar compression ratios at lower, faster compression levels.
+# * "chunk_length" - chunk length along non-wavelength dimensions (e.g. scan, series). Variables are chunked to hold
+#   whole spectra, i.e. chunks span the full wavelength dimension, matching the typical access of reading spectra for a
+#   set of scans.
+# * "pack_uncertainties" - if True uncertainty variables (i.e. "u_" prefixed) are written as relative uncertainties,
+#   in % of their measurand (e.g. "radiance" for "u_random_radiance"), packed as 16 bit integers with a fixed scale
+#   factor of PACKED_UNCERTAINTY_SCALE_FACTOR %, instead of their defined encoding. As the uncertainties are relative,
+#   precision is the same at the low signal ends of the spectrum as at its peak. Packed variables are renamed with a
+#   "u_rel_" prefix (e.g. "u_rel_random_radiance"). Uncertainties without a measurand, or with relative values out of
+#   the packed range (0 - 65.534 %), are written with their defined encoding.
+#
+# The profile used to write a product is chosen by product level, defaults are defined below in
+# LEVEL_ENCODING_PROFILES. These may be overridden with the "encoding_profile" config value, for all levels, or with
+# the "encoding_profile_<level>" (e.g. "encoding_profile_l1a") config value, for a given level.
+
+
+ENCODING_PROFILES = {"fast": {"complevel": 1, "shuffle": True, "chunk_length": 64, "pack_uncertainties": False},
+                     "archive": {"complevel": 4, "shuffle": True, "chunk_length": 256, "pack_uncertainties": False},
+                     "compact": {"complevel": 9, "shuffle": True, "chunk_length": 1024, "pack_uncertainties": True}}
+
+# Intermediate, high volume, levels are written fast, final products are written for the archive
+LEVEL_ENCODING_PROFILES = {"L0": "fast",
+                           "L1A": "fast",
+                           "L1B": "archive",
+                           "L1C": "archive",
+                           "L1D": "archive",
+                           "L2A": "archive",
+                           "L2B": "archive",
+                           "CAL": "archive"}
+
+DEFAULT_ENCODING_PROFILE = "archive"
+
+# Packed uncertainty encoding, the maximum packed value is reserved as fill value
+PACKED_UNCERTAINTY_DTYPE = "uint16"
+PACKED_UNCERTAINTY_FILL_VALUE = 65535
+PACKED_UNCERTAINTY_SCALE_FACTOR = 0.001
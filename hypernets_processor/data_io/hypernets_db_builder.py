@@ -3,14 +3,17 @@ HypernetsDBBuilder class
 """
 
 from hypernets_processor.version import __version__
-from hypernets_processor.data_io.database_util import create_template_db
+from hypernets_processor.data_io.database_util import create_template_db, database_kwargs, DatabaseUtil
 from hypernets_processor.data_io.hypernets_writer import HypernetsWriter
 from hypernets_processor.data_io.format.databases import DB_DICT_DEFS
 from hypernets_processor.data_io.format.anomalies import ANOMALIES_DICT
 
 from sqlalchemy_utils import database_exists
 from sqlalchemy.engine.url import make_url
+from datetime import datetime
 import dataset
+import os
+import threading
 from os import makedirs
 from os.path import dirname
 
@@ -44,12 +47,21 @@ def open_database(url, db_format=None, context=None):
     if database_exists(url):
 
         if db_format == "archive":
-            return ArchiveDB(url, context)
+            db = ArchiveDB(url, context)
         elif db_format == "anomaly":
-            return AnomolyDB(url, context)
+            db = AnomolyDB(url, context)
         elif db_format == "metadata":
-            return MetadataDB(url, context)
-        return dataset.connect(url)
+            db = MetadataDB(url, context)
+        elif db_format == "metrics":
+            db = MetricsDB(url, context)
+        else:
+            return dataset.connect(url, **database_kwargs(url))
+
+        # databases created before indexes were added to their schema
+        if isinstance(DB_DICT_DEFS[db_format], dict):
+            DatabaseUtil.apply_schema_indexes(db, DB_DICT_DEFS[db_format])
+
+        return db
 
     elif db_format is not None:
         url_ = make_url(url)
@@ -111,6 +123,10 @@ class HypernetsDBBuilder:
             db.__class__ = MetadataDB
             db.context = self.context
 
+        elif db_format == "metrics":
+            db.__class__ = MetricsDB
+            db.context = self.context
+
         return db
 
 
@@ -128,7 +144,42 @@ class ArchiveDB(dataset.Database):
     def __init__(self, url, context):
         self.context = context
         self.writer = HypernetsWriter(context)
-        super().__init__(url)
+        super().__init__(url, **database_kwargs(url))
+
+    # rows buffered for the current sequence, by table, when writing per sequence transactions
+    _pending = None
+    _pending_lock = threading.Lock()
+
+    def begin_sequence(self):
+        """
+        Starts buffering archive rows for the current sequence, to be added in one transaction by
+        commit_sequence
+        """
+
+        with self._pending_lock:
+            self._pending = {"products": [], "sequences": [], "directories": None}
+
+    def commit_sequence(self):
+        """
+        Adds archive rows buffered for the current sequence in one transaction
+        """
+
+        with self._pending_lock:
+            pending = self._pending
+            self._pending = None
+
+        if pending is None:
+            return
+
+        self.begin()
+        try:
+            for table_name in ["products", "sequences"]:
+                if pending[table_name]:
+                    self.get_table(table_name).insert_many(pending[table_name])
+        except Exception:
+            self.rollback()
+            raise
+        self.commit()
 
     def archive_product(self, ds, path):
         """
@@ -141,8 +192,10 @@ class ArchiveDB(dataset.Database):
         :param path: path product is being written to
         """
 
-        tbl = self.get_table("products")
-        tbl.insert(
+        plot_path, image_path = self._return_directories()
+
+        self._insert(
+            "products",
             dict(
                 product_name=ds.attrs["product_name"],
                 product_path=path,
@@ -152,8 +205,8 @@ class ArchiveDB(dataset.Database):
                 sequence_path=self.context.get_config_value("sequence_path"),
                 site_id=ds.attrs["site_id"],
                 system_id=ds.attrs["system_id"],
-                plot_path=self.writer.return_plot_directory(),
-                image_path=self.writer.return_image_directory(),
+                plot_path=plot_path,
+                image_path=image_path,
                 # solar_zenith_angle_min=ds.attrs["solar_zenith_angle_min"],
                 # solar_zenith_angle_max=ds.attrs["solar_zenith_angle_max"],
                 # solar_azimuth_angle_min=ds.attrs["solar_azimuth_angle_min"],
@@ -165,6 +218,70 @@ class ArchiveDB(dataset.Database):
             )
         )
 
+    def add_sequence(self, status):
+        """
+        Adds sequence to processed sequences table, with its processing status
+
+        :type status: str
+        :param status: sequence processing status, e.g. "processed" or "failed"
+        """
+
+        self._insert(
+            "sequences",
+            dict(
+                sequence_name=self.context.get_config_value("sequence_name"),
+                sequence_path=self.context.get_config_value("sequence_path"),
+                site_id=self.context.get_config_value("site_id"),
+                system_id=self.context.get_config_value("system_id"),
+                datetime=self.context.get_config_value("time"),
+                status=status
+            )
+        )
+
+    def _insert(self, table_name, row):
+        with self._pending_lock:
+            if self._pending is not None:
+                self._pending[table_name].append(row)
+                return
+
+        self.get_table(table_name).insert(row)
+
+    def _return_directories(self):
+        # plot and image directories are the same for all products of a sequence
+        with self._pending_lock:
+            if (self._pending is not None) and (self._pending["directories"] is not None):
+                return self._pending["directories"]
+
+        directories = (self.writer.return_plot_directory(), self.writer.return_image_directory())
+
+        with self._pending_lock:
+            if self._pending is not None:
+                self._pending["directories"] = directories
+
+        return directories
+
+    def get_new_sequences(self, sequence_names, site_id):
+        """
+        Returns sequences not already in archive for site, i.e. not in the processed sequences
+        table and without archived products
+
+        :type sequence_names: list
+        :param sequence_names: names of sequences
+
+        :type site_id: str
+        :param site_id: site id
+
+        :return: names of sequences not in archive
+        :rtype: list
+        """
+
+        new_sequences = DatabaseUtil.find_missing_values(
+            self, "sequences", "sequence_name", sequence_names, site_id=site_id
+        )
+        return DatabaseUtil.find_missing_values(
+            self, "products", "sequence_name", new_sequences, site_id=site_id
+        )
+
 
 class AnomolyDB(dataset.Database):
     """
@@ -183,7 +300,7 @@ class AnomolyDB(dataset.Database):
     def __init__(self, url, context, anomalies_dict=ANOMALIES_DICT):
         self.context = context
         self.anomalies_dict = anomalies_dict
-        super().__init__(url)
+        super().__init__(url, **database_kwargs(url))
 
     def add_anomaly(self, anomaly_id):
         """
@@ -346,7 +463,198 @@ class MetadataDB(dataset.Database):
 
     def __init__(self, url, context):
         self.context = context
-        super().__init__(url)
+        super().__init__(url, **database_kwargs(url))
+
+
+class MetricsDB(dataset.Database):
+    """
+    Class for handling Metrics Database in memory, inherits from dataset.Databases
+
+    :type url: str
+    :param url: database url
+
+    :type context: hypernets_processor.context.Context
+    :param context: processor context
+    """
+
+    def __init__(self, url, context):
+        self.context = context
+        super().__init__(url, **database_kwargs(url))
+
+    def add_sequence_metrics(self, metrics, status):
+        """
+        Adds processing time and memory use records of sequence, and of its processing stages, in one transaction
+
+        :type metrics: dict
+        :param metrics: sequence records, as returned by hypernets_processor.utils.profiling.Profiler.metrics
+
+        :type status: str
+        :param status: sequence processing status, e.g. "processed" or "failed"
+        """
+
+        sequence_name = self.context.get_config_value("sequence_name")
+        site_id = self.context.get_config_value("site_id")
+        processing_datetime = datetime.now().isoformat()
+
+        sequence_row = dict(
+            sequence_name=sequence_name,
+            sequence_path=self.context.get_config_value("sequence_path"),
+            site_id=site_id,
+            system_id=self.context.get_config_value("system_id"),
+            datetime=self.context.get_config_value("time"),
+            processing_datetime=processing_datetime,
+            status=status,
+            duration=metrics["sequence"].get("duration"),
+            rss=metrics["sequence"].get("rss"),
+            rss_change=metrics["sequence"].get("rss_change"),
+            process_peak_rss=metrics["sequence"].get("process_peak_rss"),
+            traced_peak=metrics["sequence"].get("traced_peak")
+        )
+
+        stage_rows = [
+            dict(
+                sequence_name=sequence_name,
+                site_id=site_id,
+                processing_datetime=processing_datetime,
+                stage=stage,
+                calls=record["calls"],
+                duration=record["duration"],
+                cpu_time=record["cpu_time"],
+                allocated=record["allocated"]
+            )
+            for stage, record in metrics["stages"].items()
+        ]
+
+        self.begin()
+        try:
+            self.get_table("sequences").insert(sequence_row)
+            if stage_rows:
+                self.get_table("stages").insert_many(stage_rows)
+        except Exception:
+            self.rollback()
+            raise
+        self.commit()
+
+
+class MetadataResolver:
+    """
+    Class to resolve metadata database queries, memoised by query. The tables of the database are read once, by
+    preload or when first queried, and are reread if the database changes (detected for sqlite databases, other
+    databases may be invalidated explicitly). Queries for values of a different type to the column values (e.g. text
+    for a number column) are passed to the database, so they match as in sql.
+
+    :type db: dataset.Database
+    :param db: metadata database
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._lock = threading.Lock()
+        self._tables = dict()
+        self._rows = dict()
+        self._signature = None
+
+    def preload(self):
+        """
+        Reads all tables of the database
+        """
+
+        with self._lock:
+            self._check_signature()
+            for table_name in self.db.tables:
+                self._return_table(table_name)
+
+    def invalidate(self):
+        """
+        Removes read tables and memoised query results, so they are reread from the database
+        """
+
+        with self._lock:
+            self._tables.clear()
+            self._rows.clear()
+
+    def find_one(self, table_name, **query):
+        """
+        Returns first row of database table matching query, as dataset.Table.find_one
+
+        :type table_name: str
+        :param table_name: table name
+
+        :param query: query, column values to match
+
+        :return: matching row (not to be modified), None if no match
+        :rtype: dict
+        """
+
+        scalar = all(isinstance(value, (str, int, float, bool, type(None))) for value in query.values())
+
+        with self._lock:
+            self._check_signature()
+
+            if not scalar:
+                return self.db[table_name].find_one(**query)
+
+            key = (table_name, tuple(sorted(query.items())))
+            if key not in self._rows:
+                rows = self._return_table(table_name)
+
+                # sql compares values of different types by column affinity (e.g. "1" matches 1), so these are
+                # queried from the database
+                if all(self._is_comparable(rows, name, value) for name, value in query.items()):
+                    self._rows[key] = next((row for row in rows
+                                            if all(row.get(name) == value for name, value in query.items())), None)
+                else:
+                    self._rows[key] = self.db[table_name].find_one(**query)
+
+            return self._rows[key]
+
+    def __getitem__(self, table_name):
+        # supports the dataset.Database interface used by TemplateUtil.find_metadata, i.e. db[table].find_one(**query)
+        return _MetadataTableResolver(self, table_name)
+
+    @staticmethod
+    def _is_comparable(rows, name, value):
+        # whether value compares with the values of the column in python as in sql, i.e. both are text or numbers
+        kinds = {_return_kind(row.get(name)) for row in rows if row.get(name) is not None}
+        return (value is None) or (kinds <= {_return_kind(value)})
+
+    def _return_table(self, table_name):
+        if table_name not in self._tables:
+            self._tables[table_name] = list(self.db[table_name].all()) if table_name in self.db.tables else []
+        return self._tables[table_name]
+
+    def _check_signature(self):
+        signature = self._return_signature()
+        if signature != self._signature:
+            self._tables.clear()
+            self._rows.clear()
+            self._signature = signature
+
+    def _return_signature(self):
+        url = make_url(str(self.db.url))
+        if (not url.drivername.startswith("sqlite")) or (not url.database):
+            return None
+
+        # sqlite writes go to the write-ahead log first
+        return tuple((os.stat(path).st_mtime_ns, os.stat(path).st_size) if os.path.exists(path) else None
+                     for path in (url.database, url.database + "-wal"))
+
+
+def _return_kind(value):
+    if isinstance(value, str):
+        return "text"
+    if isinstance(value, (bool, int, float)):
+        return "number"
+    return type(value)
+
+
+class _MetadataTableResolver:
+    def __init__(self, resolver, table_name):
+        self.resolver = resolver
+        self.table_name = table_name
+
+    def find_one(self, **query):
+        return self.resolver.find_one(self.table_name, **query)
 
 
 if __name__ == "__main__":
@@ -19,6 +19,9 @@ __status__ = "Development"
 
 version = 0.1
 
+# Formats filled in-place (by the reader and calibration converter), so templates are created without placeholders
+EAGER_DS_FORMATS = ["L0_RAD", "L0_IRR", "L0_BLA", "CAL"]
+
 
 class HypernetsDSBuilder:
     """
@@ -33,6 +36,11 @@ class HypernetsDSBuilder:
 
     :type metadata_defs: dict
     :param metadata_defs: dictionary of metadata for each product format (default is Hypernets formats)
+
+    Templates of the default Hypernets formats are copied from skeletons cached by format and dimension sizes, see
+    hypernets_processor.data_io.template_util.TemplateCache. Multidimensional variables of templates for processed
+    formats (i.e. not in EAGER_DS_FORMATS) are placeholders, which hold no memory until their data is set, so
+    variables not produced in a given configuration do not take memory.
     """
 
     def __init__(
@@ -82,7 +90,7 @@ class HypernetsDSBuilder:
         # Find metadata def
         metadata = {}
         if ds_format in self.metadata_defs.keys():
-            metadata = self.metadata_defs[ds_format]
+            metadata = dict(self.metadata_defs[ds_format])
 
         else:
             raise RuntimeWarning("No metadata found for file type " + str(ds_format))
@@ -92,7 +100,12 @@ class HypernetsDSBuilder:
 
         if self.context is not None:
 
+            # queries would be resolved by the context metadata resolver, memoised, if available - though no
+            # metadata_db_query is currently defined, so the database is not queried
             metadata_db = self.context.metadata_db
+            resolver = self.context.metadata_resolver
+            if (resolver is not None) and (resolver.db is metadata_db):
+                metadata_db = resolver
 
             # Evaluate queries for metadata_db to populate product metadata
             metadata_db_query = None
@@ -151,6 +164,8 @@ class HypernetsDSBuilder:
             propagate_ds=propagate_ds,
             metadata_db=metadata_db,
             metadata_db_query=metadata_db_query,
+            cache_name=ds_format if self.variables_dict_defs is VARIABLES_DICT_DEFS else None,
+            placeholders=ds_format not in EAGER_DS_FORMATS,
         )
 
     def return_ds_formats(self):
@@ -3,8 +3,23 @@ HypernetsWriter class
 """
 
 from hypernets_processor.version import __version__
+from hypernets_processor.data_io.background_writer import BackgroundWriter, DEFAULT_MAX_QUEUED
+from hypernets_processor.data_io.product_name_util import ProductNameUtil
+from hypernets_processor.data_io.dataset_util import DatasetUtil
+from hypernets_processor.data_io.format.encoding_profiles import ENCODING_PROFILES, LEVEL_ENCODING_PROFILES, \
+    DEFAULT_ENCODING_PROFILE, PACKED_UNCERTAINTY_DTYPE, PACKED_UNCERTAINTY_FILL_VALUE, \
+    PACKED_UNCERTAINTY_SCALE_FACTOR
+from hypernets_processor.utils.profiling import profile_method
+from contextlib import contextmanager
+from copy import deepcopy
 import os
+import re
+import shutil
+import threading
+import time
 import numpy as np
+import pandas as pd
+import xarray
 
 
 """___Authorship___"""
@@ -15,6 +30,17 @@ __maintainer__ = "Sam Hunt"
 __email__ = "sam.hunt@npl.co.uk"
 __status__ = "Development"
 
+BACKGROUND_WRITER_LOCK = threading.Lock()
+
+# Zarr stores - product dimensions sequences are appended along (first found) and dimension variables without these
+# dimensions are stacked along, per sequence
+ZARR_APPEND_DIMS = ["scan", "series", "sequence"]
+ZARR_SEQUENCE_DIM = "sequence_time"
+ZARR_CHUNK_LENGTH = 64
+
+# CSV files - maximum number of rows written at a time
+CSV_BLOCK_ROWS = 100000
+
 
 class HypernetsWriter:
     """
@@ -41,11 +67,18 @@ class HypernetsWriter:
         :param overwrite: set to true to overwrite existing file
 
         :type fmt: str
-        :param fmt: (optional, required if self.context is None) format to write to, may be 'netCDF4' or 'csv'.
-        overwrites directory determined from self.context
+        :param fmt: (optional, required if self.context is None) format to write to, may be 'netCDF4', 'csv' or
+        'zarr'. overwrites directory determined from self.context
 
         :type compression_level: int
-        :param compression_level: the file compression level if 'netCDF4' fmt, 0 - 9 (default is 5)
+        :param compression_level: the file compression level if 'netCDF4' fmt, 0 - 9 (default set by encoding
+        profile, see return_encoding_profile)
+
+        For the 'zarr' fmt products are appended to a store per site-day, see _write_zarr.
+
+        If the "async_write" config value is True, the file is written (and added to the archive
+        database) by the context background writer, call flush to wait until it has been written.
+        A snapshot of the dataset is queued, so later changes to ds by processing are not written.
         """
 
         fmt = self.return_fmt(fmt)
@@ -54,8 +87,78 @@ class HypernetsWriter:
         if not os.path.exists(directory):
             os.makedirs(directory)
 
-        path = os.path.join(directory, ds.attrs["product_name"]) + "." + fmt
+        if fmt == "zarr":
+            path = os.path.join(directory, self.return_zarr_path(ds.attrs["product_name"]))
+        else:
+            path = os.path.join(directory, ds.attrs["product_name"]) + "." + fmt
+
+        if self.return_background_writer() is not None:
+            if os.path.isfile(path) and (overwrite is not True):
+                raise IOError("The file already exists: " + path)
+
+            self.return_background_writer().submit(
+                self._write, self.return_snapshot(ds), path, fmt, overwrite=overwrite, compression_level=compression_level
+            )
+
+        else:
+            self._write(ds, path, fmt, overwrite=overwrite, compression_level=compression_level)
+
+    def flush(self):
+        """
+        Waits until files queued to be written in the background have been written, raising the
+        error of any failed writes
+        """
+
+        if self.return_background_writer() is not None:
+            self.return_background_writer().flush()
+
+    @staticmethod
+    def return_snapshot(ds):
+        """
+        Return copy of dataset to write later, variable data is copied except for placeholder data (which is read-only,
+        see DatasetUtil.is_placeholder) and index coordinates (which are immutable)
+
+        :type ds: xarray.Dataset
+        :param ds: dataset
+
+        :return: dataset snapshot
+        :rtype: xarray.Dataset
+        """
 
+        snapshot = ds.copy(deep=False)
+        snapshot.attrs = deepcopy(ds.attrs)
+
+        for name, variable in snapshot.variables.items():
+            variable.attrs = deepcopy(variable.attrs)
+            variable.encoding = deepcopy(variable.encoding)
+            if (name not in snapshot.indexes) and (not DatasetUtil.is_placeholder(variable)):
+                variable.data = np.copy(variable.data)
+
+        return snapshot
+
+    def return_background_writer(self):
+        """
+        Return background writer of context, created if "async_write" config value is True (the
+        maximum number of queued files may be set with the "write_queue_size" config value)
+
+        :return: background writer, None if writing synchronously
+        :rtype: hypernets_processor.data_io.background_writer.BackgroundWriter
+        """
+
+        if (self.context is None) or (self.context.get_config_value("async_write") is not True):
+            return None
+
+        with BACKGROUND_WRITER_LOCK:
+            if self.context.background_writer is None:
+                max_queued = self.context.get_config_value("write_queue_size")
+                self.context.background_writer = BackgroundWriter(
+                    DEFAULT_MAX_QUEUED if max_queued is None else max_queued
+                )
+
+        return self.context.background_writer
+
+    @profile_method("writing")
+    def _write(self, ds, path, fmt, overwrite=False, compression_level=None):
         if os.path.isfile(path):
             if overwrite is True:
                 os.remove(path)
@@ -65,11 +168,16 @@ class HypernetsWriter:
         #ds = HypernetsWriter.fill_ds(ds)
 
         if fmt == "nc":
-            HypernetsWriter._write_netcdf(ds, path, compression_level=compression_level)
+            HypernetsWriter._write_netcdf(
+                ds, path, compression_level=compression_level, profile=self.return_encoding_profile(ds)
+            )
 
         elif fmt == "csv":
             HypernetsWriter._write_csv(ds, path)
 
+        elif fmt == "zarr":
+            HypernetsWriter._write_zarr(ds, path, overwrite=overwrite)
+
         # Add dataset set to archive db if required
         self.archive_ds(ds, path)
 
@@ -78,8 +186,8 @@ class HypernetsWriter:
         Return product fmt, with respect to context and specified value
 
         :type fmt: str
-        :param fmt: (optional, required if self.context is None) format to write to, may be 'netCDF4' or 'csv'.
-        overwrites directory determined from self.context
+        :param fmt: (optional, required if self.context is None) format to write to, may be 'netCDF4', 'csv' or
+        'zarr'. overwrites directory determined from self.context
 
         :return: product format
         :rtype: str
@@ -96,6 +204,8 @@ class HypernetsWriter:
             return "nc"
         elif fmt.lower() == "csv":
             return "csv"
+        elif fmt.lower() == "zarr":
+            return "zarr"
         else:
             raise NameError("Invalid fmt: " + fmt)
 
@@ -162,8 +272,55 @@ class HypernetsWriter:
 
         return os.path.join(self.return_directory(directory), "image")
 
+    def return_encoding_profile(self, ds):
+        """
+        Return name of netCDF encoding profile to write dataset with, chosen by product level. Defaults per level may
+        be overridden with the "encoding_profile" config value, or for a given level with the
+        "encoding_profile_<level>" config value (e.g. "encoding_profile_l1a").
+
+        :type ds: xarray.Dataset
+        :param ds: dataset
+
+        :return: encoding profile name
+        :rtype: str
+        """
+
+        level = HypernetsWriter.return_product_level(ds.attrs.get("product_name", ""))
+
+        profile = None
+        if self.context is not None:
+            if level is not None:
+                profile = self.context.get_config_value("encoding_profile_" + level.lower())
+            if profile is None:
+                profile = self.context.get_config_value("encoding_profile")
+
+        if profile is None:
+            profile = LEVEL_ENCODING_PROFILES.get(level, DEFAULT_ENCODING_PROFILE)
+
+        if profile not in ENCODING_PROFILES:
+            raise NameError("Invalid encoding profile: " + profile)
+
+        return profile
+
+    @staticmethod
+    def return_product_level(product_name):
+        """
+        Return product level from product name
+
+        :type product_name: str
+        :param product_name: product name
+
+        :return: product level (e.g. "L1A"), None if not a level product
+        :rtype: str
+        """
+
+        for part in product_name.split("_"):
+            if re.fullmatch(r"L\d[A-D]?|CAL", part):
+                return part
+        return None
+
     @staticmethod
-    def _write_netcdf(ds, path, compression_level=None):
+    def _write_netcdf(ds, path, compression_level=None, profile=None):
         """
         Write xarray dataset to file to netcdf
 
@@ -174,42 +331,452 @@ class HypernetsWriter:
         :param path: file path
 
         :type compression_level: int
-        :param compression_level: the file compression level if 'netCDF4' fmt, 0 - 9 (default is 5)
+        :param compression_level: the file compression level if 'netCDF4' fmt, 0 - 9 (default set by profile)
+
+        :type profile: str
+        :param profile: (optional) name of encoding profile, as defined in ENCODING_PROFILES (default is "archive")
         """
 
-        if compression_level is None:
-            compression_level = 5
+        ds, encoding = HypernetsWriter.return_netcdf_encoding(
+            ds, compression_level=compression_level, profile=profile
+        )
+
+        ds.to_netcdf(path, format="netCDF4", engine="netcdf4", encoding=encoding)
+
+    @staticmethod
+    def return_netcdf_encoding(ds, compression_level=None, profile=None):
+        """
+        Return encoding to write xarray dataset to netcdf with, as defined by encoding profile. Variable encodings
+        defined in the dataset take precedence over the profile, except where the profile packs uncertainties.
+
+        Packed uncertainties are written as relative uncertainties, in %, renamed from "u_" to "u_rel_" prefixed (e.g.
+        "u_rel_random_radiance"), see _pack_relative_uncertainty.
+
+        :type ds: xarray.Dataset
+        :param ds: dataset
+
+        :type compression_level: int
+        :param compression_level: the file compression level, 0 - 9 (default set by profile)
 
-        comp = dict(zlib=True, complevel=compression_level)
+        :type profile: str
+        :param profile: (optional) name of encoding profile, as defined in ENCODING_PROFILES (default is "archive")
 
+        :return: dataset to write (a shallow copy if variables are packed) and encoding
+        :rtype: tuple
+        """
+
+        profile = ENCODING_PROFILES[DEFAULT_ENCODING_PROFILE if profile is None else profile]
+
+        if compression_level is None:
+            compression_level = profile["complevel"]
+
+        packed_names = []
         encoding = dict()
         for var_name in ds.data_vars:
-            var_encoding = dict(comp)
-            var_encoding.update(ds[var_name].encoding)
+            variable = ds[var_name]
+            numeric = variable.dtype.kind in "iufb"
+
+            var_encoding = dict(zlib=True, complevel=compression_level)
+            if numeric and profile["shuffle"]:
+                var_encoding["shuffle"] = True
+            if numeric and ("chunksizes" not in variable.encoding) and ("contiguous" not in variable.encoding):
+                chunksizes = HypernetsWriter._return_chunksizes(variable, profile["chunk_length"])
+                if chunksizes is not None:
+                    var_encoding["chunksizes"] = chunksizes
+
+            var_encoding.update(variable.encoding)
+
+            if numeric and profile["pack_uncertainties"] and var_name.startswith("u_"):
+                packed_names.append(var_name)
+
             encoding.update({var_name: var_encoding})
 
-        ds.to_netcdf(path, format="netCDF4", engine="netcdf4", encoding=encoding)
+        if packed_names:
+            ds = ds.copy(deep=False)
+            for var_name in packed_names:
+                measurand_name = HypernetsWriter._return_measurand_name(ds, var_name)
+                if measurand_name is None:
+                    continue
+
+                packed, packed_encoding = HypernetsWriter._pack_relative_uncertainty(
+                    ds[var_name], ds[measurand_name]
+                )
+                if packed is None:
+                    continue
+
+                rel_name = "u_rel_" + var_name[2:]
+                ds = ds.drop_vars(var_name)
+                ds[rel_name] = packed
+                encoding[rel_name] = encoding.pop(var_name)
+                encoding[rel_name].update(packed_encoding)
+
+        return ds, encoding
+
+    @staticmethod
+    def _return_chunksizes(variable, chunk_length):
+        if (variable.ndim == 0) or (0 in variable.shape):
+            return None
+
+        return tuple(size if "wavelength" in dim else min(size, chunk_length)
+                     for dim, size in zip(variable.dims, variable.shape))
+
+    @staticmethod
+    def _return_measurand_name(ds, var_name):
+        # measurand of uncertainty variable, i.e. the longest variable name it ends with with the same dimensions,
+        # e.g. "downwelling_radiance" for "u_systematic_indep_downwelling_radiance"
+        parts = var_name.split("_")
+        for i in range(2, len(parts)):
+            name = "_".join(parts[i:])
+            if (name in ds.data_vars) and (ds[name].dims == ds[var_name].dims):
+                return name
+        return None
 
     @staticmethod
-    def _write_csv(ds, path):
+    def _pack_relative_uncertainty(variable, measurand):
+        """
+        Return uncertainty variable as relative uncertainty, in %, to pack with a fixed scale factor of
+        PACKED_UNCERTAINTY_SCALE_FACTOR %. Precision is so the same across the spectrum, however low the signal.
+
+        :type variable: xarray.DataArray
+        :param variable: uncertainty variable
+
+        :type measurand: xarray.DataArray
+        :param measurand: measurand variable
+
+        :return: relative uncertainty variable and its packing encoding, None for both if it cannot be packed (i.e.
+        values negative or greater than the maximum packed value)
+        :rtype: tuple
         """
-        Write xarray dataset to file to csv
+
+        u = HypernetsWriter._return_valid_data(variable)
+        value = HypernetsWriter._return_valid_data(measurand)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            data = 100. * u / np.abs(value)
+        data[~np.isfinite(data)] = np.nan
+
+        valid = np.isfinite(data)
+        max_value = (PACKED_UNCERTAINTY_FILL_VALUE - 1) * PACKED_UNCERTAINTY_SCALE_FACTOR
+        if valid.any() and ((data[valid].min() < 0) or (data[valid].max() > max_value)):
+            return None, None
+
+        packed = variable.copy(data=data)
+        packed.attrs.pop("_FillValue", None)
+        packed.attrs["units"] = "%"
+        packed.attrs["relative_to"] = measurand.name
+        packed.encoding = dict()
+
+        return packed, {"dtype": PACKED_UNCERTAINTY_DTYPE, "scale_factor": PACKED_UNCERTAINTY_SCALE_FACTOR,
+                        "add_offset": 0., "_FillValue": PACKED_UNCERTAINTY_FILL_VALUE}
+
+    @staticmethod
+    def _return_valid_data(variable):
+        # variable data as float, with fill values as nan
+        fill_value = variable.attrs.get("_FillValue", variable.encoding.get("_FillValue", None))
+
+        data = variable.values.astype(np.float64)
+        if fill_value is not None:
+            data[variable.values == fill_value] = np.nan
+        return data
+
+    @staticmethod
+    def benchmark_encoding_profiles(ds, directory, profiles=None):
+        """
+        Benchmark writing dataset to netcdf with each encoding profile
+
+        :type ds: xarray.Dataset
+        :param ds: dataset
+
+        :type directory: str
+        :param directory: directory to write benchmark files to (files are removed after)
+
+        :type profiles: list
+        :param profiles: (optional) names of encoding profiles to benchmark (default is all)
+
+        :return: write time [s], read time [s] and file size [bytes], by profile name
+        :rtype: dict
+        """
+
+        if profiles is None:
+            profiles = list(ENCODING_PROFILES.keys())
+
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        results = dict()
+        for profile in profiles:
+            path = os.path.join(directory, "benchmark_" + profile + ".nc")
+
+            t0 = time.perf_counter()
+            HypernetsWriter._write_netcdf(ds, path, profile=profile)
+            write_time = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            with xarray.open_dataset(path) as ds_read:
+                ds_read.load()
+            read_time = time.perf_counter() - t0
+
+            results[profile] = {"write_time": write_time, "read_time": read_time, "size": os.path.getsize(path)}
+
+            os.remove(path)
+
+        return results
+
+    @staticmethod
+    def _write_csv(ds, path, block_rows=CSV_BLOCK_ROWS):
+        """
+        Write xarray dataset to file to csv.
+
+        Variables are written in a table per dimension group (e.g. per-scan variables, spectra, correlation matrices),
+        with a row per element and a column per dimension and variable, so the cartesian product of all the dataset
+        dimensions is never built. The lowest dimensional group is written to path, other groups to paths suffixed
+        with their dimension names (e.g. "_wavelength_series.csv"). Tables are written in blocks of rows, so memory use
+        is bounded. Scalar variables are written to the metadata file.
 
         :type ds: xarray.Dataset
         :param ds: dataset
 
         :type path: str
         :param path: file path
+
+        :type block_rows: int
+        :param block_rows: (optional) maximum number of rows to write at a time
         """
 
-        # write data variables (via pandas dataframe)
-        ds.to_dataframe().to_csv(path)
+        groups = dict()
+        scalars = []
+        for name, variable in ds.variables.items():
+            if variable.dims == (name,):
+                continue
+            if variable.ndim == 0:
+                scalars.append(name)
+            else:
+                groups.setdefault(variable.dims, []).append(name)
+
+        for i, dims in enumerate(sorted(groups, key=lambda d: (len(d), d))):
+            group_path = path if i == 0 else os.path.splitext(path)[0] + "_" + "_".join(dims) + ".csv"
+            with open(group_path, "w", newline="") as f:
+                HypernetsWriter._write_csv_group(f, ds, dims, groups[dims], block_rows)
 
         # write metadata
         metadata_path = os.path.splitext(path)[0] + "_meta.txt"
         with open(metadata_path, "w") as f:
             for meta_name in ds.attrs.keys():
-                f.write(meta_name + ": " + ds.attrs[meta_name] + "\n")
+                f.write(meta_name + ": " + str(ds.attrs[meta_name]) + "\n")
+            for name in scalars:
+                f.write(name + ": " + str(ds[name].values) + "\n")
+
+    @staticmethod
+    def _write_csv_group(f, ds, dims, names, block_rows):
+        shape = ds.variables[names[0]].shape
+
+        # dimension columns, with coordinate values where defined
+        dim_names = [dim if dims.count(dim) == 1 else dim + "_" + str(dims[:i + 1].count(dim))
+                     for i, dim in enumerate(dims)]
+        dim_values = [ds.variables[dim].values if (dim in ds.variables) and (ds.variables[dim].dims == (dim,))
+                      else np.arange(size) for dim, size in zip(dims, shape)]
+
+        row_size = int(np.prod(shape[1:]))
+        block = max(1, block_rows // max(row_size, 1))
+
+        for start in range(0, shape[0], block):
+            stop = min(start + block, shape[0])
+
+            columns = dict()
+            index = np.meshgrid(dim_values[0][start:stop], *dim_values[1:], indexing="ij")
+            for dim_name, values in zip(dim_names, index):
+                columns[dim_name] = values.ravel()
+            for name in names:
+                columns[name] = ds.variables[name].values[start:stop].ravel()
+
+            pd.DataFrame(columns).to_csv(f, header=(start == 0), index=False)
+
+    @staticmethod
+    def return_zarr_path(product_name):
+        """
+        Return path of product in zarr store, relative to product directory. Products are written to a store per
+        site-day, in a group per product type.
+
+        :type product_name: str
+        :param product_name: product name
+
+        :return: path of store group
+        :rtype: str
+        """
+
+        parts = ProductNameUtil.parse_product_name(product_name)
+        group = parts["ptype"] + ("_SWIR" if parts["swir"] else "")
+        return os.path.join(ProductNameUtil.create_store_name(product_name) + ".zarr", group)
+
+    @staticmethod
+    def _write_zarr(ds, path, overwrite=False):
+        """
+        Append xarray dataset to zarr store group.
+
+        Variables with a sequence dimension (see ZARR_APPEND_DIMS) are appended along it, with the sequence
+        acquisition time as a "<dim>_sequence_time" coordinate. Other variables (e.g. correlation matrices) are
+        stacked along the ZARR_SEQUENCE_DIM dimension. Variables are chunked to hold whole spectra, so single
+        variables may be read quickly. Writes to a store are locked, so it may be appended to by independent
+        processes.
+
+        If the store group already contains data of the sequence (e.g. when reprocessing), it is replaced if overwrite
+        is True, otherwise an error is raised.
+
+        :type ds: xarray.Dataset
+        :param ds: dataset
+
+        :type path: str
+        :param path: store group path, i.e. <store>.zarr/<group>
+
+        :type overwrite: bool
+        :param overwrite: set to true to replace existing data of sequence in store group
+        """
+
+        store, group = os.path.split(path)
+
+        sequence_time = ProductNameUtil.parse_product_name(ds.attrs["product_name"])["time"]
+        if sequence_time is None:
+            raise ValueError("Product name without acquisition time cannot be written to zarr store: " +
+                             ds.attrs["product_name"])
+
+        with HypernetsWriter._zarr_store_lock(store):
+            if os.path.isdir(path):
+                HypernetsWriter._remove_zarr_sequence(store, group, sequence_time, overwrite)
+
+            for ds_part, append_dim in HypernetsWriter._split_zarr_sequence(ds, sequence_time):
+                if os.path.isdir(os.path.join(store, group, next(iter(ds_part.data_vars)))):
+                    ds_part.to_zarr(store, group=group, mode="a", append_dim=append_dim)
+                else:
+                    encoding = {var_name: {"chunks": HypernetsWriter._return_chunksizes(
+                        ds_part[var_name], ZARR_CHUNK_LENGTH)} for var_name in ds_part.data_vars
+                        if ds_part[var_name].ndim > 0}
+                    ds_part.to_zarr(store, group=group, mode="a", encoding=encoding)
+
+    @staticmethod
+    def _split_zarr_sequence(ds, sequence_time):
+        """
+        Split dataset of a sequence into datasets to append to zarr store, by their append dimension
+
+        :type ds: xarray.Dataset
+        :param ds: dataset
+
+        :type sequence_time: datetime.datetime
+        :param sequence_time: sequence acquisition time
+
+        :return: list of dataset and its append dimension
+        :rtype: list
+        """
+
+        sequence_time = np.datetime64(sequence_time, "ns")
+        append_dim = next((dim for dim in ZARR_APPEND_DIMS if dim in ds.dims), None)
+
+        append_names = [name for name in ds.data_vars if append_dim in ds[name].dims]
+        sequence_names = [name for name in ds.data_vars if name not in append_names]
+
+        parts = []
+        if append_names:
+            ds_append = ds[append_names].drop_vars(
+                [name for name in ds.coords if (append_dim not in ds[name].dims) and (name not in ds.dims)]
+            )
+            ds_append = ds_append.assign_coords(
+                {append_dim + "_sequence_time": (append_dim, np.full(ds.sizes[append_dim], sequence_time))}
+            )
+            parts.append((ds_append, append_dim))
+
+        if sequence_names:
+            ds_sequence = ds[sequence_names].expand_dims({ZARR_SEQUENCE_DIM: [sequence_time]})
+            if append_dim is not None:
+                ds_sequence = ds_sequence.drop_dims(append_dim, errors="ignore")
+            parts.append((ds_sequence, ZARR_SEQUENCE_DIM))
+
+        parts = [(ds_part.copy(deep=False), dim) for ds_part, dim in parts]
+        for ds_part, _ in parts:
+            for name, variable in ds_part.variables.items():
+                # fill values are written as encoding, so the store encoding is kept when appending
+                if "_FillValue" in variable.attrs:
+                    variable.encoding.setdefault("_FillValue", variable.attrs.pop("_FillValue"))
+                if name.endswith(ZARR_SEQUENCE_DIM):
+                    variable.encoding["units"] = "seconds since 1970-01-01 00:00:00"
+
+        return parts
+
+    @staticmethod
+    def _remove_zarr_sequence(store, group, sequence_time, overwrite):
+        """
+        Remove data of sequence from zarr store group, by rewriting the group without it
+
+        :type store: str
+        :param store: store path
+
+        :type group: str
+        :param group: store group
+
+        :type sequence_time: datetime.datetime
+        :param sequence_time: sequence acquisition time
+
+        :type overwrite: bool
+        :param overwrite: if False an error is raised if the store group contains data of the sequence
+        """
+
+        sequence_time = np.datetime64(sequence_time, "ns")
+
+        with xarray.open_zarr(store, group=group) as ds_store:
+            keep = dict()
+            for dim in ZARR_APPEND_DIMS + [ZARR_SEQUENCE_DIM]:
+                coord = dim if dim == ZARR_SEQUENCE_DIM else dim + "_sequence_time"
+                if coord in ds_store.variables:
+                    keep[dim] = np.flatnonzero(ds_store[coord].values != sequence_time)
+
+            if all(len(index) == ds_store.sizes[dim] for dim, index in keep.items()):
+                return
+
+            if overwrite is not True:
+                raise IOError("The sequence already exists in the store: " + os.path.join(store, group))
+
+            ds_kept = ds_store.isel(keep).load()
+
+        if all(len(index) == 0 for index in keep.values()):
+            shutil.rmtree(os.path.join(store, group))
+            return
+
+        for variable in ds_kept.variables.values():
+            variable.encoding.pop("preferred_chunks", None)
+        ds_kept.to_zarr(store, group=group, mode="w")
+
+    @staticmethod
+    @contextmanager
+    def _zarr_store_lock(store):
+        if not os.path.exists(os.path.dirname(os.path.abspath(store))):
+            os.makedirs(os.path.dirname(os.path.abspath(store)))
+
+        # lock with fcntl where available, else with msvcrt (i.e. on Windows)
+        try:
+            import fcntl
+        except ImportError:
+            fcntl = None
+
+        with open(store + ".lock", "a+") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            else:
+                import msvcrt
+                lock_file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        # LK_LOCK gives up after 10 s, wait again
+                        pass
+
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
 
     @staticmethod
     def fill_ds(ds):
@@ -112,6 +112,65 @@ class ProductNameUtil:
         product_name_parts = filter(None, product_name_parts)
         return "_".join(product_name_parts)
 
+    @staticmethod
+    def parse_product_name(product_name):
+        """
+        Return the parts of a Hypernets product name
+
+        :type product_name: str
+        :param product_name: product name, as created by create_product_name
+
+        :return: product name parts, with entries "network", "site_id", "ptype", "time", "version" and "swir" (None
+        where not in product name)
+        :rtype: dict
+        """
+
+        parts = product_name.split("_")
+        ptypes = set(DS_FORMAT_FNAMES.values())
+
+        for i in range(1, len(parts)):
+            for n in (2, 1):
+                if "_".join(parts[i:i + n]) in ptypes:
+                    break
+            else:
+                continue
+            break
+        else:
+            raise ValueError("Invalid product name: " + product_name)
+
+        prefix = parts[1:i]
+        suffix = parts[i + n:]
+        times = [p for p in suffix if p.isdigit()]
+
+        return {"network": prefix[0] if len(prefix) == 2 else None,
+                "site_id": prefix[-1] if len(prefix) > 0 else None,
+                "ptype": "_".join(parts[i:i + n]),
+                "time": datetime.strptime(times[0], TIME_FMT_L12A) if len(times) == 2 else None,
+                "version": next((p[1:] for p in suffix if p.startswith("v")), None),
+                "swir": "SWIR" in suffix}
+
+    @staticmethod
+    def create_store_name(product_name):
+        """
+        Return name of the site-day store a Hypernets product is appended to, i.e. the product name without product
+        type or processing time, with the acquisition day as time
+
+        :type product_name: str
+        :param product_name: product name, as created by create_product_name
+
+        :return: store name
+        :rtype: str
+        """
+
+        parts = ProductNameUtil.parse_product_name(product_name)
+
+        time_string = parts["time"].strftime(TIME_FMT_L2B) if parts["time"] is not None else None
+        version = "v" + parts["version"] if parts["version"] is not None else None
+
+        store_name_parts = ["HYPERNETS", parts["network"], parts["site_id"], time_string, version]
+        store_name_parts = filter(None, store_name_parts)
+        return "_".join(store_name_parts)
+
 
 if __name__ == "__main__":
     pass
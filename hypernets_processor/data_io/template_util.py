@@ -1,9 +1,11 @@
 """
 TemplateUtil class
 """
+from collections import OrderedDict
 from copy import deepcopy
 from hypernets_processor.version import __version__
 from hypernets_processor.data_io.dataset_util import DatasetUtil
+import threading
 import xarray
 
 
@@ -15,9 +17,11 @@ __maintainer__ = "Sam Hunt"
 __email__ = "sam.hunt@npl.co.uk"
 __status__ = "Development"
 
+DEFAULT_MAX_TEMPLATES = 32
+
 
 def create_template_dataset(variables_dict, dim_sizes_dict, metadata=None, propagate_ds=None,
-                            metadata_db=None, metadata_db_query=None):
+                            metadata_db=None, metadata_db_query=None, cache_name=None, placeholders=False):
     """
     Returns template dataset
 
@@ -43,15 +47,25 @@ def create_template_dataset(variables_dict, dim_sizes_dict, metadata=None, propa
     :type metadata_db_query: dict
     :param metadata_db_query: database query, must find unique value
 
+    :type cache_name: str
+    :param cache_name: (optional) name to cache dataset variables under in TEMPLATE_CACHE (e.g. product format name),
+    so datasets with the same variables and dimension sizes are copied from a prebuilt skeleton
+
+    :type placeholders: bool
+    :param placeholders: (optional) if True multidimensional variables are created with placeholder data, which holds
+    no memory until the variable data is set (default False). Placeholder data is read-only, so must be set as a whole,
+    e.g. with `ds["variable"].values = data`, rather than in-place.
+
     :return ds: template dataset
     :rtype: xarray.Dataset
     """
 
-    # Create dataset
-    ds = xarray.Dataset()
+    # Create dataset with variables
+    if cache_name is not None:
+        ds = TEMPLATE_CACHE.get_template(cache_name, variables_dict, dim_sizes_dict, placeholders=placeholders)
+    else:
+        ds = TemplateUtil.add_variables(xarray.Dataset(), variables_dict, dim_sizes_dict, placeholders=placeholders)
 
-    # Add variables
-    ds = TemplateUtil.add_variables(ds, variables_dict, dim_sizes_dict)
     # Add metadata
     if metadata is not None:
 
@@ -74,7 +88,7 @@ class TemplateUtil:
     """
 
     @staticmethod
-    def add_variables(ds, variables_dict, dim_sizes_dict):
+    def add_variables(ds, variables_dict, dim_sizes_dict, placeholders=False):
         """
         Adds defined variables dataset
 
@@ -87,6 +101,10 @@ class TemplateUtil:
         :type dim_sizes_dict: dict
         :param dim_sizes_dict: entry per dataset dimension with value of size as int
 
+        :type placeholders: bool
+        :param placeholders: (optional) if True multidimensional variables are created with placeholder data (default
+        False)
+
         :return: dataset with defined variables
         :rtype: xarray.Dataset
         """
@@ -118,8 +136,12 @@ class TemplateUtil:
                                                     dim_names=dim_names, attributes=attributes)
 
             else:
-                variable = du.create_variable(dim_sizes, dim_names=dim_names,
-                                              dtype=dtype, attributes=attributes)
+                if placeholders and (len(dim_sizes) > 1):
+                    variable = du.create_variable(dim_sizes, dim_names=dim_names,
+                                                  dtype=dtype, attributes=attributes, placeholder=True)
+                else:
+                    variable = du.create_variable(dim_sizes, dim_names=dim_names,
+                                                  dtype=dtype, attributes=attributes)
 
                 if "encoding" in variable_attrs:
                     du.add_encoding(variable, **variable_attrs["encoding"])
@@ -252,5 +274,77 @@ class TemplateUtil:
         return metadata
 
 
+class TemplateCache:
+    """
+    Process-wide cache of template dataset skeletons, i.e. datasets with the defined variables, with their attributes,
+    encodings and default filled data. A skeleton is built once per name and dimension sizes, templates are returned as
+    copies of it, which is much faster than building the dataset variable by variable. Placeholder data is shared
+    between copies, as it is read-only. The least recently used skeletons are dropped when more than max_templates are
+    held.
+
+    :type max_templates: int
+    :param max_templates: maximum number of skeletons held in memory
+    """
+
+    def __init__(self, max_templates=DEFAULT_MAX_TEMPLATES):
+        self.max_templates = max_templates
+        self._skeletons = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_template(self, name, variables_dict, dim_sizes_dict, placeholders=False):
+        """
+        Returns template dataset with defined variables
+
+        :type name: str
+        :param name: name variables_dict is cached under (e.g. product format name)
+
+        :type variables_dict: dict
+        :type variables_dict: dictionary defining variables
+
+        :type dim_sizes_dict: dict
+        :param dim_sizes_dict: entry per dataset dimension with value of size as int
+
+        :type placeholders: bool
+        :param placeholders: (optional) if True multidimensional variables are created with placeholder data (default
+        False)
+
+        :return: template dataset
+        :rtype: xarray.Dataset
+        """
+
+        key = (name, tuple(sorted(dim_sizes_dict.items())), placeholders)
+
+        with self._lock:
+            skeleton = self._skeletons.get(key)
+            if skeleton is None:
+                skeleton = TemplateUtil.add_variables(xarray.Dataset(), variables_dict, dim_sizes_dict,
+                                                      placeholders=placeholders)
+                self._skeletons[key] = skeleton
+
+            self._skeletons.move_to_end(key)
+            while len(self._skeletons) > max(self.max_templates, 1):
+                self._skeletons.popitem(last=False)
+
+        data = {name: variable.values if DatasetUtil.is_placeholder(variable) else variable.values.copy()
+                for name, variable in skeleton.data_vars.items()}
+        ds = skeleton.copy(deep=False, data=data)
+        for variable in ds.variables.values():
+            variable.attrs = deepcopy(variable.attrs)
+            variable.encoding = deepcopy(variable.encoding)
+
+        return ds
+
+    def clear(self):
+        """
+        Removes all skeletons from the cache
+        """
+
+        with self._lock:
+            self._skeletons.clear()
+
+
+TEMPLATE_CACHE = TemplateCache()
+
+
 if __name__ == '__main__':
     pass
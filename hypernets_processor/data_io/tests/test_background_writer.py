@@ -0,0 +1,65 @@
+"""
+Tests for BackgroundWriter class
+"""
+
+import unittest
+from hypernets_processor.data_io.background_writer import BackgroundWriter
+from hypernets_processor.version import __version__
+import threading
+
+
+'''___Authorship___'''
+__author__ = "Sam Hunt"
+__created__ = "19/10/2026"
+__version__ = __version__
+__maintainer__ = "Sam Hunt"
+__email__ = "sam.hunt@npl.co.uk"
+__status__ = "Development"
+
+
+class TestBackgroundWriter(unittest.TestCase):
+    def test_submit_flush(self):
+        bw = BackgroundWriter()
+
+        written = []
+        for i in range(10):
+            bw.submit(written.append, i)
+        bw.flush()
+
+        self.assertEqual(written, list(range(10)))
+        bw.close()
+
+    def test_submit_backpressure(self):
+        bw = BackgroundWriter(max_queued=1)
+        event = threading.Event()
+
+        bw.submit(event.wait)     # running
+        bw.submit(event.wait)     # queued
+
+        # queue full, so submitting blocks until a task is complete
+        t = threading.Thread(target=bw.submit, args=(event.wait,))
+        t.start()
+        t.join(timeout=0.2)
+        self.assertTrue(t.is_alive())
+
+        event.set()
+        t.join(timeout=5)
+        self.assertFalse(t.is_alive())
+        bw.close()
+
+    def test_flush_error(self):
+        bw = BackgroundWriter()
+
+        def fail():
+            raise IOError("write failed")
+
+        bw.submit(fail)
+        self.assertRaises(IOError, bw.flush)
+
+        # error only raised once
+        bw.flush()
+        bw.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -256,6 +256,43 @@ class TestDatabaseUtil(unittest.TestCase):
         del db
         os.remove(temp_name)
 
+    def test_apply_schema_dict_sqlite_indexes(self):
+        temp_name = ''.join(random.choices(string.ascii_lowercase, k=6)) + ".db"
+        url = "sqlite:///" + temp_name
+
+        dbu = DatabaseUtil()
+        db = dbu.create_db(url)
+
+        test_schema = deepcopy(TEST_SCHEMA)
+        test_schema["table2"]["indexes"] = [["2id", "column2"]]
+        dbu.apply_schema_dict(db, schema_dict=test_schema)
+
+        test_db_schema(self, db)
+        self.assertTrue(db.get_table("table2").has_index(["2id", "column2"]))
+
+        db.close()
+        os.remove(temp_name)
+
+    def test_find_missing_values(self):
+        temp_name = ''.join(random.choices(string.ascii_lowercase, k=6)) + ".db"
+        url = "sqlite:///" + temp_name
+
+        dbu = DatabaseUtil()
+        db = dbu.create_db(url)
+
+        db["sequences"].insert_many([dict(sequence_name="SEQ1", site_id="A"),
+                                     dict(sequence_name="SEQ2", site_id="B")])
+
+        missing = dbu.find_missing_values(db, "sequences", "sequence_name", ["SEQ1", "SEQ2", "SEQ3"],
+                                          site_id="A")
+        self.assertCountEqual(missing, ["SEQ2", "SEQ3"])
+
+        missing = dbu.find_missing_values(db, "other", "sequence_name", ["SEQ1", "SEQ2"])
+        self.assertCountEqual(missing, ["SEQ1", "SEQ2"])
+
+        db.close()
+        os.remove(temp_name)
+
 
 if __name__ == '__main__':
     unittest.main()
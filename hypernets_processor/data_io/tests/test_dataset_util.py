@@ -144,6 +144,19 @@ class TestDatasetUtil(unittest.TestCase):
         self.assertEqual(np.int8, array_variable.dtype)
         self.assertEqual(1, array_variable[2, 4, 2])
 
+    def test_create_variable_3D_placeholder(self):
+        array_variable = DatasetUtil.create_variable([7, 8, 3], np.float32, placeholder=True)
+
+        self.assertEqual((7, 8, 3), array_variable.shape)
+        self.assertEqual(np.float32, array_variable.dtype)
+        self.assertTrue(np.isnan(array_variable[2, 4, 2]) or array_variable[2, 4, 2] == np.float32(9.96921E36))
+        self.assertTrue(DatasetUtil.is_placeholder(array_variable))
+
+        # placeholder read-only, until data set
+        self.assertRaises(ValueError, array_variable.__setitem__, (2, 4, 2), 1.)
+        array_variable.values = np.ones((7, 8, 3), np.float32)
+        self.assertFalse(DatasetUtil.is_placeholder(array_variable))
+
     def test_create_variable_3D_int_attributes(self):
         array_variable = DatasetUtil.create_variable([7, 8, 3], np.int8, attributes={"standard_name": "std"})
 
@@ -6,8 +6,12 @@ import unittest
 from unittest.mock import patch
 from hypernets_processor.data_io.database_util import DatabaseUtil
 from hypernets_processor.data_io.hypernets_db_builder import HypernetsDBBuilder
-from hypernets_processor.data_io.hypernets_db_builder import open_database
+from hypernets_processor.data_io.hypernets_db_builder import open_database, MetadataResolver
+from hypernets_processor.data_io.template_util import TemplateUtil
+from hypernets_processor.context import Context
 from hypernets_processor.version import __version__
+from datetime import datetime
+import xarray
 import os
 import string
 import random
@@ -116,5 +120,82 @@ class TestHypernetsDBBuilder(unittest.TestCase):
         self.assertEqual(db, mock_create_template_dataset.return_value)
 
 
+class TestArchiveDB(unittest.TestCase):
+    def test_sequence_transaction(self):
+        temp_name = os.path.join(this_directory, ''.join(random.choices(string.ascii_lowercase, k=6)) + ".db")
+
+        context = Context()
+        context.set_config_value("to_archive", True)
+        context.set_config_value("archive_directory", "out")
+        context.set_config_value("sequence_name", "SEQ20200311T112230")
+        context.set_config_value("time", datetime(2020, 3, 11, 11, 22, 30))
+
+        db = HypernetsDBBuilder(context).create_db_template("sqlite:///" + temp_name, "archive")
+        ds = xarray.Dataset(attrs={"product_name": "product", "site_id": "TEST", "system_id": "1"})
+
+        db.begin_sequence()
+        db.archive_product(ds, "path1")
+        db.archive_product(ds, "path2")
+        db.add_sequence("processed")
+
+        # rows only added on commit
+        self.assertEqual(db["products"].count(), 0)
+        db.commit_sequence()
+
+        self.assertCountEqual([row["product_path"] for row in db["products"].find()], ["path1", "path2"])
+        self.assertEqual(db["sequences"].find_one()["status"], "processed")
+
+        # without sequence transaction rows are added directly
+        db.archive_product(ds, "path3")
+        self.assertEqual(db["products"].count(), 3)
+
+        db.close()
+        os.remove(temp_name)
+
+
+class TestMetadataResolver(unittest.TestCase):
+    def test_find_one(self):
+        temp_name = os.path.join(this_directory, ''.join(random.choices(string.ascii_lowercase, k=6)) + ".db")
+
+        db = open_database("sqlite:///" + temp_name, db_format="metadata")
+        db["sites"].insert(dict(site_id="GHNA", site_latitude=-23.6))
+        db["sites"].insert(dict(site_id="BSBE", site_latitude=51.4))
+
+        resolver = MetadataResolver(db)
+        resolver.preload()
+
+        with patch.object(db, "query", side_effect=AssertionError("database queried")):
+            row = resolver.find_one("sites", site_id="BSBE")
+            self.assertEqual(51.4, row["site_latitude"])
+            self.assertIs(row, resolver.find_one("sites", site_id="BSBE"))
+            self.assertIsNone(resolver.find_one("sites", site_id="TEST"))
+
+            metadata = TemplateUtil.find_metadata({"site_latitude": None}, resolver, {"sites": {"site_id": "GHNA"}})
+            self.assertEqual({"site_latitude": -23.6}, metadata)
+
+        # database changes invalidate memoised queries
+        db["sites"].insert(dict(site_id="TEST", site_latitude=0.))
+        self.assertEqual(0., resolver.find_one("sites", site_id="TEST")["site_latitude"])
+
+        db.close()
+        os.remove(temp_name)
+
+    def test_find_one_column_type(self):
+        temp_name = os.path.join(this_directory, ''.join(random.choices(string.ascii_lowercase, k=6)) + ".db")
+        self.addCleanup(os.remove, temp_name)
+
+        db = open_database("sqlite:///" + temp_name, db_format="metadata")
+        self.addCleanup(db.close)
+        db["systems"].insert(dict(system_id=1, hypstar_cal_number="220241"))
+
+        resolver = MetadataResolver(db)
+
+        # matched as in sql, by column affinity
+        self.assertEqual("220241", resolver.find_one("systems", system_id="1")["hypstar_cal_number"])
+        self.assertEqual("220241", resolver.find_one("systems", system_id=1)["hypstar_cal_number"])
+        self.assertEqual(1, resolver.find_one("systems", hypstar_cal_number=220241)["system_id"])
+        self.assertIsNone(resolver.find_one("systems", system_id="2"))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -9,8 +9,13 @@ from hypernets_processor.data_io.hypernets_writer import HypernetsWriter
 from hypernets_processor.context import Context
 from hypernets_processor.version import __version__
 from xarray import Dataset
+import importlib.util
 import numpy as np
+import pandas as pd
+import xarray
 import os
+import shutil
+import tempfile
 from datetime import datetime as dt
 
 
@@ -22,7 +27,6 @@ __maintainer__ = "Sam Hunt"
 __email__ = "sam.hunt@npl.co.uk"
 __status__ = "Development"
 
-# todo - write test for csv writer
 # todo - write test for end to end writer use
 
 
@@ -40,6 +44,10 @@ class TestHypernetsWriter(unittest.TestCase):
         hw = HypernetsWriter()
         self.assertEqual("csv", hw.return_fmt(fmt="csv"))
 
+    def test_return_fmt_zarr(self):
+        hw = HypernetsWriter()
+        self.assertEqual("zarr", hw.return_fmt(fmt="zarr"))
+
     def test_return_fmt_invalid(self):
         hw = HypernetsWriter()
         self.assertRaises(NameError, hw.return_fmt, "invalid")
@@ -98,7 +106,8 @@ class TestHypernetsWriter(unittest.TestCase):
         hw = HypernetsWriter()
 
         hw.write(ds)
-        mock_write.assert_called_once_with(ds, os.path.join("directory", "test.nc"), compression_level=None)
+        mock_write.assert_called_once_with(ds, os.path.join("directory", "test.nc"), compression_level=None,
+                                           profile="archive")
 
     @patch(
         'hypernets_processor.data_io.tests.test_hypernets_writer.HypernetsWriter.return_fmt',
@@ -118,6 +127,150 @@ class TestHypernetsWriter(unittest.TestCase):
         hw.write(ds)
         mock_write.assert_called_once_with(ds, os.path.join("directory", "test.csv")  )
 
+    @patch(
+        'hypernets_processor.data_io.tests.test_hypernets_writer.HypernetsWriter.return_fmt',
+        return_value="zarr"
+    )
+    @patch(
+        'hypernets_processor.data_io.tests.test_hypernets_writer.HypernetsWriter.return_directory',
+        return_value="directory"
+    )
+    @patch('hypernets_processor.data_io.tests.test_hypernets_writer.HypernetsWriter._write_zarr')
+    def test_write_zarr(self, mock_write, mock_dir, mock_fmt):
+        ds = Dataset()
+        ds.attrs["product_name"] = "HYPERNETS_L_GHNA_L1B_RAD_202004051123_202004061200_v0.1"
+
+        hw = HypernetsWriter()
+
+        hw.write(ds)
+        mock_write.assert_called_once_with(
+            ds, os.path.join("directory", "HYPERNETS_L_GHNA_20200405_v0.1.zarr", "L1B_RAD"), overwrite=False
+        )
+
+    def test_split_zarr_sequence(self):
+        ds = Dataset()
+        ds["radiance"] = DatasetUtil.create_variable([20, 10], np.float32, dim_names=["wavelength", "series"])
+        ds["corr_random_radiance"] = DatasetUtil.create_variable([20, 20], np.float32,
+                                                                 dim_names=["wavelength", "wavelength2"])
+        ds = ds.assign_coords(wavelength=np.arange(20))
+
+        parts = HypernetsWriter._split_zarr_sequence(ds, dt(2020, 4, 5, 11, 23))
+
+        (ds_append, append_dim), (ds_sequence, sequence_dim) = parts
+        self.assertEqual("series", append_dim)
+        self.assertEqual(["radiance"], list(ds_append.data_vars))
+        self.assertTrue((ds_append["series_sequence_time"].values == np.datetime64("2020-04-05T11:23")).all())
+        self.assertEqual("sequence_time", sequence_dim)
+        self.assertEqual(("sequence_time", "wavelength", "wavelength2"), ds_sequence["corr_random_radiance"].dims)
+        self.assertEqual(("wavelength",), ds_sequence["wavelength"].dims)
+        self.assertNotIn("_FillValue", ds_append["radiance"].attrs)
+        self.assertIn("_FillValue", ds["radiance"].attrs)
+
+    @unittest.skipIf(importlib.util.find_spec("zarr") is None, "zarr not installed")
+    def test__write_zarr(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, "HYPERNETS_L_GHNA_20200405_v0.1.zarr", "L1B_RAD")
+
+        for i, n_series in enumerate([10, 5]):
+            ds = Dataset()
+            ds["radiance"] = DatasetUtil.create_variable([20, n_series], np.float32,
+                                                         dim_names=["wavelength", "series"])
+            ds["radiance"].values = np.full((20, n_series), float(i))
+            ds["corr_random_radiance"] = DatasetUtil.create_variable([20, 20], np.float32,
+                                                                     dim_names=["wavelength", "wavelength2"])
+            ds.attrs["product_name"] = "HYPERNETS_L_GHNA_L1B_RAD_20200405112" + str(i) + "_202004061200_v0.1"
+            HypernetsWriter._write_zarr(ds, path)
+
+        ds_store = xarray.open_zarr(os.path.split(path)[0], group="L1B_RAD")
+        self.assertEqual(15, ds_store.sizes["series"])
+        self.assertEqual(2, ds_store.sizes["sequence_time"])
+        self.assertEqual(1., float(ds_store["radiance"][0, -1]))
+
+
+    @unittest.skipIf(importlib.util.find_spec("zarr") is None, "zarr not installed")
+    def test__write_zarr_overwrite(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, "HYPERNETS_L_GHNA_20200405_v0.1.zarr", "L1B_RAD")
+
+        def sequence_ds(i, n_series, value):
+            ds = Dataset()
+            ds["radiance"] = DatasetUtil.create_variable([20, n_series], np.float32,
+                                                         dim_names=["wavelength", "series"])
+            ds["radiance"].values = np.full((20, n_series), value)
+            ds["corr_random_radiance"] = DatasetUtil.create_variable([20, 20], np.float32,
+                                                                     dim_names=["wavelength", "wavelength2"])
+            ds.attrs["product_name"] = "HYPERNETS_L_GHNA_L1B_RAD_20200405112" + str(i) + "_202004061200_v0.1"
+            return ds
+
+        HypernetsWriter._write_zarr(sequence_ds(0, 10, 0.), path)
+        HypernetsWriter._write_zarr(sequence_ds(1, 5, 1.), path)
+
+        # reprocessed sequence is not appended again
+        self.assertRaises(IOError, HypernetsWriter._write_zarr, sequence_ds(0, 10, 2.), path)
+        HypernetsWriter._write_zarr(sequence_ds(0, 10, 2.), path, overwrite=True)
+
+        ds_store = xarray.open_zarr(os.path.split(path)[0], group="L1B_RAD")
+        self.assertEqual(15, ds_store.sizes["series"])
+        self.assertEqual(2, ds_store.sizes["sequence_time"])
+        self.assertEqual([1.] * 5 + [2.] * 10, list(ds_store["radiance"][0].values))
+        ds_store.close()
+
+
+    def test_write_async(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+
+        context = Context()
+        context.set_config_value("product_format", "netcdf")
+        context.set_config_value("archive_directory", tmpdir)
+        context.set_config_value("async_write", True)
+
+        ds = Dataset()
+        ds["variable"] = DatasetUtil.create_variable([7, 8], np.float32)
+        ds.attrs["product_name"] = "test"
+
+        hw = HypernetsWriter(context)
+        hw.write(ds)
+        self.assertIsNotNone(context.background_writer)
+        self.addCleanup(context.background_writer.close)
+        hw.flush()
+
+        self.assertTrue(os.path.isfile(os.path.join(tmpdir, "test.nc")))
+
+        # existing file raises without overwrite, written again with
+        self.assertRaises(IOError, hw.write, ds)
+        hw.write(ds, overwrite=True)
+        hw.flush()
+
+    def test_write_async_snapshot(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+
+        context = Context()
+        context.set_config_value("async_write", True)
+
+        ds = Dataset()
+        ds["variable"] = DatasetUtil.create_variable([7, 8], np.float32)
+        ds["placeholder"] = DatasetUtil.create_variable([7, 8], np.float32, placeholder=True)
+        ds.attrs["product_name"] = "test"
+
+        hw = HypernetsWriter(context)
+        context.background_writer = MagicMock()
+        hw.write(ds, directory=tmpdir, fmt="netcdf")
+
+        snapshot = context.background_writer.submit.call_args[0][1]
+
+        # later in place changes (e.g. of flags through isel views) are not written
+        value = ds["variable"].values[0, 0]
+        ds["variable"].values[0, 0] = 1.
+        ds.attrs["product_name"] = "changed"
+
+        self.assertEqual(value, snapshot["variable"].values[0, 0])
+        self.assertEqual("test", snapshot.attrs["product_name"])
+        self.assertTrue(DatasetUtil.is_placeholder(snapshot["placeholder"]))
+
     def test__write_netcdf(self):
 
         ds = MagicMock()
@@ -127,6 +280,134 @@ class TestHypernetsWriter(unittest.TestCase):
 
         ds.to_netcdf.assert_called_once_with(path, encoding={}, engine='netcdf4', format='netCDF4')
 
+    def test__write_csv(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, "test.csv")
+
+        ds = Dataset()
+        ds["acquisition_time"] = DatasetUtil.create_variable([10], np.float64, dim_names=["series"])
+        ds["radiance"] = DatasetUtil.create_variable([20, 10], np.float32, dim_names=["wavelength", "series"])
+        ds["radiance"].values = np.arange(200).reshape((20, 10))
+        ds["corr_random_radiance"] = DatasetUtil.create_variable([20, 20], np.float32,
+                                                                 dim_names=["wavelength", "wavelength"])
+        ds["scalar"] = 1.
+        ds = ds.assign_coords(wavelength=np.arange(400., 420.))
+        ds.attrs["product_name"] = "test"
+
+        HypernetsWriter._write_csv(ds, path, block_rows=7)
+
+        series = pd.read_csv(path)
+        self.assertEqual(["series", "acquisition_time"], list(series.columns))
+        self.assertEqual(10, len(series))
+
+        spectra = pd.read_csv(os.path.join(tmpdir, "test_wavelength_series.csv"))
+        self.assertEqual(["wavelength", "series", "radiance"], list(spectra.columns))
+        self.assertEqual(200, len(spectra))
+        self.assertEqual(401., spectra["wavelength"][10])
+        self.assertEqual(10., spectra["radiance"][10])
+
+        corr = pd.read_csv(os.path.join(tmpdir, "test_wavelength_wavelength.csv"))
+        self.assertEqual(["wavelength_1", "wavelength_2", "corr_random_radiance"], list(corr.columns))
+        self.assertEqual(400, len(corr))
+
+        with open(os.path.join(tmpdir, "test_meta.txt")) as f:
+            self.assertEqual(["product_name: test\n", "scalar: 1.0\n"], f.readlines())
+
+
+    def test_return_encoding_profile(self):
+        ds = Dataset()
+        ds.attrs["product_name"] = "HYPERNETS_L_GHNA_L1A_RAD_202004051123_v0.1"
+
+        hw = HypernetsWriter()
+        self.assertEqual("fast", hw.return_encoding_profile(ds))
+
+        context = Context()
+        context.set_config_value("encoding_profile", "compact")
+        hw = HypernetsWriter(context)
+        self.assertEqual("compact", hw.return_encoding_profile(ds))
+
+        context.set_config_value("encoding_profile_l1a", "archive")
+        self.assertEqual("archive", hw.return_encoding_profile(ds))
+
+        context.set_config_value("encoding_profile_l1a", "invalid")
+        self.assertRaises(NameError, hw.return_encoding_profile, ds)
+
+    def test_return_netcdf_encoding(self):
+        ds = Dataset()
+        ds["radiance"] = DatasetUtil.create_variable([200, 100], np.float32, dim_names=["wavelength", "series"])
+        ds["u_random_radiance"] = DatasetUtil.create_variable([200, 100], np.float32,
+                                                              dim_names=["wavelength", "series"])
+        ds["u_random_radiance"].values = np.full((200, 100), 2.)
+        DatasetUtil.add_encoding(ds["u_random_radiance"], np.uint32, scale_factor=0.001)
+
+        ds_write, encoding = HypernetsWriter.return_netcdf_encoding(ds, profile="archive")
+        self.assertIs(ds_write, ds)
+        self.assertEqual(encoding["radiance"]["complevel"], 4)
+        self.assertEqual(encoding["radiance"]["chunksizes"], (200, 100))
+        self.assertEqual(encoding["u_random_radiance"]["dtype"], np.uint32)
+
+        ds["radiance"].values = np.full((200, 100), 40.)
+        ds_write, encoding = HypernetsWriter.return_netcdf_encoding(ds, compression_level=2, profile="compact")
+        self.assertEqual(encoding["radiance"]["complevel"], 2)
+        self.assertEqual(encoding["u_rel_random_radiance"]["dtype"], "uint16")
+        self.assertEqual(encoding["u_rel_random_radiance"]["scale_factor"], 0.001)
+        self.assertNotIn("u_random_radiance", ds_write)
+        self.assertEqual(ds_write["u_rel_random_radiance"].attrs["units"], "%")
+        np.testing.assert_allclose(ds_write["u_rel_random_radiance"].values, 5.)
+        self.assertNotIn("_FillValue", ds_write["u_rel_random_radiance"].attrs)
+        self.assertIn("_FillValue", ds["u_random_radiance"].attrs)
+
+    def test__write_netcdf_compact(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, "test.nc")
+
+        # spectrum spanning several orders of magnitude, e.g. low signal UV and SWIR ends
+        radiance = np.outer(np.logspace(-3, 2, 200), np.ones(10))
+        ds = Dataset()
+        ds["radiance"] = DatasetUtil.create_variable([200, 10], np.float32, dim_names=["wavelength", "series"])
+        ds["radiance"].values = radiance
+        ds["u_random_radiance"] = DatasetUtil.create_variable([200, 10], np.float32,
+                                                              dim_names=["wavelength", "series"])
+        ds["u_random_radiance"].values = radiance * np.linspace(0.001, 0.5, 200)[:, None]
+        ds["u_random_radiance"].values[0, 0] = ds["u_random_radiance"].attrs["_FillValue"]
+        ds["u_other"] = DatasetUtil.create_variable([200], np.float32, dim_names=["wavelength"])
+
+        HypernetsWriter._write_netcdf(ds, path, profile="compact")
+
+        with xarray.open_dataset(path) as ds_read:
+            self.assertNotIn("u_random_radiance", ds_read)
+            self.assertIn("u_other", ds_read)
+            u_rel = ds_read["u_rel_random_radiance"].values
+            self.assertTrue(np.isnan(u_rel[0, 0]))
+
+            u = u_rel * ds_read["radiance"].values / 100.
+            expected = ds["u_random_radiance"].values
+            np.testing.assert_allclose(u[1:], expected[1:], rtol=0.01)
+            self.assertTrue((u[1:] > 0).all())
+
+
+    def test_benchmark_encoding_profiles(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+
+        ds = Dataset()
+        ds["radiance"] = DatasetUtil.create_variable([20, 10], np.float32, dim_names=["wavelength", "series"])
+        ds["u_random_radiance"] = DatasetUtil.create_variable([20, 10], np.float32,
+                                                              dim_names=["wavelength", "series"])
+        ds["u_random_radiance"].values = np.random.random((20, 10))
+
+        results = HypernetsWriter.benchmark_encoding_profiles(ds, tmpdir)
+
+        self.assertCountEqual(["fast", "archive", "compact"], results.keys())
+        for result in results.values():
+            self.assertGreater(result["size"], 0)
+            self.assertGreater(result["write_time"], 0)
+            self.assertGreater(result["read_time"], 0)
+        self.assertEqual([], os.listdir(tmpdir))
+
+
     def test_fill_ds(self):
         ds = Dataset()
         ds["array_variable1"] = DatasetUtil.create_variable([7, 8], np.float32)
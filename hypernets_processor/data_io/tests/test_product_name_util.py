@@ -45,6 +45,23 @@ class TestProductNameUtil(unittest.TestCase):
             pname = pnu.create_product_name("L_L1A_RAD")
             self.assertEqual("HYPERNETS_L1A_RAD_202001080945", pname)
 
+    def test_parse_product_name(self):
+        parts = ProductNameUtil.parse_product_name("HYPERNETS_W_GHNA_L1B_201804031100_202001080945_v0.1_SWIR")
+        self.assertEqual({"network": "W", "site_id": "GHNA", "ptype": "L1B", "time": datetime(2018, 4, 3, 11, 0),
+                          "version": "0.1", "swir": True}, parts)
+
+    def test_parse_product_name_none(self):
+        parts = ProductNameUtil.parse_product_name("HYPERNETS_L1A_RAD_202001080945")
+        self.assertEqual({"network": None, "site_id": None, "ptype": "L1A_RAD", "time": None, "version": None,
+                          "swir": False}, parts)
+
+    def test_parse_product_name_invalid(self):
+        self.assertRaises(ValueError, ProductNameUtil.parse_product_name, "HYPERNETS_TEST")
+
+    def test_create_store_name(self):
+        store_name = ProductNameUtil.create_store_name("HYPERNETS_L_TEST_L1A_RAD_201804031100_202001080945_v0.0")
+        self.assertEqual("HYPERNETS_L_TEST_20180403_v0.0", store_name)
+
 
 if __name__ == '__main__':
     unittest.main()
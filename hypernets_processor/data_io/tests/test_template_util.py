@@ -10,7 +10,8 @@ import os
 from hypernets_processor.data_io.database_util import create_template_db
 import numpy as np
 import xarray
-from hypernets_processor.data_io.template_util import TemplateUtil, create_template_dataset
+from hypernets_processor.data_io.template_util import TemplateUtil, TemplateCache, create_template_dataset
+from hypernets_processor.data_io.dataset_util import DatasetUtil
 from hypernets_processor.version import __version__
 
 
@@ -381,5 +382,55 @@ class TestTemplateUtil(unittest.TestCase):
         mock_find_metadata.assert_called_once_with(test_metadata, "db", "qu")
 
 
+class TestTemplateCache(unittest.TestCase):
+
+    test_variables = {"array_variable": {"dim": ["dim1", "dim2"],
+                                         "dtype": np.float32,
+                                         "attributes": {"standard_name": "array_variable_std_name"},
+                                         "encoding": {'dtype': np.uint16, "scale_factor": 1.0, "offset": 0.0}}}
+
+    @patch("hypernets_processor.data_io.template_util.TemplateUtil.add_variables",
+           wraps=TemplateUtil.add_variables)
+    def test_get_template(self, mock_add_variables):
+        cache = TemplateCache()
+
+        ds1 = cache.get_template("test", self.test_variables, {"dim1": 25, "dim2": 30})
+        ds1["array_variable"].values[0, 0] = 1.
+        ds1["array_variable"].attrs["standard_name"] = "changed"
+        ds2 = cache.get_template("test", self.test_variables, {"dim1": 25, "dim2": 30})
+
+        # skeleton built once, copies independent of each other
+        self.assertEqual(1, mock_add_variables.call_count)
+        self.assertEqual("array_variable_std_name", ds2["array_variable"].attrs["standard_name"])
+        self.assertNotEqual(1., ds2["array_variable"].values[0, 0])
+        self.assertEqual(np.uint16, ds2["array_variable"].encoding["dtype"])
+
+        ds3 = cache.get_template("test", self.test_variables, {"dim1": 20, "dim2": 30})
+        self.assertEqual(2, mock_add_variables.call_count)
+        self.assertEqual((20, 30), ds3["array_variable"].shape)
+
+    def test_get_template_placeholders(self):
+        cache = TemplateCache()
+
+        ds1 = cache.get_template("test", self.test_variables, {"dim1": 25, "dim2": 30}, placeholders=True)
+        ds2 = cache.get_template("test", self.test_variables, {"dim1": 25, "dim2": 30}, placeholders=True)
+
+        self.assertTrue(DatasetUtil.is_placeholder(ds1["array_variable"]))
+        ds1["array_variable"].values = np.ones((25, 30))
+        self.assertFalse(DatasetUtil.is_placeholder(ds1["array_variable"]))
+        self.assertTrue(DatasetUtil.is_placeholder(ds2["array_variable"]))
+
+        ds3 = cache.get_template("test", self.test_variables, {"dim1": 25, "dim2": 30})
+        self.assertFalse(DatasetUtil.is_placeholder(ds3["array_variable"]))
+
+    def test_get_template_max_templates(self):
+        cache = TemplateCache(max_templates=2)
+
+        for n in range(3):
+            cache.get_template("test", self.test_variables, {"dim1": n + 1, "dim2": 30})
+
+        self.assertEqual(2, len(cache._skeletons))
+
+
 if __name__ == '__main__':
     unittest.main()
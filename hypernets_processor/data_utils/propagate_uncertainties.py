@@ -5,8 +5,10 @@ Averaging class
 from hypernets_processor.version import __version__
 from hypernets_processor.data_io.dataset_util import DatasetUtil
 from hypernets_processor.data_io.data_templates import DataTemplates
+from hypernets_processor.utils.profiling import profile_method
 import punpy
 import numpy as np
+import scipy.sparse
 import warnings
 
 '''___Authorship___'''
@@ -156,6 +158,7 @@ class PropagateUnc:
                 corr_indep.append(None)
         return inputs, corr_indep
 
+    @profile_method("mc_propagation")
     def process_measurement_function_l1a(self, measurandstring, dataset,
                                      measurement_function, input_quantities,
                                      u_random_input_quantities,
@@ -207,30 +210,47 @@ class PropagateUnc:
 
         return dataset
 
+    @profile_method("mc_propagation")
     def process_measurement_function_l1(self,measurandstring,dataset,measurement_function,
                                      input_quantities,u_random_input_quantities,
                                      u_systematic_input_quantities_indep,
                                      u_systematic_input_quantities_corr,
                                      corr_systematic_input_quantities_indep,
                                      corr_systematic_input_quantities_corr,
-                                     param_fixed=None):
+                                     param_fixed=None,linear_operator=None):
 
         measurand = measurement_function(*input_quantities)
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            u_random_measurand = self.prop.propagate_random(measurement_function,
-                                                            input_quantities,
-                                                            u_random_input_quantities,
-                                                        param_fixed=param_fixed)
-            u_syst_measurand_indep,corr_syst_measurand_indep = self.prop.propagate_systematic(
-                measurement_function,input_quantities,
-                u_systematic_input_quantities_indep,
-                corr_x=corr_systematic_input_quantities_indep,return_corr=True,
-                corr_axis=0,param_fixed=param_fixed)
-            u_syst_measurand_corr,corr_syst_measurand_corr = self.prop.propagate_systematic(
-                measurement_function,input_quantities,u_systematic_input_quantities_corr,
-                corr_x=corr_systematic_input_quantities_corr,return_corr=True,
-                corr_axis=0,param_fixed=param_fixed)
+        if linear_operator is not None:
+            # measurement function is linear in the measured quantities, so propagate
+            # exactly instead of with MC
+            operators = linear_operator(*input_quantities)
+            u_random_measurand = self.propagate_random_linear(
+                operators,u_random_input_quantities)
+            u_syst_measurand_indep,corr_syst_measurand_indep = self.propagate_systematic_linear(
+                operators,u_systematic_input_quantities_indep,
+                corr_systematic_input_quantities_indep)
+            u_syst_measurand_corr,corr_syst_measurand_corr = self.propagate_systematic_linear(
+                operators,u_systematic_input_quantities_corr,
+                corr_systematic_input_quantities_corr)
+            u_random_measurand = u_random_measurand.reshape(measurand.shape)
+            u_syst_measurand_indep = u_syst_measurand_indep.reshape(measurand.shape)
+            u_syst_measurand_corr = u_syst_measurand_corr.reshape(measurand.shape)
+        else:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                u_random_measurand = self.prop.propagate_random(measurement_function,
+                                                                input_quantities,
+                                                                u_random_input_quantities,
+                                                                param_fixed=param_fixed)
+                u_syst_measurand_indep,corr_syst_measurand_indep = self.prop.propagate_systematic(
+                    measurement_function,input_quantities,
+                    u_systematic_input_quantities_indep,
+                    corr_x=corr_systematic_input_quantities_indep,return_corr=True,
+                    corr_axis=0,param_fixed=param_fixed)
+                u_syst_measurand_corr,corr_syst_measurand_corr = self.prop.propagate_systematic(
+                    measurement_function,input_quantities,u_systematic_input_quantities_corr,
+                    corr_x=corr_systematic_input_quantities_corr,return_corr=True,
+                    corr_axis=0,param_fixed=param_fixed)
         dataset[measurandstring].values = measurand
         dataset["u_random_"+measurandstring].values = u_random_measurand
         dataset["u_systematic_indep_"+measurandstring].values = u_syst_measurand_indep
@@ -244,6 +264,95 @@ class PropagateUnc:
 
         return dataset
 
+    @staticmethod
+    def _split_operator(operator,u_x):
+        """
+        returns the (A, B) matrices of a linear operator for input uncertainties u_x,
+        replacing identities given as None with sparse identity matrices
+
+        :param operator: (A, B) such that the measurand is A.x.B
+        :type operator: tuple
+        :param u_x: uncertainty on input quantity, with wavelength as first dimension
+        :type u_x: numpy.ndarray
+        :return: A, B
+        :rtype: scipy.sparse.csr_matrix, scipy.sparse.csr_matrix
+        """
+        u_x = u_x.reshape((u_x.shape[0],-1))
+        A,B = operator
+        A = scipy.sparse.identity(u_x.shape[0],format="csr") if A is None else scipy.sparse.csr_matrix(A)
+        B = scipy.sparse.identity(u_x.shape[1],format="csr") if B is None else scipy.sparse.csr_matrix(B)
+        return A,B,u_x
+
+    def propagate_random_linear(self,operators,u_random_input_quantities):
+        """
+        returns the random uncertainty on a measurand that is a linear operator of
+        its input quantities, with input errors uncorrelated between all elements
+
+        :param operators: (A, B) per input quantity, such that the measurand is the
+        sum of A.x.B over the input quantities (None for not propagated quantities)
+        :type operators: list
+        :param u_random_input_quantities: random uncertainties on input quantities
+        :type u_random_input_quantities: list
+        :return: random uncertainty on measurand
+        :rtype: numpy.ndarray
+        """
+        var_y = 0.
+        for operator,u_x in zip(operators,u_random_input_quantities):
+            if (operator is None) or (u_x is None):
+                continue
+            A,B,u_x = self._split_operator(operator,u_x)
+            var_y = var_y+(A.multiply(A)).dot((B.T.multiply(B.T)).dot((u_x**2).T).T)
+        return np.sqrt(var_y)
+
+    def propagate_systematic_linear(self,operators,u_systematic_input_quantities,
+                                    corr_systematic_input_quantities):
+        """
+        returns the systematic uncertainty and wavelength error-correlation matrix on a
+        measurand that is a linear operator of its input quantities. Input errors are
+        fully correlated along the second dimension and correlated along wavelength by
+        the given correlation matrix, so the measurand covariance for each column j is
+        the sum over inputs of A.D_j.corr_x.D_j.A^T, with D_j = diag((u_x.B)[:,j]).
+
+        :param operators: (A, B) per input quantity, such that the measurand is the
+        sum of A.x.B over the input quantities (None for not propagated quantities)
+        :type operators: list
+        :param u_systematic_input_quantities: systematic uncertainties on input quantities
+        :type u_systematic_input_quantities: list
+        :param corr_systematic_input_quantities: wavelength error-correlation matrices of
+        input quantities (None for fully correlated)
+        :type corr_systematic_input_quantities: list
+        :return: systematic uncertainty on measurand, error-correlation matrix along
+        wavelength averaged over the second dimension
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+        terms = []
+        for operator,u_x,corr_x in zip(operators,u_systematic_input_quantities,
+                                       corr_systematic_input_quantities):
+            if (operator is None) or (u_x is None):
+                continue
+            A,B,u_x = self._split_operator(operator,u_x)
+            if corr_x is None:
+                corr_x = np.ones((u_x.shape[0],u_x.shape[0]))
+            terms.append((A,B.T.dot(u_x.T).T,corr_x))
+
+        n_cols = terms[0][1].shape[1]
+        u_y = np.empty((terms[0][0].shape[0],n_cols))
+        corr_y = np.zeros((terms[0][0].shape[0],terms[0][0].shape[0]))
+        for j in range(n_cols):
+            cov_j = 0.
+            for A,v,corr_x in terms:
+                AD = A.multiply(v[:,j][None,:]).tocsr()
+                cov_j = cov_j+AD.dot(AD.dot(corr_x).T)
+            u_y[:,j] = np.sqrt(np.diag(cov_j))
+            with np.errstate(divide="ignore",invalid="ignore"):
+                corr_j = cov_j/np.outer(u_y[:,j],u_y[:,j])
+            corr_j[~np.isfinite(corr_j)] = 0.
+            np.fill_diagonal(corr_j,1.)
+            corr_y += corr_j
+
+        return u_y,corr_y/n_cols
+
+    @profile_method("mc_propagation")
     def process_measurement_function_l2(self, measurandstrings,
                                         dataset,
                                         measurement_function,
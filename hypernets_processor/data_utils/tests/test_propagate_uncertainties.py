@@ -0,0 +1,94 @@
+"""
+Tests for PropagateUnc class
+"""
+
+import unittest
+from hypernets_processor.version import __version__
+from hypernets_processor.data_utils.propagate_uncertainties import PropagateUnc
+from hypernets_processor.interpolation.measurement_functions.interpolate_wav_linear import InterpolationWavLinear
+from hypernets_processor.interpolation.measurement_functions.interpolate_time_linear import InterpolationTimeLinear
+from hypernets_processor.combine_SWIR.measurement_functions.step_combine import StepCombine
+import numpy as np
+
+'''___Authorship___'''
+__author__ = "Pieter De Vis"
+__created__ = "19/10/2026"
+__version__ = __version__
+__maintainer__ = "Pieter De Vis"
+__email__ = "pieter.de.vis@npl.co.uk"
+__status__ = "Development"
+
+
+def dense_systematic_covariance(A, B, u_x, corr_x):
+    """
+    Returns full covariance of vec(A.x.B) for systematic errors, built explicitly
+    """
+    n_in, n_k = u_x.shape
+    cov_x = np.empty((n_in, n_k, n_in, n_k))
+    for k in range(n_k):
+        for m in range(n_k):
+            cov_x[:, k, :, m] = np.outer(u_x[:, k], u_x[:, m])*corr_x
+    cov_x = cov_x.reshape((n_in*n_k, n_in*n_k))
+    M = np.kron(A, B.T)
+    return M.dot(cov_x).dot(M.T)
+
+
+class TestPropagateUnc(unittest.TestCase):
+
+    def setUp(self):
+        self.prop = PropagateUnc(None, 10, parallel_cores=0)
+        rng = np.random.default_rng(0)
+        self.wavs_in = np.linspace(400., 500., 11)
+        self.times_in = np.array([0., 10., 20., 30.])
+        self.x = rng.uniform(1., 2., (11, 4))
+        self.u_x = rng.uniform(0.01, 0.1, (11, 4))
+        self.corr_x = 0.5*np.eye(11)+0.5*np.ones((11, 11))
+
+    def test_propagate_random_linear_wav(self):
+        wavs_out = np.linspace(395., 505., 7)
+        mf = InterpolationWavLinear()
+        operators = mf.linear_operator(wavs_out, self.wavs_in, self.x)
+        A = operators[2][0].toarray()
+
+        np.testing.assert_allclose(A.dot(self.x), mf.function(wavs_out, self.wavs_in, self.x))
+
+        u_y = self.prop.propagate_random_linear(operators, [None, None, self.u_x])
+        np.testing.assert_allclose(u_y, np.sqrt((A**2).dot(self.u_x**2)))
+
+    def test_propagate_systematic_linear_time(self):
+        times_out = np.array([-5., 5., 12., 29., 35.])
+        mf = InterpolationTimeLinear()
+        operators = mf.linear_operator(times_out, self.times_in, self.x)
+        B = operators[2][1].toarray()
+
+        np.testing.assert_allclose(self.x.dot(B), mf.function(times_out, self.times_in, self.x))
+
+        u_y, corr_y = self.prop.propagate_systematic_linear(operators, [None, None, self.u_x],
+                                                            [None, None, self.corr_x])
+        cov_y = dense_systematic_covariance(np.eye(11), B, self.u_x, self.corr_x)
+        np.testing.assert_allclose(u_y.ravel(), np.sqrt(np.diag(cov_y)))
+        np.testing.assert_allclose(corr_y, self.corr_x)
+
+    def test_propagate_systematic_linear_combine(self):
+        wavs_swir = np.linspace(480., 600., 13)
+        x_swir = self.x[:, :4].repeat(2, axis=0)[:13]
+        u_swir = self.u_x.repeat(2, axis=0)[:13]
+        mf = StepCombine()
+        operators = mf.linear_operator(self.wavs_in, self.x, wavs_swir, x_swir, 470.)
+
+        np.testing.assert_allclose(operators[1][0].dot(self.x)+operators[3][0].dot(x_swir),
+                                   mf.function(self.wavs_in, self.x, wavs_swir, x_swir, 470.))
+
+        u_y, corr_y = self.prop.propagate_systematic_linear(
+            operators, [None, self.u_x, None, u_swir, None],
+            [None, self.corr_x, None, np.eye(13), None])
+
+        np.testing.assert_allclose(u_y[:8], self.u_x[:8])
+        np.testing.assert_allclose(u_y[8:], u_swir)
+        np.testing.assert_allclose(corr_y[:8, :8], self.corr_x[:8, :8])
+        np.testing.assert_allclose(corr_y[8:, 8:], np.eye(13))
+        np.testing.assert_allclose(corr_y[:8, 8:], 0.)
+
+
+if __name__ == '__main__':
+    unittest.main()
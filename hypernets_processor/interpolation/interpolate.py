@@ -8,6 +8,7 @@ from hypernets_processor.data_io.hypernets_writer import HypernetsWriter
 from hypernets_processor.plotting.plotting import Plotting
 from hypernets_processor.interpolation.measurement_functions.interpolation_factory import InterpolationFactory
 from hypernets_processor.data_utils.propagate_uncertainties import PropagateUnc
+from hypernets_processor.utils.profiling import profile_method
 
 import punpy
 import numpy as np
@@ -76,6 +77,7 @@ class Interpolate:
 
         return dataset_l1c
 
+    @profile_method("interpolation")
     def interpolate_irradiance(self,dataset_l1c,dataset_l1b_irr):
         measurement_function_interpolate_wav = self.context.get_config_value(
             'measurement_function_interpolate_wav')
@@ -101,6 +103,7 @@ class Interpolate:
             [None,None,dataset_l1b_irr['u_systematic_corr_rad_irr_irradiance'].values],
             [None,None,dataset_l1b_irr["corr_systematic_indep_irradiance"].values],
             [None,None,dataset_l1b_irr["corr_systematic_corr_rad_irr_irradiance"].values],
+            linear_operator=getattr(interpolation_function_wav,"linear_operator",None),
             )
 
         # Interpolate in time to radiance times
@@ -115,9 +118,11 @@ class Interpolate:
             [None,None,dataset_l1c_temp['u_systematic_corr_rad_irr_irradiance'].values],
             [None,None,dataset_l1c_temp["corr_systematic_indep_irradiance"].values],
             [None,None,dataset_l1c_temp["corr_systematic_corr_rad_irr_irradiance"].values],
-            param_fixed=[False,True,True])
+            param_fixed=[False,True,True],
+            linear_operator=getattr(interpolation_function_time,"linear_operator",None))
         return dataset_l1c
 
+    @profile_method("interpolation")
     def interpolate_skyradiance(self,dataset_l1c,dataset_l1a_skyrad):
         measurement_function_interpolate_time = self.context.get_config_value(
             'measurement_function_interpolate_time')
@@ -140,6 +145,7 @@ class Interpolate:
                                                             'u_systematic_corr_rad_irr_radiance'].values],
                                                         [None,None,dataset_l1a_skyrad["corr_systematic_indep_radiance"].values],
                                                         [None,None,dataset_l1a_skyrad["corr_systematic_corr_rad_irr_radiance"].values],
-                                                        param_fixed=[False,True,True])
+                                                        param_fixed=[False,True,True],
+                                                        linear_operator=getattr(interpolation_function_time,"linear_operator",None))
         return dataset_l1c
 
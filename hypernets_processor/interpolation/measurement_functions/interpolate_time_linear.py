@@ -2,6 +2,7 @@
 
 import scipy.interpolate
 import numpy as np
+from hypernets_processor.interpolation.measurement_functions.linear_interpolation_matrix import linear_interpolation_matrix
 
 class InterpolationTimeLinear:
     def function(self,output_time,times,variables):
@@ -30,6 +31,15 @@ class InterpolationTimeLinear:
                 out = irradiance_intfunc(output_time)
         return out
 
+    def linear_operator(self,output_time,times,variables):
+        '''
+        Returns the linear operator of the measurement function for each argument,
+        as (A, B) such that out = A.variables.B (None for identity, or for arguments
+        that are not propagated).
+        '''
+        interp_matrix = linear_interpolation_matrix(times,output_time,extrapolate=False)
+        return [None,None,(None,interp_matrix.T)]
+
     @staticmethod
     def get_name():
         return "InterpolationTimeLinear"
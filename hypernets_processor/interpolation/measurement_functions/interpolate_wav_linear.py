@@ -2,6 +2,7 @@
 
 import scipy.interpolate
 import numpy as np
+from hypernets_processor.interpolation.measurement_functions.linear_interpolation_matrix import linear_interpolation_matrix
 
 class InterpolationWavLinear:
     def function(self,rad_wavs,irr_wavs,irr):
@@ -14,6 +15,13 @@ class InterpolationWavLinear:
         out = irradiance_intfunc(rad_wavs)
         return out
 
+    def linear_operator(self,rad_wavs,irr_wavs,irr):
+        '''
+        Returns the linear operator of the measurement function for each argument,
+        as (A, B) such that out = A.irr.B (None for identity, or for arguments
+        that are not propagated).
+        '''
+        return [None,None,(linear_interpolation_matrix(irr_wavs,rad_wavs),None)]
 
     @staticmethod
     def get_name():
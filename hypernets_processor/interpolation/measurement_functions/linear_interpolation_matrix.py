@@ -0,0 +1,37 @@
+import numpy as np
+import scipy.sparse
+
+
+def linear_interpolation_matrix(x_in, x_out, extrapolate=True):
+    '''
+    Returns the sparse matrix A such that A.dot(y) linearly interpolates y, sampled at
+    x_in, to x_out (along the first axis of y). Outside the range of x_in the end
+    segments are extrapolated if extrapolate is True, otherwise the nearest end value
+    is used. With a single x_in, its value is used for all of x_out.
+    '''
+    x_in = np.asarray(x_in, dtype=float)
+    x_out = np.atleast_1d(np.asarray(x_out, dtype=float))
+
+    # single input value is used for all outputs
+    if len(x_in) == 1:
+        return scipy.sparse.csr_matrix(np.ones((len(x_out), 1)))
+
+    order = np.argsort(x_in, kind="stable")
+    x_sorted = x_in[order]
+
+    k = np.searchsorted(x_sorted, x_out, side="right") - 1
+    k = np.clip(k, 0, len(x_sorted) - 2)
+    width = x_sorted[k + 1] - x_sorted[k]
+
+    # zero width segments (repeated x_in at the ends) use the nearest end value
+    zero_width = width == 0.
+    w = np.where(zero_width, (x_out > x_sorted[k]).astype(float),
+                 (x_out - x_sorted[k]) / np.where(zero_width, 1., width))
+    if not extrapolate:
+        w = np.clip(w, 0., 1.)
+
+    rows = np.concatenate((np.arange(len(x_out)), np.arange(len(x_out))))
+    cols = np.concatenate((order[k], order[k + 1]))
+    vals = np.concatenate((1. - w, w))
+
+    return scipy.sparse.csr_matrix((vals, (rows, cols)), shape=(len(x_out), len(x_in)))
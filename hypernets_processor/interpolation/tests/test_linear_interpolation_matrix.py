@@ -0,0 +1,56 @@
+"""
+Tests for linear_interpolation_matrix module
+"""
+
+import unittest
+from hypernets_processor.version import __version__
+from hypernets_processor.interpolation.measurement_functions.linear_interpolation_matrix import \
+    linear_interpolation_matrix
+import numpy as np
+
+'''___Authorship___'''
+__author__ = "Pieter De Vis"
+__created__ = "19/10/2026"
+__version__ = __version__
+__maintainer__ = "Pieter De Vis"
+__email__ = "pieter.de.vis@npl.co.uk"
+__status__ = "Development"
+
+
+class TestLinearInterpolationMatrix(unittest.TestCase):
+
+    def test_linear_interpolation_matrix(self):
+        x_in = np.array([30., 0., 10., 20.])
+        y = np.array([3., 0., 1., 2.])
+        x_out = np.array([-5., 0., 5., 12., 30., 35.])
+
+        A = linear_interpolation_matrix(x_in, x_out)
+        np.testing.assert_allclose(A.dot(y), x_out / 10.)
+
+        A = linear_interpolation_matrix(x_in, x_out, extrapolate=False)
+        np.testing.assert_allclose(A.dot(y), np.clip(x_out, 0., 30.) / 10.)
+
+    def test_linear_interpolation_matrix_single(self):
+        A = linear_interpolation_matrix([10.], [5., 10., 15.])
+
+        np.testing.assert_array_equal(A.toarray(), np.ones((3, 1)))
+
+        # uncertainty propagated without nan
+        u_y = np.sqrt((A.multiply(A)).dot(np.array([0.1]) ** 2))
+        np.testing.assert_allclose(u_y, 0.1)
+
+    def test_linear_interpolation_matrix_repeated(self):
+        x_in = np.array([0., 0., 10., 20., 20.])
+        y = np.array([0., 0., 1., 2., 2.])
+        x_out = np.array([-5., 0., 5., 10., 15., 20., 25.])
+
+        for extrapolate in [True, False]:
+            A = linear_interpolation_matrix(x_in, x_out, extrapolate=extrapolate)
+
+            self.assertTrue(np.all(np.isfinite(A.toarray())))
+            np.testing.assert_allclose(A.sum(axis=1), 1.)
+            np.testing.assert_allclose(A.dot(y), np.clip(x_out, 0., 20.) / 10.)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+"""
+Main function for benchmarking product encoding profiles
+"""
+
+from hypernets_processor.version import __version__
+from hypernets_processor.data_io.hypernets_writer import HypernetsWriter
+import xarray
+import os
+
+
+'''___Authorship___'''
+__author__ = "Sam Hunt"
+__created__ = "19/10/2026"
+__version__ = __version__
+__maintainer__ = "Sam Hunt"
+__email__ = "sam.hunt@npl.co.uk"
+__status__ = "Development"
+
+
+def main(product_path, directory=None, profiles=None):
+    """
+    Main function to benchmark writing a product with each encoding profile
+
+    :type product_path: str
+    :param product_path: path of netcdf product to benchmark with
+
+    :type directory: str
+    :param directory: (optional) directory to write benchmark files to (default is the product directory)
+
+    :type profiles: list
+    :param profiles: (optional) names of encoding profiles to benchmark (default is all)
+
+    :return: benchmark report, with write time, read time and file size by profile
+    :rtype: str
+    """
+
+    with xarray.open_dataset(product_path) as ds:
+        ds.load()
+
+    # keep only packing of read encoding, so storage is set by the benchmarked profile
+    for variable in ds.variables.values():
+        variable.encoding = {k: v for k, v in variable.encoding.items()
+                             if k in ("dtype", "scale_factor", "add_offset", "_FillValue")}
+
+    if directory is None:
+        directory = os.path.dirname(os.path.abspath(product_path))
+
+    results = HypernetsWriter.benchmark_encoding_profiles(ds, directory, profiles=profiles)
+
+    return "\n".join("{:<8} write: {:.3f} s  read: {:.3f} s  size: {:.1f} kB".format(
+        profile, result["write_time"], result["read_time"], result["size"] / 1e3)
+        for profile, result in results.items())
+
+
+if __name__ == "__main__":
+    pass
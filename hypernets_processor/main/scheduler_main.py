@@ -32,7 +32,8 @@ def unpack_scheduler_config(scheduler_config):
     * seconds (int) - Scheduled job repeat interval in seconds, default None (if not None minutes and hours are None)
     * minutes (int) - Scheduled job repeat interval in minutes, default None (if not None seconds and hours are None)
     * hours (int) - Scheduled job repeat interval in hour, default None (if not None seconds and minutes are None)
-    * start_time (datetime.datetime) - Scheduled time to start running tasks, default None (means start now)
+    * start_time (str) - Scheduled time to start running tasks, as ISO format date time or time of day (e.g. "12:00"),
+      default None (means start now)
     * parallel (bool) - Switch to run scheduled jobs on different threads, default False
     * jobs_list (str) - Path of jobs list file, to run on schedule
 
@@ -52,15 +53,13 @@ def unpack_scheduler_config(scheduler_config):
         scheduler_config_dict[sch]["minutes"] = get_config_value(scheduler_config, sch, "minutes", dtype=int)
         scheduler_config_dict[sch]["hours"] = get_config_value(scheduler_config, sch, "hours", dtype=int)
         scheduler_config_dict[sch]["start_time"] = get_config_value(scheduler_config, sch, "start_time", dtype=str)
-        scheduler_config_dict[sch]["parallel"] = get_config_value(scheduler_config, sch, "seconds", dtype=bool)
+        scheduler_config_dict[sch]["parallel"] = get_config_value(scheduler_config, sch, "parallel", dtype=bool)
 
         # Use custom jobs list provided, else use default
         scheduler_config_dict[sch]["jobs_list"] = get_config_value(scheduler_config, sch, "jobs_list", dtype=str)
         if scheduler_config_dict[sch]["jobs_list"] is None:
             scheduler_config_dict[sch]["jobs_list"] = JOBS_FILE_PATH
 
-        # todo - sort out start time format
-
         # Checks
         # Check only have hours, minutes or seconds
         intervals = [scheduler_config_dict[sch]["seconds"], scheduler_config_dict[sch]["minutes"],
@@ -83,12 +82,16 @@ def main(scheduler_config_path):
 
     logger = configure_logging(config=scheduler_config, name=__name__)
 
+    # maximum number of parallel jobs running at the same time, default min(32, cpu count + 4) (the
+    # ThreadPoolExecutor default)
+    max_parallel_jobs = get_config_value(scheduler_config, "Processor Schedule", "max_parallel_jobs", dtype=int)
+
     scheduler_config = unpack_scheduler_config(scheduler_config)
 
     jobs_list = read_jobs_list(scheduler_config["Processor Schedule"]["jobs_list"])
 
     # schedule jobs
-    processor_sch = Scheduler(logger=logger)
+    processor_sch = Scheduler(logger=logger, max_workers=max_parallel_jobs)
 
     for job_config_path in jobs_list:
 
@@ -3,12 +3,20 @@ Module with main to run sequence file processing chain
 """
 
 from hypernets_processor.version import __version__
-from hypernets_processor.utils.config import read_config_file
+from hypernets_processor.utils.config import read_config_file, get_config_value
 from hypernets_processor.utils.logging import configure_logging
 from hypernets_processor.utils.paths import parse_sequence_path
 from hypernets_processor.context import Context
+from hypernets_processor.data_io.database_util import DatabaseUtil
+from hypernets_processor.data_io.hypernets_db_builder import open_database
+from hypernets_processor.utils.profiling import format_profile_report
 from hypernets_processor.sequence_processor import SequenceProcessor
+from concurrent.futures import ProcessPoolExecutor
+from logging.handlers import BufferingHandler
+import cProfile
+import logging
 import os
+import sys
 import traceback
 
 """___Authorship___"""
@@ -19,6 +27,9 @@ __maintainer__ = "Sam Hunt"
 __email__ = "sam.hunt@npl.co.uk"
 __status__ = "Development"
 
+# state of a parallel processing worker process, set by init_worker
+_worker = {}
+
 
 def get_target_sequences(context, to_archive):
     """
@@ -46,30 +57,19 @@ def get_target_sequences(context, to_archive):
                     os.path.join(context.get_config_value("raw_data_directory"), path)
                 )
 
-    # If adding to archive, remove previously processed paths from list by referencing
-    # archive db
-
-    if to_archive is True:
-        processed_products = [
-            product["sequence_name"]
-            for product in context.archive_db["products"].find(
-                site_id=context.get_config_value("site_id")
-            )
-        ]
-
-        failed_products = [
-            anomaly["sequence_name"]
-            for anomaly in context.anomaly_db["anomalies"].find(
-                site_id=context.get_config_value("site_id")
-            )
-        ]
+    # If adding to archive, remove previously processed (or failed) paths from list, by
+    # anti-join against archive and anomaly db in the database
 
-        complete_products = processed_products + failed_products
+    if (to_archive is True) and (raw_paths != []):
+        site_id = context.get_config_value("site_id")
 
         directory = os.path.dirname(raw_paths[0])
 
         raw_products = [os.path.basename(raw_path) for raw_path in raw_paths]
-        raw_products = list(set(raw_products) - set(complete_products))
+        raw_products = context.archive_db.get_new_sequences(raw_products, site_id)
+        raw_products = DatabaseUtil.find_missing_values(
+            context.anomaly_db, "anomalies", "sequence_name", raw_products, site_id=site_id
+        )
         raw_paths = [
             os.path.join(directory, raw_product) for raw_product in raw_products
         ]
@@ -77,7 +77,177 @@ def get_target_sequences(context, to_archive):
     return raw_paths
 
 
-def main(processor_config_path, job_config_path, to_archive):
+def open_metrics_db(context):
+    """
+    Opens metrics database to record sequence processing time and memory use to, if not already opened by the context
+    (i.e. if the "metrics_db_url" config value is not set) a local sqlite database in the job (or processor) working
+    directory is used
+
+    :type context: hypernets_processor.context.Context
+    :param context: processor context
+    """
+
+    if context.metrics_db is not None:
+        return
+
+    working_directory = context.get_config_value("job_working_directory")
+    if working_directory is None:
+        working_directory = context.get_config_value("processor_working_directory")
+    if working_directory is None:
+        working_directory = os.getcwd()
+
+    context.metrics_db = open_database(
+        "sqlite:///" + os.path.join(os.path.abspath(working_directory), "metrics.db"),
+        db_format="metrics",
+        context=context
+    )
+
+
+def process_target_sequence(sp, context, target_sequence):
+    """
+    Processes a target sequence, adding an anomaly to the anomaly database if processing fails.
+    Processing time and memory use are recorded by the context profiler, and added to the
+    metrics database if set. If the "profile" config value is True memory allocations are
+    also traced.
+
+    :type sp: hypernets_processor.sequence_processor.SequenceProcessor
+    :param sp: sequence processor
+
+    :type context: hypernets_processor.context.Context
+    :param context: processor context
+
+    :type target_sequence: str
+    :param target_sequence: sequence path
+
+    :return: True if sequence successfully processed
+    :rtype: bool
+    """
+
+    context.logger.info("Processing sequence: " + target_sequence)
+
+    # archive rows of sequence are added in one transaction
+    to_archive = (context.get_config_value("to_archive") is True) and (context.archive_db is not None)
+    if to_archive:
+        context.archive_db.begin_sequence()
+
+    context.profiler.start_sequence(trace_allocations=context.get_config_value("profile") is True)
+
+    try:
+        sp.process_sequence(target_sequence)
+        context.logger.info("Complete")
+        passed = True
+    except Exception as e:
+        context.logger.error("Failed: " + repr(e))
+        context.logger.debug(traceback.format_exc())
+        context.anomaly_db.add_x_anomaly()
+        passed = False
+
+    context.profiler.stop_sequence()
+
+    if to_archive:
+        context.archive_db.add_sequence("processed" if passed else "failed")
+        context.archive_db.commit_sequence()
+
+    if context.metrics_db is not None:
+        context.metrics_db.add_sequence_metrics(
+            context.profiler.metrics(), "processed" if passed else "failed"
+        )
+
+    return passed
+
+
+def init_worker(processor_config_path, job_config_path, to_archive, name, profile=False,
+                profile_stats_path=None):
+    """
+    Initialises parallel processing worker process, with its own context (and so database
+    connections), sequence processor and caches. Log records are buffered so they can be
+    passed back to the main process. Unless the "parallel_stages" config value is set, the
+    stages of each sequence are run serially, so as not to oversubscribe the CPUs.
+
+    :type processor_config_path: str
+    :param processor_config_path: processor configuration file path
+
+    :type job_config_path: str
+    :param job_config_path: job configuration file path
+
+    :type to_archive: bool
+    :param to_archive: switch for if to add processed data to data archive
+
+    :type name: str
+    :param name: job logger name
+
+    :type profile: bool
+    :param profile: switch to record processing time and memory use, see main
+
+    :type profile_stats_path: str
+    :param profile_stats_path: (optional) path to write cProfile stats of worker to, suffixed
+    with the worker process id
+    """
+
+    processor_config = read_config_file(processor_config_path)
+    job_config = read_config_file(job_config_path)
+
+    logger = logging.getLogger(name + ".worker" + str(os.getpid()))
+    if get_config_value(job_config, "Log", "verbose", dtype=bool):
+        logger.setLevel(logging.DEBUG)
+    elif get_config_value(job_config, "Log", "quiet", dtype=bool):
+        logger.setLevel(logging.WARNING)
+    else:
+        logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = BufferingHandler(sys.maxsize)
+    logger.addHandler(handler)
+
+    context = Context(
+        processor_config=processor_config, job_config=job_config, logger=logger
+    )
+    context.set_config_value("to_archive", to_archive)
+    context.set_config_value("profile", profile)
+    if profile:
+        open_metrics_db(context)
+
+    # sequences already processed in parallel, so unless configured run their stages serially
+    if context.get_config_value("parallel_stages") is None:
+        context.set_config_value("parallel_stages", 1)
+
+    _worker["context"] = context
+    _worker["sp"] = SequenceProcessor(context=context)
+    _worker["log_handler"] = handler
+    _worker["cprofile"] = cProfile.Profile() if profile_stats_path is not None else None
+    _worker["profile_stats_path"] = profile_stats_path
+
+
+def process_target_sequence_worker(target_sequence):
+    """
+    Processes a target sequence in a parallel processing worker process
+
+    :type target_sequence: str
+    :param target_sequence: sequence path
+
+    :return: success of processing, log records, as (level, message), and profiler records
+    for the sequence
+    :rtype: tuple
+    """
+
+    cprofile = _worker["cprofile"]
+    if cprofile is not None:
+        cprofile.enable()
+
+    passed = process_target_sequence(_worker["sp"], _worker["context"], target_sequence)
+
+    if cprofile is not None:
+        cprofile.disable()
+        cprofile.dump_stats(_worker["profile_stats_path"] + "." + str(os.getpid()))
+
+    handler = _worker["log_handler"]
+    records = [(record.levelno, record.getMessage()) for record in handler.buffer]
+    handler.flush()
+
+    return passed, records, _worker["context"].profiler.metrics()
+
+
+def main(processor_config_path, job_config_path, to_archive, parallel_sequences=None,
+         profile=False, profile_stats_path=None):
     """
     Main function to run processing chain for sequence files
 
@@ -89,6 +259,23 @@ def main(processor_config_path, job_config_path, to_archive):
 
     :type to_archive: bool
     :param to_archive: switch for if to add processed data to data archive
+
+    :type parallel_sequences: int
+    :param parallel_sequences: (optional) number of worker processes to process sequences
+    with, if not set the "parallel_sequences" config value is used (default 1, i.e. serial
+    processing)
+
+    :type profile: bool
+    :param profile: switch to trace memory allocations, record processing time and memory use
+    of each sequence to the metrics database (see open_metrics_db) and report by processing
+    stage
+
+    :type profile_stats_path: str
+    :param profile_stats_path: (optional) path to write cProfile stats of processing to, if
+    processing in parallel written by each worker process, suffixed with its process id
+
+    :return: processing status message, followed by the report by processing stage if profiling
+    :rtype: str
     """
 
     processor_config = read_config_file(processor_config_path)
@@ -106,34 +293,66 @@ def main(processor_config_path, job_config_path, to_archive):
         processor_config=processor_config, job_config=job_config, logger=logger
     )
     context.set_config_value("to_archive", to_archive)
+    context.set_config_value("profile", profile)
+    if profile:
+        open_metrics_db(context)
+
     # Determine target sequences
     target_sequences = get_target_sequences(context, to_archive)
 
+    if parallel_sequences is None:
+        parallel_sequences = context.get_config_value("parallel_sequences")
+    parallel_sequences = 1 if parallel_sequences is None else int(parallel_sequences)
+
     # Run processor
     sp = SequenceProcessor(context=context)
     target_sequences_passed = 0
     target_sequences_total = len(target_sequences)
+    metrics = []
 
     if target_sequences_total == 0:
         msg = "No sequences to process"
 
+    elif parallel_sequences > 1:
+        initargs = (processor_config_path, job_config_path, to_archive, name, profile,
+                    profile_stats_path)
+        with ProcessPoolExecutor(
+                max_workers=min(parallel_sequences, target_sequences_total),
+                initializer=init_worker,
+                initargs=initargs
+        ) as executor:
+
+            # results are returned in sequence order, so the log of each sequence is kept together
+            for passed, records, sequence_metrics in executor.map(
+                    process_target_sequence_worker, target_sequences
+            ):
+                for level, message in records:
+                    logger.log(level, message)
+                target_sequences_passed += int(passed)
+                metrics.append(sequence_metrics)
+
+        msg = str(target_sequences_passed) + "/" + str(target_sequences_total) + \
+              " sequences successfully processed"
+
     else:
-        for target_sequence in target_sequences:
+        cprofile = cProfile.Profile() if profile_stats_path is not None else None
+        if cprofile is not None:
+            cprofile.enable()
 
-            context.logger.info("Processing sequence: " + target_sequence)
+        for target_sequence in target_sequences:
+            target_sequences_passed += int(process_target_sequence(sp, context, target_sequence))
+            metrics.append(context.profiler.metrics())
 
-            try:
-                sp.process_sequence(target_sequence)
-                target_sequences_passed += 1
-                context.logger.info("Complete")
-            except Exception as e:
-                logger.error("Failed: " + repr(e))
-                logger.debug(traceback.format_exc())
-                context.anomaly_db.add_x_anomaly()
+        if cprofile is not None:
+            cprofile.disable()
+            cprofile.dump_stats(profile_stats_path)
 
         msg = str(target_sequences_passed) + "/" + str(target_sequences_total) + \
               " sequences successfully processed"
 
+    if profile and metrics:
+        msg += "\n\n" + format_profile_report(metrics)
+
     return msg
 
 
@@ -0,0 +1,40 @@
+"""
+Tests for encoding_benchmark_main module
+"""
+
+import unittest
+from hypernets_processor.version import __version__
+from hypernets_processor.main.encoding_benchmark_main import main
+from hypernets_processor.data_io.dataset_util import DatasetUtil
+from xarray import Dataset
+import numpy as np
+import tempfile
+import os
+
+
+'''___Authorship___'''
+__author__ = "Sam Hunt"
+__created__ = "19/10/2026"
+__version__ = __version__
+__maintainer__ = "Sam Hunt"
+__email__ = "sam.hunt@npl.co.uk"
+__status__ = "Development"
+
+
+class TestEncodingBenchmarkMain(unittest.TestCase):
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ds = Dataset()
+            ds["radiance"] = DatasetUtil.create_variable([20, 10], np.float32, dim_names=["wavelength", "series"])
+            ds["radiance"].values = np.random.random((20, 10))
+            product_path = os.path.join(tmpdir, "product.nc")
+            ds.to_netcdf(product_path)
+
+            report = main(product_path, profiles=["fast", "compact"]).split("\n")
+
+            self.assertEqual(["fast", "compact"], [line.split()[0] for line in report])
+            self.assertEqual(["product.nc"], os.listdir(tmpdir))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,8 +5,13 @@ Tests for hypernets_processor_main module
 import unittest
 from unittest.mock import patch
 from hypernets_processor.version import __version__
-from hypernets_processor.main.sequence_processor_main import main, get_target_sequences
-from hypernets_processor.test.test_functions import setup_test_context
+from hypernets_processor.main.sequence_processor_main import main, get_target_sequences, init_worker, _worker
+from hypernets_processor.test.test_functions import (
+    setup_test_context,
+    setup_test_processor_config,
+    setup_test_job_config
+)
+import dataset
 import string
 import random
 import os
@@ -36,6 +41,125 @@ class TestSequenceProcessorMain(unittest.TestCase):
         self.assertTrue(mock_sp.called)
         mock_sp.assert_called_once_with(context=mock_con.return_value)
 
+    def test_main_parallel(self):
+        tmpdir = "tmp_" + "".join(random.choices(string.ascii_lowercase, k=6))
+        processor_config = setup_test_processor_config(
+            archive_directory=os.path.join(tmpdir, "out"),
+            metadata_db_url="sqlite:///" + tmpdir + "/metadata.db",
+            anomaly_db_url="sqlite:///" + tmpdir + "/anomaly.db",
+            archive_db_url="sqlite:///" + tmpdir + "/archive.db",
+        )
+        job_config = setup_test_job_config(raw_data_directory=os.path.join(tmpdir, "data"))
+        job_config["Job"]["job_name"] = "test_main_parallel"
+
+        # empty sequence directories, which fail processing
+        os.makedirs(os.path.join(tmpdir, "data", "SEQ20200311T112230"))
+        os.makedirs(os.path.join(tmpdir, "data", "SEQ20200311T112330"))
+
+        processor_config_path = os.path.join(tmpdir, "processor.config")
+        with open(processor_config_path, "w") as f:
+            processor_config.write(f)
+        job_config_path = os.path.join(tmpdir, "job.config")
+        with open(job_config_path, "w") as f:
+            job_config.write(f)
+
+        msg = main(
+            processor_config_path=processor_config_path,
+            job_config_path=job_config_path,
+            to_archive=False,
+            parallel_sequences=2
+        )
+
+        self.assertEqual(msg, "0/2 sequences successfully processed")
+
+        anomaly_db = dataset.connect("sqlite:///" + tmpdir + "/anomaly.db")
+        anomalies = [anomaly["sequence_name"] for anomaly in anomaly_db["anomalies"].find()]
+        self.assertCountEqual(anomalies, ["SEQ20200311T112230", "SEQ20200311T112330"])
+        anomaly_db.close()
+
+        shutil.rmtree(tmpdir)
+
+    def test_main_profile(self):
+        tmpdir = "tmp_" + "".join(random.choices(string.ascii_lowercase, k=6))
+        processor_config = setup_test_processor_config(
+            archive_directory=os.path.join(tmpdir, "out"),
+            metadata_db_url="sqlite:///" + tmpdir + "/metadata.db",
+            anomaly_db_url="sqlite:///" + tmpdir + "/anomaly.db",
+            archive_db_url="sqlite:///" + tmpdir + "/archive.db",
+        )
+        processor_config["Databases"]["metrics_db_url"] = "sqlite:///" + tmpdir + "/metrics.db"
+        job_config = setup_test_job_config(raw_data_directory=os.path.join(tmpdir, "data"))
+        job_config["Job"]["job_name"] = "test_main_profile"
+
+        # empty sequence directories, which fail processing
+        os.makedirs(os.path.join(tmpdir, "data", "SEQ20200311T112230"))
+        os.makedirs(os.path.join(tmpdir, "data", "SEQ20200311T112330"))
+
+        processor_config_path = os.path.join(tmpdir, "processor.config")
+        with open(processor_config_path, "w") as f:
+            processor_config.write(f)
+        job_config_path = os.path.join(tmpdir, "job.config")
+        with open(job_config_path, "w") as f:
+            job_config.write(f)
+
+        msg = main(
+            processor_config_path=processor_config_path,
+            job_config_path=job_config_path,
+            to_archive=False,
+            profile=True,
+            profile_stats_path=os.path.join(tmpdir, "processing.prof")
+        )
+
+        metrics_db = dataset.connect("sqlite:///" + tmpdir + "/metrics.db")
+        sequences = list(metrics_db["sequences"].find())
+        self.assertCountEqual(
+            [sequence["sequence_name"] for sequence in sequences],
+            ["SEQ20200311T112230", "SEQ20200311T112330"]
+        )
+        self.assertEqual(sequences[0]["status"], "failed")
+        self.assertIsNotNone(sequences[0]["traced_peak"])
+        metrics_db.close()
+
+        self.assertTrue(os.path.isfile(os.path.join(tmpdir, "processing.prof")))
+        msg = msg.split("\n")
+        self.assertEqual(msg[0], "0/2 sequences successfully processed")
+        self.assertEqual(msg[2][:22], "Processed 2 sequences ")
+
+        shutil.rmtree(tmpdir)
+
+    def test_init_worker_parallel_stages(self):
+        tmpdir = "tmp_" + "".join(random.choices(string.ascii_lowercase, k=6))
+        os.makedirs(tmpdir)
+        processor_config = setup_test_processor_config(
+            archive_directory=os.path.join(tmpdir, "out"),
+            metadata_db_url="sqlite:///" + tmpdir + "/metadata.db",
+            anomaly_db_url="sqlite:///" + tmpdir + "/anomaly.db",
+            archive_db_url="sqlite:///" + tmpdir + "/archive.db",
+        )
+        job_config = setup_test_job_config(raw_data_directory=os.path.join(tmpdir, "data"))
+
+        processor_config_path = os.path.join(tmpdir, "processor.config")
+        with open(processor_config_path, "w") as f:
+            processor_config.write(f)
+        job_config_path = os.path.join(tmpdir, "job.config")
+        with open(job_config_path, "w") as f:
+            job_config.write(f)
+
+        # stages run serially in worker processes by default
+        init_worker(processor_config_path, job_config_path, False, "test_init_worker")
+        self.assertEqual(_worker["sp"].build_stage_graph("w").max_workers, 1)
+
+        # unless configured
+        processor_config["Processor"]["parallel_stages"] = "3"
+        with open(processor_config_path, "w") as f:
+            processor_config.write(f)
+
+        init_worker(processor_config_path, job_config_path, False, "test_init_worker")
+        self.assertEqual(_worker["sp"].build_stage_graph("w").max_workers, 3)
+
+        _worker.clear()
+        shutil.rmtree(tmpdir)
+
     def test_get_target_sequences_toarchive(self):
         tmpdir = "tmp_" + "".join(random.choices(string.ascii_lowercase, k=6))
         context = setup_test_context(
@@ -5,10 +5,12 @@ Tests for Calibrate class
 from hypernets_processor.version import __version__
 from hypernets_processor.data_io.dataset_util import DatasetUtil
 from hypernets_processor.data_io.hypernets_writer import HypernetsWriter
+from hypernets_processor.utils.profiling import profile_method
 
 import matplotlib.pyplot as plt
 import numpy as np
 import os.path
+import threading
 import warnings
 
 '''___Authorship___'''
@@ -19,29 +21,45 @@ __maintainer__ = "Pieter De Vis"
 __email__ = "pieter.de.vis@npl.co.uk"
 __status__ = "Development"
 
+# pyplot is not thread-safe, so plots (e.g. from concurrently run processing stages) are made one at a time
+PLOT_LOCK = threading.RLock()
+
 
 class Plotting():
     def __init__(self,context,path=None):
         self.context = context
+        self._path = path
+        self.writer = HypernetsWriter(context)
+
+    @property
+    def path(self):
+        """
+        Plot directory, resolved for the current sequence unless set at construction (so
+        one Plotting instance can be reused across sequences)
+        """
+        path = self._path
         if path is None:
-            self.path = HypernetsWriter(context).return_plot_directory()
-        if not os.path.exists(self.path):
-            os.makedirs(self.path)
-        pass
+            path = self.writer.return_plot_directory()
+        if not os.path.exists(path):
+            os.makedirs(path)
+        return path
 
+    @profile_method("plotting")
     def plot_variable(self,measurandstring,*args,**kwargs):
-        if measurandstring == "radiance":
-            self.plot_radiance(*args,**kwargs)
-        elif measurandstring == "irradiance":
-            self.plot_irradiance(*args,**kwargs)
-        elif measurandstring == "reflectance":
-            self.plot_reflectance(*args,**kwargs)
-        elif measurandstring == "digital_number":
-            self.plot_DN(*args,**kwargs)
-        else:
-            self.plot_other_var(measurandstring,*args,**kwargs)
+        with PLOT_LOCK:
+            if measurandstring == "radiance":
+                self.plot_radiance(*args,**kwargs)
+            elif measurandstring == "irradiance":
+                self.plot_irradiance(*args,**kwargs)
+            elif measurandstring == "reflectance":
+                self.plot_reflectance(*args,**kwargs)
+            elif measurandstring == "digital_number":
+                self.plot_DN(*args,**kwargs)
+            else:
+                self.plot_other_var(measurandstring,*args,**kwargs)
 
 
+    @profile_method("plotting")
     def plot_scans_in_series(self,measurandstring,dataset):
         series_id = np.unique(dataset['series_id'])
         for i in range(len(series_id)):
@@ -54,6 +72,7 @@ class Plotting():
             self.plot_variable(measurandstring,plotpath,dataset["wavelength"].values,
                                ydata_subset)
 
+    @profile_method("plotting")
     def plot_series_in_sequence(self,measurandstring,dataset):
         plotpath = os.path.join(self.path,"plot_"+ measurandstring+"_"+
                    dataset.attrs['product_name']+"."+self.context.get_config_value("plotting_format"))
@@ -62,6 +81,7 @@ class Plotting():
         self.plot_variable(measurandstring,plotpath,dataset["wavelength"].values,
                            dataset[measurandstring].values,labels=angle_labels)
 
+    @profile_method("plotting")
     def plot_diff_scans(self,measurandstring,dataset,dataset_avg=None):
         series_id = np.unique(dataset['series_id'])
         for i in range(len(series_id)):
@@ -87,6 +107,7 @@ class Plotting():
             self.plot_variable("relative difference",plotpath,dataset["wavelength"].values,
                                (ydata_subset-avgs)/avgs,ylim=[-0.3,0.3],mask=mask)
 
+    @profile_method("plotting")
     def plot_relative_uncertainty(self,measurandstring,dataset,L2=False):
         plotpath = os.path.join(self.path,"plot_unc_"+ measurandstring +"_"+dataset.attrs[
             'product_name']+"."+self.context.get_config_value("plotting_format"))
@@ -106,8 +127,9 @@ class Plotting():
         self.plot_variable("relative uncertainty "+measurandstring,plotpath,dataset["wavelength"].values,
                            yerr,labels=ylabel,ylim=[0,0.2])
 
+    @profile_method("plotting")
     def plot_correlation(self,measurandstring,dataset,L2=False):
-        with warnings.catch_warnings():
+        with PLOT_LOCK, warnings.catch_warnings():
             warnings.simplefilter("ignore")
             plotpath = os.path.join(self.path,"plot_corr_"+ measurandstring+"_"+dataset.attrs[
                 'product_name']+"."+self.context.get_config_value("plotting_format"))
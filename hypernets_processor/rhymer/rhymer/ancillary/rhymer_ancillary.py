@@ -1,6 +1,11 @@
 import os
+import numpy as np
 from hypernets_processor.rhymer.rhymer.shared.rhymer_shared import RhymerShared
 
+## NCEP MET series already interpolated to a site in this process,
+## keyed on (lon, lat, date, kind)
+_MET_SERIES_CACHE = {}
+
 
 class RhymerAncillary:
 
@@ -23,16 +28,47 @@ class RhymerAncillary:
             for i, t in enumerate(ts):
                 ftime += t / (60 ** i)
 
-        anc = self.ancillary_get(isodate, lon, lat, ftime=ftime)
+        wind = self.get_wind_series(isodate, lon, lat, [ftime])
+        if wind is None:
+            return (None)
+        return (wind[0])
+
+    ## get wind speed data for isodate, lon and lat location at an array of times
+    ## ftimes are UTC times in hours; the MET data are interpolated to the location
+    ## once per (site, date) and then interpolated in time for all ftimes at once
 
-        if ('z_wind' in anc) and ('m_wind' in anc):
-            u = anc['z_wind']['interp']
-            v = anc['m_wind']['interp']
-            wind = (u ** 2 + v ** 2) ** 0.5
-            return (wind)
-        else:
+    def get_wind_series(self, isodate, lon, lat, ftimes, kind='linear'):
+        met = self.ancillary_met_series(isodate, lon, lat, kind=kind)
+        if (met is None) or ('z_wind' not in met['series']) or ('m_wind' not in met['series']):
             return (None)
 
+        ftimes = np.atleast_1d(np.asarray(ftimes, dtype=float))
+        u = np.interp(ftimes, met['ftimes'], met['series']['z_wind'])
+        v = np.interp(ftimes, met['ftimes'], met['series']['m_wind'])
+        return ((u ** 2 + v ** 2) ** 0.5)
+
+    ## ancillary_met_series
+    ## returns the NCEP MET time series for the day interpolated to lon, lat
+    ## memoised per process, so a sequence does at most one spatial interpolation
+    ## only complete series are memoised, so a day whose NCEP files are not all
+    ## available yet is looked up again when next requested
+
+    def ancillary_met_series(self, date, lon, lat, kind='linear', local_dir=None):
+        key = (float(lon), float(lat), date, kind)
+        if key in _MET_SERIES_CACHE:
+            return _MET_SERIES_CACHE[key]
+
+        cube_files = self.ancillary_store_files(date, local_dir=local_dir)
+        if len(cube_files) == 0:
+            print('No NCEP files found for {}'.format(date))
+            return None
+
+        ftimes, series = self.ancillary_interp_met_space(cube_files, lon, lat, kind=kind)
+        met = {'ftimes': ftimes, 'series': series}
+
+        if (len(cube_files) == len(self.ancillary_list(date))) and (len(series) > 0):
+            _MET_SERIES_CACHE[key] = met
+        return met
 
     ## ancillary_get
     ## downloads and interpolates ancillary data from the ocean data server
@@ -46,25 +82,18 @@ class RhymerAncillary:
     ##                2019-07-03 (QV) modified for rhymer, ozone data removed
 
     def ancillary_get(self, date, lon, lat, ftime=12.0, local_dir=None, quiet=True, kind='linear', verbosity=0):
-        if local_dir == None: local_dir = self.context.get_config_value('met_dir')
-
-        ## list and download files
-        anc_files = self.ancillary_list(date)
-        anc_local = self.ancillary_download(ancillary_files=anc_files, local_dir=local_dir, verbosity=verbosity)
-
-        ## get ncep MET files
-        ncep_files = [anc_local[i] for i, j in enumerate(anc_local) if "NCEPR2" in j]
         anc = {'date': date, 'lon': lon, 'lat': lat, 'ftime': ftime}
 
-        ## interpolate MET
-        if len(ncep_files) == 0:
-            print('No NCEP files found for {}'.format(date))
-        else:
-            anc_met = self.ancillary_interp_met(ncep_files, lon, lat, ftime, kind=kind)
-            for k in anc_met.keys(): anc[k] = anc_met[k]
+        ## get ncep MET series at lon, lat from the local store
+        met = self.ancillary_met_series(date, lon, lat, kind=kind, local_dir=local_dir)
 
-        return (anc)
+        ## interpolate MET in time
+        if met is not None:
+            for k in met['series'].keys():
+                anc[k] = {"interp": np.interp(ftime, met['ftimes'], met['series'][k]),
+                          "series": list(met['series'][k])}
 
+        return (anc)
 
     ## ancillary_list
     ## lists ancillary data from a given date from the ocean data server
@@ -148,91 +177,155 @@ class RhymerAncillary:
                         print('Downloading file {} failed'.format(basefile))
         return (local_files)
 
-    ## ancillary_interp_met
-    ## interpolates NCEP MET data from 6 hourly files to given lon, lat and time (float)
-    ##
-    ## written by Quinten Vanhellemont, RBINS for the PONDER project
-    ## 2017-10-17
-    ## modifications: 2017-10-18 (QV) fixed latitude indexing
-    ##                           (QV) added bz2 support
-    ##                2017-10-24 (QV) added option to use nearest neighbour (kind from scipy= ‘linear’, ‘cubic’, ‘quintic’)
-    ##                2018-03-05 (QV) fixed end of year rollover
-    ##                2018-03-12 (QV) added file closing to enable file deletion for Windows
+    ## ancillary_store_files
+    ## returns the indexed MET cubes for a date from the local ancillary store (met_dir),
+    ## converting mirrored NCEP files into cubes where needed. Files missing from the
+    ## mirror are only downloaded if met_download is not False
 
-    def ancillary_interp_met(self, files, lon, lat, time, datasets=['z_wind', 'm_wind', 'press', 'rel_hum', 'p_water'],
-                             kind='linear'):
-        import os, bz2
+    def ancillary_store_files(self, date, local_dir=None):
+        if local_dir is None: local_dir = self.context.get_config_value('met_dir')
+        download = self.context.get_config_value('met_download') is not False
+
+        anc_files = self.ancillary_list(date)
+        cube_files = []
+        for basefile in anc_files:
+            local_file = '{}/{}/{}/{}'.format(local_dir, basefile[1:5], basefile[5:8], basefile)
+            cube_file = self.ancillary_cube_name(local_file)
+            if not os.path.exists(cube_file):
+                if (not os.path.exists(local_file)) and download:
+                    self.ancillary_download(ancillary_files=[basefile], local_dir=local_dir)
+                if os.path.exists(local_file):
+                    self.ancillary_store_cube(local_file)
+            if os.path.exists(cube_file):
+                cube_files.append(cube_file)
+        return (cube_files)
+
+    ## ancillary_store_update
+    ## populates the local ancillary store for a list of dates (e.g. ahead of processing
+    ## offline), downloading NCEP files if needed and converting them into cubes
+
+    def ancillary_store_update(self, dates, local_dir=None):
+        if local_dir is None: local_dir = self.context.get_config_value('met_dir')
+        cube_files = []
+        for date in dates:
+            anc_files = self.ancillary_list(date)
+            anc_local = self.ancillary_download(ancillary_files=anc_files, local_dir=local_dir)
+            for local_file in anc_local:
+                cube_files.append(self.ancillary_store_cube(local_file))
+        return ([f for f in cube_files if f is not None])
+
+    ## ancillary_cube_name
+    ## name of the cube file stored next to an NCEP file
+
+    def ancillary_cube_name(self, file):
+        for ext in ['.bz2', '.hdf']:
+            if file.endswith(ext): file = file[:-len(ext)]
+        return ('{}.npz'.format(file))
+
+    ## ancillary_store_cube
+    ## decompresses and reads a 6 hourly NCEP MET file once, and stores its grid, time
+    ## and datasets as an indexed cube (.npz) next to it
+
+    def ancillary_store_cube(self, file, datasets=['z_wind', 'm_wind', 'press', 'rel_hum', 'p_water']):
+        import bz2, tempfile
         from pyhdf.SD import SD, SDC
-        from numpy import linspace
-        from scipy import interpolate
 
+        cube_file = self.ancillary_cube_name(file)
+        hdf_file, tmp_file = file, None
+        if file.endswith('.bz2'):
+            try:
+                with bz2.open(file, 'rb') as f:
+                    data = f.read()
+                fd, tmp_file = tempfile.mkstemp(suffix='.hdf', dir=os.path.dirname(file))
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                hdf_file = tmp_file
+            except:
+                print("Error extracting file {}, probably incomplete download".format(file))
+                if (tmp_file is not None) and os.path.exists(tmp_file): os.remove(tmp_file)
+                return (None)
+
+        try:
+            f = SD(hdf_file, SDC.READ)
+            meta = f.attributes()
+            cube = {'ftime': meta['Start Millisec'] / 3600000.,
+                    'jday': meta['Start Day'],
+                    'lons': np.linspace(meta["Westernmost Longitude"], meta["Easternmost Longitude"],
+                                        num=meta['Number of Columns']),
+                    'lats': np.linspace(meta["Northernmost Latitude"], meta["Southernmost Latitude"],
+                                        num=meta['Number of Rows'])}
+            for dataset in datasets:
+                cube[dataset] = f.select(dataset).get()
+            f.end()
+            f = None
+        finally:
+            if tmp_file is not None: os.remove(tmp_file)
+
+        tmp_cube = '{}.{}.tmp'.format(cube_file, os.getpid())
+        with open(tmp_cube, 'wb') as fc:
+            np.savez(fc, **cube)
+        os.replace(tmp_cube, cube_file)
+        return (cube_file)
+
+    ## ancillary_interp_met_space
+    ## interpolates NCEP MET cubes from the 6 hourly files to given lon, lat
+    ## returns the file times (hours) and the series per dataset
+
+    def ancillary_interp_met_space(self, files, lon, lat,
+                                   datasets=['z_wind', 'm_wind', 'press', 'rel_hum', 'p_water'], kind='linear'):
+        rhymershared = RhymerShared(self.context)
         interp_data = {ds: [] for ds in datasets}
         ftimes = []
         jdates = []
         for file in files:
-            zipped = False
-            # uncompress bz2 files
-            if file[-4:len(file)] == '.bz2':
-                try:
-                    zipped = True
-                    file = file.strip('.bz2')
-                    file_zipped = file + '.bz2'
-                    with bz2.open(file_zipped, 'rb') as f:
-                        data = f.read()
-                    with open(file, 'wb') as f:
-                        f.write(data)
-                except:
-                    print("Error extracting file {}, probably incomplete download".format(file_zipped))
-
-            f = SD(file, SDC.READ)
-            datasets_dic = f.datasets()
-            meta = f.attributes()
-
-            if zipped is False:
-                print(meta)
-                for idx, sds in enumerate(datasets_dic.keys()): print(idx, sds)
+            with np.load(file) as cube:
+                ftimes.append(float(cube['ftime']))
+                jdates.append(int(cube['jday']))
+                lons = cube['lons']
+                lats = cube['lats'][::-1]
 
-            ftime = meta['Start Millisec'] / 3600000.
-            ftimes.append(ftime)
-            jdates.append(meta['Start Day'])
-
-            ## make lons and lats for this file
-            lons = linspace(meta["Westernmost Longitude"], meta["Easternmost Longitude"],
-                            num=meta['Number of Columns'])
-            lats = linspace(meta["Northernmost Latitude"], meta["Southernmost Latitude"],
-                            num=meta['Number of Rows'])
-
-            for dataset in datasets:
-                sds_obj = f.select(dataset)
-                data = sds_obj.get()
-                ## do interpolation in space
                 if kind == 'nearest':
-                    xi, xret = min(enumerate(lons), key=lambda x: abs(x[1] - float(lon)))
-                    yi, yret = min(enumerate(lats), key=lambda x: abs(x[1] - float(lat)))
-                    interp_data[dataset].append(data[yi, xi])
+                    xi = np.argmin(np.abs(lons - float(lon)))
+                    yi = np.argmin(np.abs(lats - float(lat)))
                 else:
-                    interp = interpolate.interp2d(lons, lats, data, kind=kind)
-                    idata = interp(lon, lat)
-                    interp_data[dataset].append(idata[0])
-                ## add QC?
+                    xi = rhymershared.lutpos_array(lons, lon)
+                    yi = rhymershared.lutpos_array(lats, lat)
 
-            f.end()
-            f = None
-
-            ### delete unzipped file
-            # if (zipped) & (sys.platform[0:3].lower() != 'win'): os.remove(file)
-            if (zipped): os.remove(file)
-        # f = None
+                for dataset in datasets:
+                    if dataset not in cube: continue
+                    data = cube[dataset][::-1, :]
+                    if kind == 'nearest':
+                        interp_data[dataset].append(float(data[yi, xi]))
+                    else:
+                        interp_data[dataset].append(float(rhymershared.interpnd(data, yi, xi)))
 
         ## add check for year for files[-1]?
         if (ftimes[-1] == 0.) & \
                 ((jdates[-1] == jdates[0] + 1) | (jdates[0] >= 365 & jdates[-1] == 1)): ftimes[-1] = 24.0
 
+        series = {ds: np.array(interp_data[ds]) for ds in datasets if len(interp_data[ds]) == len(files)}
+        return (np.array(ftimes), series)
+
+    ## ancillary_interp_met
+    ## interpolates NCEP MET data from 6 hourly cubes to given lon, lat and time (float or array)
+    ##
+    ## written by Quinten Vanhellemont, RBINS for the PONDER project
+    ## 2017-10-17
+    ## modifications: 2017-10-18 (QV) fixed latitude indexing
+    ##                           (QV) added bz2 support
+    ##                2017-10-24 (QV) added option to use nearest neighbour (kind from scipy= ‘linear’, ‘cubic’, ‘quintic’)
+    ##                2018-03-05 (QV) fixed end of year rollover
+    ##                2018-03-12 (QV) added file closing to enable file deletion for Windows
+    ##                reads the indexed cubes of the local ancillary store, interpolates bilinearly in space
+
+    def ancillary_interp_met(self, files, lon, lat, time, datasets=['z_wind', 'm_wind', 'press', 'rel_hum', 'p_water'],
+                             kind='linear'):
+        ftimes, series = self.ancillary_interp_met_space(files, lon, lat, datasets=datasets, kind=kind)
+
         ## do interpolation in time
         anc_data = {}
-        for dataset in datasets:
-            tinp = interpolate.interp1d(ftimes, interp_data[dataset])
-            ti = tinp(time)
-            anc_data[dataset] = {"interp": ti, "series": interp_data[dataset]}
+        for dataset in series.keys():
+            ti = np.interp(time, ftimes, series[dataset])
+            anc_data[dataset] = {"interp": ti, "series": list(series[dataset])}
 
         return (anc_data)
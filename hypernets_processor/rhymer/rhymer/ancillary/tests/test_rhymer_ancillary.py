@@ -0,0 +1,68 @@
+"""
+Tests for rhymer_ancillary module
+"""
+
+import unittest
+from unittest.mock import patch
+from hypernets_processor.version import __version__
+from hypernets_processor.rhymer.rhymer.ancillary import rhymer_ancillary
+from hypernets_processor.rhymer.rhymer.ancillary.rhymer_ancillary import RhymerAncillary
+from hypernets_processor.context import Context
+import numpy as np
+
+
+"""___Authorship___"""
+__author__ = "Sam Hunt"
+__created__ = "19/10/2026"
+__version__ = __version__
+__maintainer__ = "Sam Hunt"
+__email__ = "sam.hunt@npl.co.uk"
+__status__ = "Development"
+
+FTIMES = np.array([0., 6., 12., 18., 24.])
+SERIES = {"z_wind": np.array([3., 3., 4., 4., 3.]), "m_wind": np.zeros(5)}
+
+
+class TestRhymerAncillary(unittest.TestCase):
+    def setUp(self):
+        rhymer_ancillary._MET_SERIES_CACHE.clear()
+
+    def tearDown(self):
+        rhymer_ancillary._MET_SERIES_CACHE.clear()
+
+    @patch.object(RhymerAncillary, "ancillary_interp_met_space", return_value=(FTIMES, SERIES))
+    @patch.object(RhymerAncillary, "ancillary_store_files")
+    def test_ancillary_met_series(self, mock_files, mock_interp):
+        mock_files.return_value = ["N" + str(i) + ".npz" for i in range(5)]
+        anc = RhymerAncillary(Context())
+
+        met = anc.ancillary_met_series("2020-04-05", 4.5, 51.3)
+        self.assertIs(met, anc.ancillary_met_series("2020-04-05", 4.5, 51.3))
+        self.assertEqual(1, mock_interp.call_count)
+
+        self.assertEqual(4., anc.get_wind("2020-04-05", 4.5, 51.3, isotime="12:00:00"))
+
+    @patch.object(RhymerAncillary, "ancillary_interp_met_space", return_value=(FTIMES, SERIES))
+    @patch.object(RhymerAncillary, "ancillary_store_files")
+    def test_ancillary_met_series_missing_files(self, mock_files, mock_interp):
+        anc = RhymerAncillary(Context())
+
+        # no files yet, not memoised
+        mock_files.return_value = []
+        self.assertIsNone(anc.ancillary_met_series("2020-04-05", 4.5, 51.3))
+        self.assertIsNone(anc.get_wind("2020-04-05", 4.5, 51.3))
+
+        # incomplete day (next day file missing), returned but not memoised
+        mock_files.return_value = ["N" + str(i) + ".npz" for i in range(4)]
+        self.assertIsNotNone(anc.ancillary_met_series("2020-04-05", 4.5, 51.3))
+        self.assertEqual({}, rhymer_ancillary._MET_SERIES_CACHE)
+
+        # files arrived
+        mock_files.return_value = ["N" + str(i) + ".npz" for i in range(5)]
+        self.assertIsNotNone(anc.ancillary_met_series("2020-04-05", 4.5, 51.3))
+        self.assertEqual(1, len(rhymer_ancillary._MET_SERIES_CACHE))
+        self.assertEqual(4, mock_files.call_count)
+
+
+if __name__ == "__main__":
+    unittest.main()
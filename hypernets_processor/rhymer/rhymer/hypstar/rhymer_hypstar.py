@@ -15,7 +15,6 @@ from hypernets_processor.data_utils.average import Average
 from hypernets_processor.data_io.dataset_util import DatasetUtil as du
 
 import numpy as np
-import math
 
 
 class RhymerHypstar:
@@ -39,73 +38,75 @@ class RhymerHypstar:
         ## Last modifications: 2019-07-10 (QV) renamed from PANTR, integrated in rhymer
         # Modified 10/09/2020 by CG for the PANTHYR
         verbosity = self.context.get_config_value("verbosity")
-        series_id = np.unique(dataset['series_id'])
+        series_id = dataset['series_id'].values
         wave = dataset['wavelength'].values
-        flags = np.zeros(shape=len(dataset['scan']))
-        id = 0
-        for s in series_id:
-
-            scans = dataset['scan'][dataset['series_id'] == s]
-
-            ##
-            n = len(scans)
-            ## get pixel index for wavelength
-            iref, wref = self.rhymershared.closest_idx(wave, self.context.get_config_value("diff_wave"))
-
-            cos_sza = []
-            for i in dataset['solar_zenith_angle'].sel(scan=scans).values:
-                cos_sza.append(math.cos(math.radians(i)))
-
-            ## go through the current set of scans
-            for i in range(n):
-                ## test inclination
-                ## not done
-
-                if measurandstring == 'irradiance':
-                    data = dataset['irradiance'].sel(scan=scans).T.values
-
-                    ## test variability at 550 nm
-                    if i == 0:
-                        v = abs(1 - ((data[i][iref] / cos_sza[i]) / (data[i + 1][iref] / cos_sza[i + 1])))
-                    elif i < n - 1:
-                        v = max(abs(1 - ((data[i][iref] / cos_sza[i]) / (data[i + 1][iref] / cos_sza[i + 1]))),
-                                abs(1 - ((data[i][iref] / cos_sza[i]) / (data[i - 1][iref] / cos_sza[i - 1]))))
-                    else:
-                        v = abs(1 - ((data[i][iref] / cos_sza[i]) / (data[i - 1][iref] / cos_sza[i - 1])))
-                else:
-                    data = dataset['radiance'].sel(scan=scans).T.values
-                    ## test variability at 550 nm
-                    if i == 0:
-                        v = abs(1 - (data[i][iref] / data[i + 1][iref]))
-                    elif i < n - 1:
-                        v = max(abs(1 - (data[i][iref] / data[i + 1][iref])),
-                                abs(1 - (data[i][iref] / data[i - 1][iref])))
-                    else:
-                        v = abs(1 - (data[i][iref] / data[i - 1][iref]))
-
-                ## continue if value exceeds the cv threshold
-                if v > self.context.get_config_value("diff_threshold"):
-                    # get flag value for the temporal variability
-                    if measurandstring == 'irradiance':
-                        flags[id] = 1
-                        dataset_l1b['quality_flag'][range(len(dataset_l1b['scan']))] = du.set_flag(
-                            dataset_l1b["quality_flag"][range(len(dataset_l1b['scan']))],
-                            "temp_variability_ed")
-                    else:
-                        flags[id] = 1
-                        dataset_l1b['quality_flag'][range(len(dataset_l1b['scan']))] = du.set_flag(
-                            dataset_l1b["quality_flag"][range(len(dataset_l1b['scan']))],
-                            "temp_variability_lu")
-
-                    seq = dataset.attrs["sequence_id"]
-                    ts = datetime.utcfromtimestamp(dataset['acquisition_time'][i])
-
-                    if verbosity > 2: self.context.logger.info(
-                        'Temporal jump: in {}:  Aquisition time {}, {}'.format(seq, ts, ', '.join(
-                            ['{}:{}'.format(k, dataset[k][scans[i]].values) for k in ['scan', 'quality_flag']])))
-                id += 1
 
-            return dataset_l1b, flags
+        ## get pixel index for wavelength
+        iref, wref = self.rhymershared.closest_idx(wave, self.context.get_config_value("diff_wave"))
+
+        ## test inclination
+        ## not done
+
+        ## test variability at 550 nm, irradiance normalised by cos(sza)
+        data = dataset[measurandstring].isel(wavelength=iref).values.astype(float)
+        if measurandstring == 'irradiance':
+            data = data / np.cos(np.radians(dataset['solar_zenith_angle'].values))
+
+        ## ratio with next and previous scan, for all scans of all series at once
+        same_next = np.zeros(len(data), dtype=bool)
+        same_next[:-1] = series_id[:-1] == series_id[1:]
+        v_next = np.zeros(len(data))
+        v_next[:-1] = np.abs(1 - data[:-1] / data[1:])
+        v_prev = np.zeros(len(data))
+        v_prev[1:] = np.abs(1 - data[1:] / data[:-1])
+
+        ## scans are compared within their series only
+        same_prev = np.roll(same_next, 1)
+        same_prev[0] = False
+        v = np.maximum(np.where(same_next, v_next, 0), np.where(same_prev, v_prev, 0))
+
+        ## flag if value exceeds the cv threshold
+        flags = (v > self.context.get_config_value("diff_threshold")).astype(float)
+
+        if np.any(flags == 1):
+            # get flag value for the temporal variability
+            if measurandstring == 'irradiance':
+                dataset_l1b['quality_flag'] = du.set_flag(dataset_l1b["quality_flag"], "temp_variability_ed")
+            else:
+                dataset_l1b['quality_flag'] = du.set_flag(dataset_l1b["quality_flag"], "temp_variability_lu")
+
+            if (verbosity is not None) and (verbosity > 2):
+                seq = dataset.attrs["sequence_id"]
+                for i in np.where(flags == 1)[0]:
+                    ts = datetime.utcfromtimestamp(dataset['acquisition_time'].values[i])
+                    self.context.logger.info(
+                        'Temporal jump: in {}:  Aquisition time {}, {}'.format(seq, ts, ', '.join(
+                            ['{}:{}'.format(k, dataset[k].values[i]) for k in ['scan', 'quality_flag']])))
+
+        return dataset_l1b, flags
+
+    def scan_table(self, ds):
+        """
+        Returns the per-scan quantities used to parse the measurement cycle, extracted
+        once from the dataset as arrays (positions follow the scan dimension)
+        """
+        return {"scan": ds["scan"].values,
+                "vza": ds["viewing_zenith_angle"].values.astype(float),
+                "vaa": ds["viewing_azimuth_angle"].values.astype(float),
+                "acquisition_time": ds["acquisition_time"].values,
+                "quality_flag": ds["quality_flag"].values}
+
+    def log_scans(self, message, table, mask):
+        """
+        Logs the acquisition times, scan numbers and quality flags of the masked scans,
+        only formatting the message if verbosity is high enough
+        """
+        verbosity = self.context.get_config_value("verbosity")
+        if (verbosity is None) or (verbosity <= 2):
+            return
+        ts = [datetime.utcfromtimestamp(x) for x in table["acquisition_time"][mask]]
+        self.context.logger.info('{}: Aquisition time {}, {}'.format(message, ts, ', '.join(
+            ['{}:{}'.format(k, table[k][mask]) for k in ['scan', 'quality_flag']])))
 
     def cycleparse(self, rad, irr, dataset_l1b):
 
@@ -120,88 +121,57 @@ class RhymerHypstar:
             # what about a non-standard protocol but that includes the required standard series?
             self.context.logger.error('Unknown measurement protocol: {}'.format(protocol))
         else:
-            uprad = []
-            downrad = []
-            for i in rad['scan']:
-                scani = rad.sel(scan=i)
-                senz = scani["viewing_zenith_angle"].values
-                if senz < 90:
-                    measurement = 'upwelling_radiance'
-                    uprad.append(int(i))
-                if senz >= 90:
-                    measurement = 'downwelling_radiance'
-                    downrad.append(int(i))
-                if measurement is None: continue
-
-            lu = rad.sel(scan=uprad)
-            lsky = rad.sel(scan=downrad)
-
-            for i in lu['scan']:
-                scani = lu.sel(scan=i)
-                sena = scani["viewing_azimuth_angle"].values
-                senz = scani["viewing_zenith_angle"].values
-                self.context.logger.debug(scani['acquisition_time'].values)
-                ts = datetime.utcfromtimestamp(int(scani['acquisition_time'].values))
-                # not fromtimestamp?
-
-                if (senz != 'NULL') & (sena != 'NULL'):
-                    senz = float(senz)
-                    sena = abs(float(sena))
-                else:
-                    dataset_l1b['quality_flag'] = du.set_flag(dataset_l1b.sel(scan=i)['quality_flag'], "angles_missing")
-                    self.context.logger.info('NULL angles: Aquisition time {}, {}'.format(ts, ', '.join(
-                        ['{}:{}'.format(k, scani[k].values) for k in ['scan', 'quality_flag']])))
-                    continue
+            # split upwelling and downwelling radiance scans on viewing zenith angle
+            rad_table = self.scan_table(rad)
+            up = rad_table["vza"] < 90
+            down = rad_table["vza"] >= 90
+
+            lu = rad.isel(scan=np.where(up)[0])
+            lsky = rad.isel(scan=np.where(down)[0])
+            lu_table = {k: v[up] for k, v in rad_table.items()}
+            lsky_table = {k: v[down] for k, v in rad_table.items()}
+
+            l1b_vaa = dataset_l1b["viewing_azimuth_angle"].values
+            l1b_vza = dataset_l1b["viewing_zenith_angle"].values
+
+            # check for missing angles
+            missing = ~np.isfinite(lu_table["vza"]) | ~np.isfinite(lu_table["vaa"])
+            if np.any(missing):
+                mask = np.isin(dataset_l1b["scan"].values, lu_table["scan"][missing])
+                dataset_l1b["quality_flag"][mask] = du.set_flag(dataset_l1b["quality_flag"][mask], "angles_missing")
+                self.log_scans('NULL angles', lu_table, missing)
 
             # check if we have the same azimuth for lu and lsky
-            sena_lu = np.unique(lu["viewing_azimuth_angle"].values)
-            sena_lsky = np.unique(lsky["viewing_azimuth_angle"].values)
-            for i in sena_lu:
-                if i not in sena_lsky:
-                    dataset_l1b["quality_flag"][dataset_l1b["viewing_azimuth_angle"] == i] = du.set_flag(
-                        dataset_l1b["quality_flag"][dataset_l1b["viewing_azimuth_angle"] == i], "lu_eq_missing")
-                    if self.context.get_config_value("verbosity") > 2:
-                        ts = [datetime.utcfromtimestamp(x) for x in
-                              lu['acquisition_time'][lu["viewing_azimuth_angle"] == i].values]
-                        self.context.logger.info(
-                            'No azimuthal equivalent downwelling radiance measurement: Aquisition time {}, {}'.format(
-                                ts, ', '.join(
-                                    ['{}:{}'.format(k, lu[k][lu["viewing_azimuth_angle"] == i].values) for k in
-                                     ['scan', 'quality_flag']])))
+            sena_missing = np.setdiff1d(lu_table["vaa"], lsky_table["vaa"])
+            if len(sena_missing) > 0:
+                mask = np.isin(l1b_vaa, sena_missing)
+                dataset_l1b["quality_flag"][mask] = du.set_flag(dataset_l1b["quality_flag"][mask], "lu_eq_missing")
+                self.log_scans('No azimuthal equivalent downwelling radiance measurement', lu_table,
+                               np.isin(lu_table["vaa"], sena_missing))
 
             # check if we have the required fresnel angle for lsky
-            senz_lu = np.unique(lu["viewing_zenith_angle"].values)
-            senz_lsky = 180 - np.unique(lsky["viewing_zenith_angle"].values)
-            for i in senz_lu:
-                if i not in senz_lsky:
-                    dataset_l1b["quality_flag"][dataset_l1b["viewing_azimuth_angle"] == i] = du.set_flag(
-                        dataset_l1b["quality_flag"][dataset_l1b["viewing_azimuth_angle"] == i], "fresnel_angle_missing")
-                    ts = [datetime.utcfromtimestamp(x) for x in
-                          lu['acquisition_time'][lu["viewing_zenith_angle"] == i].values]
-                    self.context.logger.info(
-                        'No downwelling radiance measurement at appropriate fresnel angle: Aquisition time {}, {}'.format(
-                            ts, ', '.join(
-                                ['{}:{}'.format(k, lu[k][lu["viewing_azimuth_angle"] == i].values) for k
-                                 in ['scan', 'quality_flag']])))
+            senz_missing = np.setdiff1d(lu_table["vza"], 180 - lsky_table["vza"])
+            if len(senz_missing) > 0:
+                mask = np.isin(l1b_vza, senz_missing)
+                dataset_l1b["quality_flag"][mask] = du.set_flag(dataset_l1b["quality_flag"][mask],
+                                                                "fresnel_angle_missing")
+                self.context.logger.info(
+                    'No downwelling radiance measurement at appropriate fresnel angle for viewing zenith angles {}'.format(
+                        senz_missing))
+                self.log_scans('No downwelling radiance measurement at appropriate fresnel angle', lu_table,
+                               np.isin(lu_table["vza"], senz_missing))
 
             # check if correct number of radiance and irradiance data
-
-            if lu.scan[lu['quality_flag'] <= 0].count() < nbrlu:
-                for i in range(len(dataset_l1b["scan"])):
-                    dataset_l1b["quality_flag"][dataset_l1b["scan"] == i] = du.set_flag(
-                        dataset_l1b["quality_flag"][dataset_l1b["scan"] == i], "min_nbrlu")
+            if np.count_nonzero(lu_table["quality_flag"] <= 0) < nbrlu:
+                dataset_l1b["quality_flag"] = du.set_flag(dataset_l1b["quality_flag"], "min_nbrlu")
                 self.context.logger.info(
                     "No enough upwelling radiance data for sequence {}".format(lu.attrs['sequence_id']))
-            if lsky.scan[lsky['quality_flag'] <= 1].count() < nbrlsky:
-                for i in range(len(dataset_l1b["scan"])):
-                    dataset_l1b["quality_flag"][dataset_l1b["scan"] == i] = du.set_flag(
-                        dataset_l1b["quality_flag"][dataset_l1b["scan"] == i], "min_nbrlsky")
+            if np.count_nonzero(lsky_table["quality_flag"] <= 1) < nbrlsky:
+                dataset_l1b["quality_flag"] = du.set_flag(dataset_l1b["quality_flag"], "min_nbrlsky")
                 self.context.logger.info(
                     "No enough downwelling radiance data for sequence {}".format(lsky.attrs['sequence_id']))
-            if irr.scan[irr['quality_flag'] <= 1].count() < nbred:
-                for i in range(len(dataset_l1b["scan"])):
-                    dataset_l1b["quality_flag"][dataset_l1b["scan"] == i] = du.set_flag(
-                        dataset_l1b["quality_flag"][dataset_l1b["scan"] == i], "min_nbred")
+            if np.count_nonzero(irr['quality_flag'].values <= 1) < nbred:
+                dataset_l1b["quality_flag"] = du.set_flag(dataset_l1b["quality_flag"], "min_nbred")
                 self.context.logger.info(
                     "No enough downwelling irradiance data for sequence {}".format(irr.attrs['sequence_id']))
 
@@ -210,64 +180,51 @@ class RhymerHypstar:
     def get_wind(self, l1b):
 
         lat = l1b.attrs['site_latitude']
-        lon = l1b.attrs['site_latitude']
-        wind = []
-        for i in range(len(l1b.scan)):
-            wa = self.context.get_config_value("wind_ancillary")
-            if not wa:
-                l1b["quality_flag"][l1b["scan"] == i] = du.set_flag(l1b["quality_flag"][l1b["scan"] == i],
-                                                                    "def_wind_flag")
-                self.context.logger.info("Default wind speed {}".format(self.context.get_config_value("wind_default")))
-                wind.append(self.context.get_config_value("wind_default"))
-            else:
-                isodate = datetime.utcfromtimestamp(l1b['acquisition_time'].values[i]).strftime('%Y-%m-%d')
-                isotime = datetime.utcfromtimestamp(l1b['acquisition_time'].values[i]).strftime('%H:%M:%S')
-                anc_wind = self.rhymeranc.get_wind(isodate, lon, lat, isotime=isotime)
+        lon = l1b.attrs['site_longitude']
+        wind = np.full(len(l1b.scan), np.nan)
+
+        if self.context.get_config_value("wind_ancillary"):
+            # one spatial interpolation per date, time interpolation for all scans of that date at once
+            times = [datetime.utcfromtimestamp(t) for t in l1b['acquisition_time'].values]
+            isodates = np.array([t.strftime('%Y-%m-%d') for t in times])
+            ftimes = np.array([t.hour + t.minute / 60. + t.second / 3600. for t in times])
+            for isodate in np.unique(isodates):
+                ids = np.where(isodates == isodate)[0]
+                anc_wind = self.rhymeranc.get_wind_series(isodate, lon, lat, ftimes[ids])
                 if anc_wind is not None:
-                    wind.append(anc_wind)
+                    wind[ids] = anc_wind
+
+        default = ~np.isfinite(wind)
+        if np.any(default):
+            l1b["quality_flag"][default] = du.set_flag(l1b["quality_flag"][default], "def_wind_flag")
+            self.context.logger.info("Default wind speed {}".format(self.context.get_config_value("wind_default")))
+            wind[default] = self.context.get_config_value("wind_default")
+
         l1b['fresnel_wind'].values = wind
         return l1b
 
     def get_fresnelrefl(self, l1b):
 
-        ## read mobley rho lut
-        fresnel_coeff = np.zeros(len(l1b.scan))
-        fresnel_vza = np.zeros(len(l1b.scan))
-        fresnel_raa = np.zeros(len(l1b.scan))
-        fresnel_sza = np.zeros(len(l1b.scan))
-
-        wind = l1b["fresnel_wind"].values
-        for i in range(len(l1b.scan)):
-            fresnel_vza[i] = l1b['viewing_zenith_angle'][i].values
-            fresnel_sza[i] = l1b['solar_zenith_angle'][i].values
-
-            diffa = l1b['viewing_azimuth_angle'][i].values - l1b['solar_azimuth_angle'][i].values
-
-            if diffa >= 360:
-                diffa = diffa - 360
-            elif 0 <= diffa < 360:
-                diffa = diffa
-            else:
-                diffa = diffa + 360
-            fresnel_raa[i] = abs((diffa - 180))
-
-            ## get fresnel reflectance
-            if self.context.get_config_value("fresnel_option") == 'Mobley':
-                if (fresnel_sza[i] is not None) & (fresnel_raa[i] is not None):
-                    sza = min(fresnel_sza[i], 79.999)
-                    rhof = self.rhymerproc.mobley_lut_interp(sza, fresnel_vza[i], fresnel_raa[i],
-                                                             wind=wind[i])
-                else:
-                    l1b["quality_flag"][l1b["scan"] == i] = du.set_flag(l1b["quality_flag"][l1b["scan"] == i],
-                                                                        "fresnel_default")
-                    rhof = self.context.get_config_value("rhof_default")
-            if self.context.get_config_value("fresnel_option") == 'Ruddick2006':
-                rhof = self.context.get_config_value("rhof_default")
-                self.context.logger.info("Apply Ruddick et al., 2006")
-                if wind[i] is not None:
-                    rhof = rhof + 0.00039 * wind[i] + 0.000034 * wind[i] ** 2
-
-            fresnel_coeff[i] = rhof
+        fresnel_vza = l1b['viewing_zenith_angle'].values.astype(float)
+        fresnel_sza = l1b['solar_zenith_angle'].values.astype(float)
+        wind = np.asarray(l1b["fresnel_wind"].values, dtype=float)
+
+        diffa = l1b['viewing_azimuth_angle'].values - l1b['solar_azimuth_angle'].values
+        diffa = np.where(diffa >= 360, diffa - 360, np.where(diffa < 0, diffa + 360, diffa))
+        fresnel_raa = np.abs(diffa - 180)
+
+        ## get fresnel reflectance
+        fresnel_coeff = np.full(len(l1b.scan), self.context.get_config_value("rhof_default"), dtype=float)
+        if self.context.get_config_value("fresnel_option") == 'Mobley':
+            valid = np.isfinite(fresnel_sza) & np.isfinite(fresnel_raa)
+            fresnel_coeff[valid] = self.rhymerproc.mobley_lut_interp_array(
+                np.minimum(fresnel_sza[valid], 79.999), fresnel_vza[valid], fresnel_raa[valid], wind[valid])
+            if not np.all(valid):
+                l1b["quality_flag"][~valid] = du.set_flag(l1b["quality_flag"][~valid], "fresnel_default")
+        if self.context.get_config_value("fresnel_option") == 'Ruddick2006':
+            self.context.logger.info("Apply Ruddick et al., 2006")
+            valid = np.isfinite(wind)
+            fresnel_coeff[valid] = fresnel_coeff[valid] + 0.00039 * wind[valid] + 0.000034 * wind[valid] ** 2
 
         l1b["rhof"].values = fresnel_coeff
         l1b["fresnel_vza"].values = fresnel_vza
@@ -287,14 +244,9 @@ class RhymerHypstar:
         ## get pixel index for wavelength
         irefr, wrefr = self.rhymershared.closest_idx(wave, wr)
 
-        failSimil = []
-        scans = L1c['scan']
-        for i in range(len(scans)):
-            data=L1c['reflectance_nosc'].sel(scan=i).values
-            if abs(epsilon[i]) > wp * data[irefr]:
-                failSimil.append(1)
-            else:
-                failSimil.append(0)
+        ## fails if epsilon exceeds the threshold fraction of the reference reflectance
+        data = L1c['reflectance_nosc'].isel(wavelength=irefr).values
+        failSimil = (np.abs(epsilon.values) > wp * data).astype(int)
         return failSimil
 
     def process_l1c_int(self, l1a_rad, l1a_irr):
@@ -1,6 +1,14 @@
 from hypernets_processor.rhymer.rhymer.shared.rhymer_shared import RhymerShared
 from hypernets_processor.rhymer.rhymer.ancillary.rhymer_ancillary import RhymerAncillary
 import numpy as np
+import os
+
+## Mobley LUTs already read in this process, keyed on source file path,
+## holding the source file signature and the LUT
+_MOBLEY_LUT_CACHE = {}
+
+## similarity spectra already read in this process, keyed on source file path
+_SIMILARITY_CACHE = {}
 
 
 ## interpolate Mobley sky reflectance LUT
@@ -39,7 +47,24 @@ class RhymerProcessing:
         rint = it2 * wind_w + it1 * (1. - wind_w)
         return (rint)
 
+    ## interpolate Mobley sky reflectance LUT for arrays of geometries and wind speeds
+    ## array version of mobley_lut_interp, returns rho for each element
+
+    def mobley_lut_interp_array(self, ths, thv, phi, wind):
+        rholut = self.mobley_lut_read()
+        dval = rholut['header']
+
+        wind_id = self.rhymershared.lutpos_array(dval['Wind'], wind)
+        ths_id = self.rhymershared.lutpos_array(dval['Theta-sun'], ths)
+        thv_id = self.rhymershared.lutpos_array(dval['Theta'], thv)
+        phi_id = self.rhymershared.lutpos_array(dval['Phi'], np.abs(phi))
+
+        return self.rhymershared.interpnd(rholut['data'], wind_id, ths_id, thv_id, phi_id)
+
     ## read Mobley sky reflectance LUT
+    ## the LUT is parsed once per process and kept in memory, and stored in a binary
+    ## sidecar (.npz) next to the text file, which is reused as long as the text
+    ## file is unchanged
     ## QV 2018-07-18
     ## Last modifications: 2019-07-10 (QV) integrated in rhymer
 
@@ -47,6 +72,54 @@ class RhymerProcessing:
         vf = self.context.get_config_value("rholut")
         ifile = '{}/{}'.format(self.context.get_config_value("rhymer_data_dir"), 'Shared/Mobley/{}.txt'.format(vf))
 
+        stat = os.stat(ifile)
+        signature = np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+        cached = _MOBLEY_LUT_CACHE.get(ifile)
+        if (cached is not None) and np.array_equal(cached[0], signature):
+            return cached[1]
+
+        sidecar = os.path.splitext(ifile)[0] + '.npz'
+        rholut = self.mobley_lut_read_binary(sidecar, signature)
+        if rholut is None:
+            rholut = self.mobley_lut_parse(ifile)
+            self.mobley_lut_write_binary(sidecar, signature, rholut)
+
+        _MOBLEY_LUT_CACHE[ifile] = (signature, rholut)
+        return rholut
+
+    ## read Mobley sky reflectance LUT from binary sidecar
+    ## returns None if the sidecar is missing, unreadable or made from another source file
+
+    def mobley_lut_read_binary(self, sidecar, signature):
+        if not os.path.exists(sidecar):
+            return None
+        try:
+            with np.load(sidecar) as npz:
+                if not np.array_equal(npz['signature'], signature):
+                    return None
+                dval = {k: list(npz['header_' + k]) for k in ['Wind', 'Theta-sun', 'Theta', 'Phi']}
+                return {'header': dval, 'data': npz['data']}
+        except (OSError, ValueError, KeyError):
+            return None
+
+    ## write Mobley sky reflectance LUT to binary sidecar
+    ## skipped if the LUT directory is not writable
+
+    def mobley_lut_write_binary(self, sidecar, signature, rholut):
+        arrays = {'header_' + k: np.asarray(v) for k, v in rholut['header'].items()}
+        tmp = '{}.{}.tmp'.format(sidecar, os.getpid())
+        try:
+            with open(tmp, 'wb') as f:
+                np.savez(f, signature=signature, data=rholut['data'], **arrays)
+            os.replace(tmp, sidecar)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    ## parse Mobley sky reflectance LUT text file
+
+    def mobley_lut_parse(self, ifile):
         header = '   I   J    Theta      Phi  Phi-view       rho'.split()
         data, cur = {}, None
 
@@ -107,12 +180,16 @@ class RhymerProcessing:
     ## 2017-12
     ## modifications: 2018-04-17 (QV) added to acolite function
     ##                2019-07-10 (QV) integrated in rhymer
+    ## the spectrum is read once per process and kept in memory
 
     def similarity_read(self, ifile=None):
 
         if ifile is None:
             ifile = '{}/Shared/REMSEM/similarityspectrumtable.txt'.format(self.context.get_config_value("rhymer_data_dir"))
 
+        if ifile in _SIMILARITY_CACHE:
+            return _SIMILARITY_CACHE[ifile]
+
         ss_data = {'wave': np.ndarray(0), 'ave': np.ndarray(0), 'std': np.ndarray(0), 'cv': np.ndarray(0)}
 
         with open(ifile, 'r') as f:
@@ -133,4 +210,5 @@ class RhymerProcessing:
         ## sort indices
         idx = np.argsort(ss_data['wave'])
         for k in ss_data.keys(): ss_data[k] = ss_data[k][idx]
+        _SIMILARITY_CACHE[ifile] = ss_data
         return (ss_data)
@@ -91,6 +91,46 @@ class RhymerShared:
                        1 - x) * (1 - y) * z + d101 * x * (1 - y) * z + d011 * (1 - x) * y * z + d110 * x * y * (
                        1 - z) + d111 * x * y * z
 
+    ## def lutpos_array
+    ## finds fractional positions of values in a (sorted) vector for LUT lookup
+    ## array version of lutpos, values outside the vector are clamped to its ends
+
+    def lutpos_array(self, vector, values):
+        import numpy as np
+        vector = np.asarray(vector, dtype=float)
+        values = np.asarray(values, dtype=float)
+        uidx = np.clip(np.searchsorted(vector, values, side='right'), 1, len(vector) - 1)
+        lidx = uidx - 1
+        index = lidx + (values - vector[lidx]) / np.abs(vector[lidx] - vector[uidx])
+        return np.clip(index, 0, len(vector) - 1)
+
+    ## def interpnd
+    ## multilinear interpolation of an n-dimensional array for LUT lookup
+    ## at arrays of fractional indices (one per dimension), as obtained from lutpos_array
+
+    def interpnd(self, data, *ids):
+        import numpy as np
+        lo, hi, w = [], [], []
+        for d, idx in enumerate(ids):
+            idx = np.asarray(idx, dtype=float)
+            l = idx.astype(int)
+            lo.append(l)
+            hi.append(np.minimum(l + 1, data.shape[d] - 1))
+            w.append(idx - l)
+
+        result = 0.
+        for corner in range(2 ** len(ids)):
+            index, weight = [], 1.
+            for d in range(len(ids)):
+                if (corner >> d) & 1:
+                    index.append(hi[d])
+                    weight = weight * w[d]
+                else:
+                    index.append(lo[d])
+                    weight = weight * (1 - w[d])
+            result = result + weight * data[tuple(index)]
+        return result
+
     ## def download_file
     ## download_file with authorisation option
     ## written by Quinten Vanhellemont, RBINS for the PONDER project
@@ -3,8 +3,9 @@ Contains class for scheduling and automating hypernets data processing jobs
 """
 
 from hypernets_processor.version import __version__
-import time
-from multiprocessing.pool import ThreadPool
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import threading
 import functools
 from schedule import Scheduler as Sched
 
@@ -17,20 +18,69 @@ __email__ = "sam.hunt@npl.co.uk"
 __status__ = "Development"
 
 
+def parse_start_time(start_time):
+    """
+    Returns scheduler start time
+
+    :type start_time: datetime.datetime/str
+    :param start_time: start time, as datetime, ISO format string (e.g. "2020-03-11T12:00") or
+    time of day string (e.g. "12:00", meaning its next occurrence)
+
+    :return: start time, None if not defined
+    :rtype: datetime.datetime
+    """
+
+    if (start_time is None) or isinstance(start_time, datetime):
+        return start_time
+
+    if start_time.strip() == "":
+        return None
+
+    try:
+        return datetime.fromisoformat(start_time.strip())
+    except ValueError:
+        pass
+
+    for fmt in ["%H:%M", "%H:%M:%S"]:
+        try:
+            time_of_day = datetime.strptime(start_time.strip(), fmt).time()
+        except ValueError:
+            continue
+
+        now = datetime.now()
+        start = datetime.combine(now.date(), time_of_day)
+        return start if start >= now else start + timedelta(days=1)
+
+    raise ValueError("Invalid start_time: " + start_time)
+
+
 class Scheduler:
     """
     Class to schedule recurring jobs (i.e. like cron)
 
+    Jobs scheduled to run in parallel are dispatched to a persistent pool of threads, so
+    several jobs may make progress at the same time, while a job is never run again
+    before its previous run has completed.
+
     :param logger: logger (optional)
     :type logger: logging.logger
+
+    :param max_workers: maximum number of parallel jobs running at the same time (optional, default is the
+    ThreadPoolExecutor default, min(32, cpu count + 4))
+    :type max_workers: int
     """
 
-    def __init__(self, logger=None):
+    def __init__(self, logger=None, max_workers=None):
         """
         Initialises class
         """
         self.scheduler = Sched()
         self.logger = logger
+        self.max_workers = max_workers
+        self.executor = None
+        self.running = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
 
     def schedule(self, job, *args, **kwargs):
         """
@@ -81,13 +131,15 @@ class Scheduler:
 
         return self.scheduler.jobs
 
-    @staticmethod
-    def job_wrapper(job, parallel=False, logger=None, name=None, *args, **kwargs):
+    def job_wrapper(self, job, parallel=False, logger=None, name=None, *args, **kwargs):
         """
         Wraps job function to provide logging, error handling and parallel processing when scheduled
 
         :type job: func
         :param job: function
+
+        :return: job return value, or if run in parallel the future of the job run (None if
+        the run is skipped because the previous run of the job has not completed)
         """
 
         if logger is not None:
@@ -116,28 +168,65 @@ class Scheduler:
 
                 return wrapper
 
-            job = with_logging(job, logger, name)
+            job_run = with_logging(job, logger, name)
+        else:
+            job_run = job
 
         if parallel:
-            pool = ThreadPool(processes=1)
-            async_result = pool.apply_async(job, args, kwargs)
-            return async_result.get()
+            key = name if name is not None else job
+
+            with self._lock:
+                previous = self.running.get(key)
+                if (previous is not None) and (not previous.done()):
+                    if logger is not None:
+                        logger.info("Skipped: " + str(name) + " - previous run not complete")
+                    return None
+
+                if self.executor is None:
+                    self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+                future = self.executor.submit(job_run, *args, **kwargs)
+                self.running[key] = future
+
+            return future
         else:
-            return job(*args, **kwargs)
+            return job_run(*args, **kwargs)
 
     def run(self, start_time=None):
         """
-        Run scheduled jobs
+        Run scheduled jobs, until stopped
 
-        :type start_time: datetime.datetime
-        :param start_time: time to delay starting running pending jobs too
+        :type start_time: datetime.datetime/str
+        :param start_time: time to delay starting running pending jobs too, at which all jobs
+        are run and then repeated at their interval (see parse_start_time for string formats)
         """
 
-        # todo - implement start_time feature
+        self._stop.clear()
+
+        start_time = parse_start_time(start_time)
+        if start_time is not None:
+            if self._stop.wait(max((start_time - datetime.now()).total_seconds(), 0)):
+                return
+            self.scheduler.run_all()
+
+        try:
+            while not self._stop.is_set():
+                self.scheduler.run_pending()
+
+                # sleep until next job is due (or stopped)
+                self._stop.wait(self.scheduler.idle_seconds)
+
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+                self.executor = None
+
+    def stop(self):
+        """
+        Stops running scheduled jobs, once running jobs have completed
+        """
 
-        while True:
-            self.scheduler.run_pending()
-            time.sleep(1)
+        self._stop.set()
 
 
 if __name__ == '__main__':
@@ -12,8 +12,11 @@ from hypernets_processor.data_utils.average import Average
 from hypernets_processor.data_io.hypernets_reader import HypernetsReader
 from hypernets_processor.data_io.hypernets_writer import HypernetsWriter
 from hypernets_processor.utils.paths import parse_sequence_path
+from hypernets_processor.utils.stage_graph import StageGraph
+from hypernets_processor.utils.profiling import profile_stage
 from hypernets_processor.calibration.calibration_converter import CalibrationConverter
 
+from functools import partial
 import os
 
 '''___Authorship___'''
@@ -24,6 +27,10 @@ __maintainer__ = "Sam Hunt"
 __email__ = "sam.hunt@npl.co.uk"
 __status__ = "Development"
 
+# default maximum number of stages run at once, kept small as sequences may also be processed
+# in parallel processes
+PARALLEL_STAGES = 2
+
 
 class SequenceProcessor:
     """
@@ -39,6 +46,40 @@ class SequenceProcessor:
         """
         self.context = context
 
+        # stage engines, built on first use and reused for every sequence of the job
+        self.reader = None
+        self.calcon = None
+        self.cal = None
+        self.surf = None
+        self.avg = None
+        self.rhymer = None
+        self.writer = None
+        self.comb = None
+        self.intp = None
+
+    def build_pipeline(self):
+        """
+        Builds the processing stage engines for the network of the job, if not built already.
+        These hold the reader, template, plotting and uncertainty propagation objects, and
+        use the process-wide LUT and calibration caches, so per sequence only the data
+        processing itself is left to do.
+        """
+
+        if self.reader is None:
+            self.reader = HypernetsReader(self.context)
+            self.calcon = CalibrationConverter(self.context)
+            self.cal = Calibrate(self.context, MCsteps=100)
+            self.surf = SurfaceReflectance(self.context, MCsteps=1000)
+
+            # SurfaceReflectance already holds the engines needed for the other stages
+            self.avg = self.surf.avg
+            self.rhymer = self.surf.rh
+            self.writer = self.surf.writer
+
+        if (self.context.get_config_value("network") == "l") and (self.comb is None):
+            self.comb = CombineSWIR(self.context, MCsteps=100)
+            self.intp = Interpolate(self.context, MCsteps=1000)
+
     def process_sequence(self, sequence_path):
         """
         Processes sequence file
@@ -49,94 +90,140 @@ class SequenceProcessor:
         self.context.set_config_value("sequence_path", sequence_path)
         self.context.set_config_value("sequence_name", os.path.basename(sequence_path))
 
-        reader = HypernetsReader(self.context)
-        calcon = CalibrationConverter(self.context)
-        cal = Calibrate(self.context, MCsteps=100)
-        surf = SurfaceReflectance(self.context, MCsteps=1000)
-        avg = Average(self.context,)
-        rhymer=RhymerHypstar(self.context)
-        writer=HypernetsWriter(self.context)
-
-
-        if self.context.get_config_value("network") == "w":
-
-            calibration_data_rad,calibration_data_irr = calcon.read_calib_files()
-            # Read L0
-            self.context.logger.info("Reading raw data...")
-            l0_irr,l0_rad,l0_bla = reader.read_sequence(sequence_path,calibration_data_rad,calibration_data_irr)
-            self.context.logger.info("Done")
-
-            # Calibrate to L1a
-            self.context.logger.info("Processing to L1a...")
-            L1a_rad = cal.calibrate_l1a("radiance",l0_rad,l0_bla,calibration_data_rad)
-            L1a_irr = cal.calibrate_l1a("irradiance",l0_irr,l0_bla,calibration_data_irr)
-            self.context.logger.info("Done")
-
-            self.context.logger.info("Processing to L1b radiance...")
-            L1b_rad = avg.average_l1b("radiance", L1a_rad)
-            print(L1b_rad)
-            if self.context.get_config_value("write_l1b"):
-                writer.write(L1b_rad, overwrite=True)
-            self.context.logger.info("Done")
-
-            self.context.logger.info("Processing to L1b irradiance...")
-            L1b_irr = avg.average_l1b("irradiance", L1a_irr)
-            if self.context.get_config_value("write_l1b"):
-                writer.write(L1b_irr, overwrite=True)
-            self.context.logger.info("Done")
-
-            self.context.logger.info("Processing to L1c...")
-            L1c_int = rhymer.process_l1c_int(L1a_rad, L1a_irr)
-            L1c = surf.process_l1c(L1c_int)
-            self.context.logger.info("Done")
-
-            self.context.logger.info("Processing to L2a...")
-            L2a = surf.process_l2(L1c)
-            self.context.logger.info("Done")
-
-        elif self.context.get_config_value("network") == "l":
-            comb = CombineSWIR(self.context,MCsteps=100)
-            intp = Interpolate(self.context,MCsteps=1000)
-
-            # Read L0
-            self.context.logger.info("Reading raw data...")
-            (calibration_data_rad,calibration_data_irr,calibration_data_swir_rad,
-             calibration_data_swir_irr) = calcon.read_calib_files()
-            l0_irr,l0_rad,l0_bla,l0_swir_irr,l0_swir_rad,l0_swir_bla = reader.read_sequence(sequence_path,calibration_data_rad,calibration_data_irr,calibration_data_swir_rad,calibration_data_swir_irr)
-            self.context.logger.info("Done")
-
-            # Calibrate to L1a
-            self.context.logger.info("Processing to L1a...")
-            L1a_rad = cal.calibrate_l1a("radiance",l0_rad,l0_bla,calibration_data_rad)
-            L1a_irr = cal.calibrate_l1a("irradiance",l0_irr,l0_bla,calibration_data_irr)
-
-            L1a_swir_rad = cal.calibrate_l1a("radiance",l0_swir_rad,l0_swir_bla,
-                                             calibration_data_swir_rad,swir=True)
-            L1a_swir_irr = cal.calibrate_l1a("irradiance",l0_swir_irr,l0_swir_bla,
-                                             calibration_data_swir_irr,swir=True)
-            self.context.logger.info("Done")
-
-            self.context.logger.info("Processing to L1b radiance...")
-            L1b_rad = comb.combine("radiance", L1a_rad, L1a_swir_rad)
-            self.context.logger.info("Done")
-
-            self.context.logger.info("Processing to L1b irradiance...")
-            L1b_irr = comb.combine("irradiance", L1a_irr, L1a_swir_irr)
-            self.context.logger.info("Done")
-
-            self.context.logger.info("Processing to L1c...")
-            L1c = intp.interpolate_l1c(L1b_rad, L1b_irr)
-            self.context.logger.info("Done")
-
-            self.context.logger.info("Processing to L2a...")
-            L2a = surf.process_l2(L1c)
-            self.context.logger.info("Done")
-
-        else:
-            raise NameError("Invalid network: " + self.context.get_config_value("network"))
+        self.build_pipeline()
+        graph = self.build_stage_graph(self.context.get_config_value("network"))
+
+        with profile_stage(self.context, "read_calibration"):
+            calibration_data = self.calcon.read_calib_files()
+        # products of sequence written before moving on to next sequence
+        try:
+            graph.run({"sequence_path": sequence_path, "calibration_data": calibration_data})
+        except Exception:
+            # processing error raised, not any error writing products queued before it
+            try:
+                self.writer.flush()
+            except Exception as e:
+                self.context.logger.error("Writing failed: " + repr(e))
+            raise
+
+        self.writer.flush()
+
+        stages, duration = graph.critical_path()
+        self.context.logger.debug(
+            "Critical path: " + " -> ".join(stages) + " ({:.1f} s)".format(duration)
+        )
 
         return None
 
+    def build_stage_graph(self, network):
+        """
+        Returns graph of the processing stages for network, where independent branches (e.g.
+        radiance and irradiance, VNIR and SWIR) run concurrently. The maximum number of
+        stages run at once may be set with the "parallel_stages" config value (default
+        PARALLEL_STAGES). Stages are recorded with the context profiler.
+
+        :type network: str
+        :param network: network, "w" for water or "l" for land
+
+        :return: stage graph, to be run with "sequence_path" and "calibration_data" values
+        :rtype: hypernets_processor.utils.stage_graph.StageGraph
+        """
+
+        parallel_stages = self.context.get_config_value("parallel_stages")
+        graph = StageGraph(max_workers=PARALLEL_STAGES if parallel_stages is None else int(parallel_stages),
+                           profiler=getattr(self.context, "profiler", None))
+
+        if network == "w":
+            graph.add_stage("read", self.read_sequence, ["sequence_path", "calibration_data"],
+                            ["l0_irr", "l0_rad", "l0_bla"])
+            graph.add_stage("calibrate_rad", partial(self.calibrate, "radiance"),
+                            ["l0_rad", "l0_bla", "calibration_data"], ["l1a_rad"])
+            graph.add_stage("calibrate_irr", partial(self.calibrate, "irradiance"),
+                            ["l0_irr", "l0_bla", "calibration_data"], ["l1a_irr"])
+            graph.add_stage("average_rad", partial(self.average, "radiance"), ["l1a_rad"], ["l1b_rad"])
+            graph.add_stage("average_irr", partial(self.average, "irradiance"), ["l1a_irr"], ["l1b_irr"])
+            graph.add_stage("process_l1c", self.process_l1c_water, ["l1a_rad", "l1a_irr"], ["l1c"])
+            graph.add_stage("process_l2a", self.process_l2a, ["l1c"], ["l2a"])
+
+        elif network == "l":
+            graph.add_stage("read", self.read_sequence, ["sequence_path", "calibration_data"],
+                            ["l0_irr", "l0_rad", "l0_bla", "l0_swir_irr", "l0_swir_rad", "l0_swir_bla"])
+            graph.add_stage("calibrate_rad", partial(self.calibrate, "radiance"),
+                            ["l0_rad", "l0_bla", "calibration_data"], ["l1a_rad"])
+            graph.add_stage("calibrate_irr", partial(self.calibrate, "irradiance"),
+                            ["l0_irr", "l0_bla", "calibration_data"], ["l1a_irr"])
+            graph.add_stage("calibrate_swir_rad", partial(self.calibrate_swir, "radiance"),
+                            ["l0_swir_rad", "l0_swir_bla", "calibration_data"], ["l1a_swir_rad"])
+            graph.add_stage("calibrate_swir_irr", partial(self.calibrate_swir, "irradiance"),
+                            ["l0_swir_irr", "l0_swir_bla", "calibration_data"], ["l1a_swir_irr"])
+            graph.add_stage("combine_rad", partial(self.combine, "radiance"),
+                            ["l1a_rad", "l1a_swir_rad"], ["l1b_rad"])
+            graph.add_stage("combine_irr", partial(self.combine, "irradiance"),
+                            ["l1a_irr", "l1a_swir_irr"], ["l1b_irr"])
+            graph.add_stage("process_l1c", self.process_l1c_land, ["l1b_rad", "l1b_irr"], ["l1c"])
+            graph.add_stage("process_l2a", self.process_l2a, ["l1c"], ["l2a"])
+
+        else:
+            raise NameError("Invalid network: " + network)
+
+        return graph
+
+    def read_sequence(self, sequence_path, calibration_data):
+        self.context.logger.info("Reading raw data...")
+        l0 = self.reader.read_sequence(sequence_path, *calibration_data)
+        self.context.logger.info("Done")
+        return l0
+
+    def calibrate(self, measurandstring, l0, l0_bla, calibration_data):
+        calibration_data = calibration_data[0] if measurandstring == "radiance" else calibration_data[1]
+
+        self.context.logger.info("Processing to L1a " + measurandstring + "...")
+        l1a = self.cal.calibrate_l1a(measurandstring, l0, l0_bla, calibration_data)
+        self.context.logger.info("Done")
+        return l1a
+
+    def calibrate_swir(self, measurandstring, l0, l0_bla, calibration_data):
+        calibration_data = calibration_data[2] if measurandstring == "radiance" else calibration_data[3]
+
+        self.context.logger.info("Processing to L1a SWIR " + measurandstring + "...")
+        l1a = self.cal.calibrate_l1a(measurandstring, l0, l0_bla, calibration_data, swir=True)
+        self.context.logger.info("Done")
+        return l1a
+
+    def average(self, measurandstring, l1a):
+
+        self.context.logger.info("Processing to L1b " + measurandstring + "...")
+        l1b = self.avg.average_l1b(measurandstring, l1a)
+        if self.context.get_config_value("write_l1b"):
+            self.writer.write(l1b, overwrite=True)
+        self.context.logger.info("Done")
+        return l1b
+
+    def combine(self, measurandstring, l1a, l1a_swir):
+
+        self.context.logger.info("Processing to L1b " + measurandstring + "...")
+        l1b = self.comb.combine(measurandstring, l1a, l1a_swir)
+        self.context.logger.info("Done")
+        return l1b
+
+    def process_l1c_water(self, l1a_rad, l1a_irr):
+        self.context.logger.info("Processing to L1c...")
+        l1c_int = self.rhymer.process_l1c_int(l1a_rad, l1a_irr)
+        l1c = self.surf.process_l1c(l1c_int)
+        self.context.logger.info("Done")
+        return l1c
+
+    def process_l1c_land(self, l1b_rad, l1b_irr):
+        self.context.logger.info("Processing to L1c...")
+        l1c = self.intp.interpolate_l1c(l1b_rad, l1b_irr)
+        self.context.logger.info("Done")
+        return l1c
+
+    def process_l2a(self, l1c):
+        self.context.logger.info("Processing to L2a...")
+        l2a = self.surf.process_l2(l1c)
+        self.context.logger.info("Done")
+        return l2a
 
 if __name__ == "__main__":
     pass
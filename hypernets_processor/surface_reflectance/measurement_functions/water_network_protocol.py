@@ -10,39 +10,66 @@ class WaterNetworkProtocol:
         self.rh = RhymerHypstar(context)
         self.rhp = RhymerProcessing(context)
         self.rhs = RhymerShared(context)
+        self._similarity_cache = {}
 
-    def function(self,upwelling_radiance,downwelling_radiance,irradiance,rhof, wavelength):
+    def function(self,upwelling_radiance,downwelling_radiance,irradiance,rhof, wavelength,
+                 iref1=None,iref2=None,alpha=None):
         '''
         This function implements the measurement function.
         Each of the arguments can be either a scalar or a vector (1D-array).
+        The similarity reference pixels and alpha can be given as precomputed fixed
+        parameters (see similarity_parameters), otherwise they are looked up here.
         '''
 
         # default water network processing
-        water_leaving_radiance = [(upwelling_radiance[w] - (rhof * downwelling_radiance[w])) for w in
-                                  range(len(downwelling_radiance))]
-        reflectance_nosc = [np.pi * (upwelling_radiance[w] - (rhof * downwelling_radiance[w])) / irradiance[w] for w in
-                            range(len(downwelling_radiance))]
+        # arrays have wavelength as first dimension, rhof broadcasts over wavelength
+        upwelling_radiance = np.asarray(upwelling_radiance)
+        downwelling_radiance = np.asarray(downwelling_radiance)
+        irradiance = np.asarray(irradiance)
+        rhof = np.asarray(rhof)
+
+        water_leaving_radiance = upwelling_radiance - rhof * downwelling_radiance
+        reflectance_nosc = np.pi * water_leaving_radiance / irradiance
 
         # NIR SIMIL CORRECTION
         # retrieve variables for NIR SIMIL correction
+        if (iref1 is None) or (iref2 is None) or (alpha is None):
+            wavelength = np.asarray(wavelength)
+            iref1, iref2, alpha = self.similarity_parameters(
+                wavelength.reshape((len(wavelength), -1))[:, 0])
+
+        epsilon = (alpha * reflectance_nosc[iref1] - reflectance_nosc[iref2]) / (alpha - 1.0)
+        reflectance = reflectance_nosc - epsilon
+
+        return water_leaving_radiance, reflectance_nosc, reflectance, epsilon
+
+    def similarity_parameters(self, wavelength):
+        '''
+        Returns the pixel indices of the two similarity reference wavelengths and the
+        similarity alpha for a wavelength grid. Results are cached per wavelength grid
+        and similarity configuration.
+        '''
         w1 = self.context.get_config_value("similarity_w1")
         w2 = self.context.get_config_value("similarity_w2")
         alpha = self.context.get_config_value("similarity_alpha")
 
+        wavelength = np.asarray(wavelength, dtype=float)
+        key = (wavelength.tobytes(), w1, w2, alpha)
+        if key in self._similarity_cache:
+            return self._similarity_cache[key]
+
         iref1, wref1 = self.rhs.closest_idx(wavelength, w1)
         iref2, wref2 = self.rhs.closest_idx(wavelength, w2)
 
         ## get pixel index for similarity
         if alpha is None:
             ssd = self.rhp.similarity_read()
-            id1, w1 = self.rhs.closest_idx(ssd['wave'], w1 / 1000.)
-            id2, w2 = self.rhs.closest_idx(ssd['wave'], w2 / 1000.)
+            id1, ws1 = self.rhs.closest_idx(ssd['wave'], w1 / 1000.)
+            id2, ws2 = self.rhs.closest_idx(ssd['wave'], w2 / 1000.)
             alpha = ssd['ave'][id1] / ssd['ave'][id2]
 
-        epsilon = (alpha * reflectance_nosc[iref1] - reflectance_nosc[iref2]) / (alpha - 1.0)
-        reflectance = [r - epsilon for r in reflectance_nosc]
-
-        return water_leaving_radiance, reflectance_nosc, reflectance, epsilon
+        self._similarity_cache[key] = (iref1, iref2, alpha)
+        return iref1, iref2, alpha
 
     @staticmethod
     def get_name():
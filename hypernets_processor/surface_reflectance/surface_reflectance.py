@@ -17,6 +17,7 @@ from hypernets_processor.data_utils.propagate_uncertainties import PropagateUnc
 
 import punpy
 import numpy as np
+import functools
 
 '''___Authorship___'''
 __author__ = "Pieter De Vis"
@@ -55,9 +56,14 @@ class SurfaceReflectance:
         u_systematic_input_qty, corr_systematic_input_qty = \
             self.prop.find_u_systematic_input(input_vars, dataset_l1c)
 
+        # resolve similarity spectrum parameters once, rather than in every MC draw
+        iref1, iref2, alpha = l1ctol1b_function.similarity_parameters(dataset_l1c["wavelength"].values)
+        measurement_function = functools.partial(l1ctol1b_function.function,
+                                                 iref1=iref1, iref2=iref2, alpha=alpha)
+
         L1c = self.prop.process_measurement_function_l2(
             ["water_leaving_radiance", "reflectance_nosc", "reflectance", "epsilon"],
-            dataset_l1c, l1ctol1b_function.function, input_qty,
+            dataset_l1c, measurement_function, input_qty,
             u_random_input_qty, u_systematic_input_qty, corr_systematic_input_qty,param_fixed=[False,False,False,False,True])
 
         failSimil=self.rh.qc_similarity(L1c)
@@ -41,7 +41,7 @@ def setup_test_metadata_db(url):
     :param url: database url
     """
 
-    db = HypernetsDBBuilder.create_db_template(url, "metadata")
+    db = HypernetsDBBuilder().create_db_template(url, "metadata")
 
     # todo - add test data to test metadata db
 
@@ -57,13 +57,13 @@ def setup_test_anomaly_db(url):
     :param url: database url
     """
 
-    db = HypernetsDBBuilder.create_db_template(url, "anomaly")
+    db = HypernetsDBBuilder().create_db_template(url, "anomaly")
 
     db["anomalies"].insert(
         dict(
-            anomaly="anomaly_name",
-            raw_product_name="SEQ20200311T112330",
-            site="site",
+            anomaly_id="anomaly_name",
+            sequence_name="SEQ20200311T112330",
+            site_id="test",
         )
     )
 
@@ -79,27 +79,27 @@ def setup_test_archive_db(url):
     :param url: database url
     """
 
-    db = HypernetsDBBuilder.create_db_template(url, "archive")
+    db = HypernetsDBBuilder().create_db_template(url, "archive")
 
     db["products"].insert(
         dict(
             product_name="new_product1",
-            raw_product_name="SEQ20200311T112130",
-            site="site",
+            sequence_name="SEQ20200311T112130",
+            site_id="test",
         )
     )
     db["products"].insert(
         dict(
             product_name="new_product2",
-            raw_product_name="SEQ20200311T112230",
-            site="site",
+            sequence_name="SEQ20200311T112230",
+            site_id="test",
         )
     )
     db["products"].insert(
         dict(
             product_name="new_product3",
-            raw_product_name="SEQ20200311T112430",
-            site="site",
+            sequence_name="SEQ20200311T112430",
+            site_id="test",
         )
     )
 
@@ -10,8 +10,10 @@ import logging
 from contextlib import contextmanager
 from io import StringIO
 import multiprocessing
+import threading
 import time
-from hypernets_processor.scheduler import Scheduler
+from datetime import datetime, timedelta
+from hypernets_processor.scheduler import Scheduler, parse_start_time
 
 
 '''___Authorship___'''
@@ -77,7 +79,7 @@ class TestScheduler(unittest.TestCase):
 
         a = 2
         b = 4
-        c = s.job_wrapper(test_job, parallel=True, logger=None, a=a, b=b)
+        c = s.job_wrapper(test_job, parallel=True, logger=None, a=a, b=b).result()
         self.assertEqual(a+b, c)
 
     def test_job_wrapper_parallel_logger(self):
@@ -88,7 +90,7 @@ class TestScheduler(unittest.TestCase):
         b = 4
 
         with captured_output() as (out, err):
-            c = s.job_wrapper(test_job, parallel=True, logger=return_test_logger(), name="Test Job", a=a, b=b)
+            c = s.job_wrapper(test_job, parallel=True, logger=return_test_logger(), name="Test Job", a=a, b=b).result()
 
         # This can go inside or outside the `with` block
         output = out.getvalue().strip()
@@ -101,12 +103,43 @@ class TestScheduler(unittest.TestCase):
         s = Scheduler()
 
         with captured_output() as (out, err):
-            c = s.job_wrapper(bad_job, parallel=True, logger=return_test_logger(), name="Test Job")
+            c = s.job_wrapper(bad_job, parallel=True, logger=return_test_logger(), name="Test Job").result()
 
         # This can go inside or outside the `with` block
         output = out.getvalue().strip()
         self.assertEqual(output, 'Started: Test Job\nFailed: Test Job - ZeroDivisionError: division by zero')
 
+    def test_job_wrapper_parallel_overlap(self):
+
+        s = Scheduler(max_workers=2)
+        event = threading.Event()
+
+        future1 = s.job_wrapper(event.wait, True, None, "Test Job")
+        future2 = s.job_wrapper(event.wait, True, None, "Test Job")
+        future3 = s.job_wrapper(event.wait, True, None, "Other Job")
+
+        # second run of job skipped while first is running, other job runs concurrently
+        self.assertIsNone(future2)
+        self.assertFalse(future3.done())
+
+        event.set()
+        self.assertTrue(future1.result(timeout=5))
+        self.assertTrue(future3.result(timeout=5))
+
+        future4 = s.job_wrapper(test_job, True, None, "Test Job", 2, 4)
+        self.assertEqual(future4.result(timeout=5), 6)
+
+    def test_parse_start_time(self):
+        self.assertIsNone(parse_start_time(None))
+        self.assertIsNone(parse_start_time(""))
+        self.assertEqual(parse_start_time("2020-03-11T12:30"), datetime(2020, 3, 11, 12, 30))
+
+        start_time = parse_start_time("12:30")
+        self.assertEqual((start_time.hour, start_time.minute), (12, 30))
+        self.assertTrue(datetime.now() <= start_time <= datetime.now() + timedelta(days=1))
+
+        self.assertRaises(ValueError, parse_start_time, "2")
+
     def test_schedule_seconds(self):
 
         s = Scheduler(logger=return_test_logger())
@@ -179,6 +212,22 @@ class TestScheduler(unittest.TestCase):
         self.assertEqual(job.job_func.args[4], 2)
         self.assertEqual(job.job_func.args[5], 4)
 
+    def test_run_stop(self):
+
+        s = Scheduler()
+
+        scheduler_job_config = {"seconds": 1,
+                                "parallel": True,
+                                "name": "test name"}
+
+        s.schedule(s.stop, scheduler_job_config=scheduler_job_config)
+
+        t = threading.Thread(target=s.run)
+        t.start()
+        t.join(timeout=5)
+
+        self.assertFalse(t.is_alive())
+
     def test_run(self):
 
         log_fname = "test.txt"
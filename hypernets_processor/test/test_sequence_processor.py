@@ -0,0 +1,54 @@
+"""
+Tests for SequenceProcessor class
+"""
+
+import unittest
+from hypernets_processor.version import __version__
+from hypernets_processor.context import Context
+from hypernets_processor.test.test_functions import setup_test_context
+from hypernets_processor.sequence_processor import SequenceProcessor, PARALLEL_STAGES
+
+
+"""___Authorship___"""
+__author__ = "Sam Hunt"
+__created__ = "19/10/2026"
+__version__ = __version__
+__maintainer__ = "Sam Hunt"
+__email__ = "sam.hunt@npl.co.uk"
+__status__ = "Development"
+
+
+class TestSequenceProcessor(unittest.TestCase):
+    def test_build_stage_graph_parallel_stages_default(self):
+        sp = SequenceProcessor(context=Context())
+
+        for network in ["w", "l"]:
+            self.assertEqual(sp.build_stage_graph(network).max_workers, PARALLEL_STAGES)
+
+    def test_build_stage_graph_parallel_stages(self):
+        context = Context()
+        context.set_config_value("parallel_stages", "4")
+        sp = SequenceProcessor(context=context)
+
+        self.assertEqual(sp.build_stage_graph("w").max_workers, 4)
+
+    def test_build_pipeline_product_format_zarr(self):
+        context = setup_test_context()
+        context.set_config_value("product_format", "zarr")
+        sp = SequenceProcessor(context=context)
+        sp.build_pipeline()
+
+        self.assertEqual(sp.writer.return_fmt(), "zarr")
+
+    def test_build_pipeline_product_format_csv(self):
+        context = setup_test_context()
+        context.set_config_value("product_format", "csv")
+        sp = SequenceProcessor(context=context)
+        sp.build_pipeline()
+
+        self.assertEqual(context.get_config_value("product_format"), "csv")
+        self.assertEqual(sp.writer.return_fmt(), "csv")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,300 @@
+"""
+Module for recording processing time and memory use of processing stages
+"""
+
+from hypernets_processor.version import __version__
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+import functools
+import os
+import threading
+import time
+import tracemalloc
+import sys
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+"""___Authorship___"""
+__author__ = "Sam Hunt"
+__created__ = "19/10/2026"
+__version__ = __version__
+__maintainer__ = "Sam Hunt"
+__email__ = "sam.hunt@npl.co.uk"
+__status__ = "Development"
+
+# separator of stage names in the path of sub-stages, e.g. "calibrate_rad.mc_propagation"
+STAGE_SEPARATOR = "."
+
+
+class Profiler:
+    """
+    Class to record processing time and memory use of processing stages, for each sequence processed.
+
+    Stages are timed with the stage context manager, stages entered within another stage (on the same thread) are
+    recorded as its sub-stages. For each stage the number of calls, wall-clock duration and thread cpu time are
+    recorded, and, if tracing allocations, the net memory allocated. For the sequence, its duration, the resident set
+    size of the process at its end and its change over the sequence, and, if tracing allocations, the peak traced
+    memory are recorded. The peak resident set size of the process is also recorded, though is the peak over the
+    lifetime of the process, not of the sequence.
+
+    Allocations are traced with tracemalloc, which slows processing, so are only traced if requested. Traced memory is
+    process-wide, so the allocations of stages that run concurrently include each other's allocations.
+    """
+
+    def __init__(self):
+        self.stages = OrderedDict()
+        self.sequence = {}
+        self.trace_allocations = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._t0 = None
+        self._rss0 = None
+        self._started_tracing = False
+
+    def start_sequence(self, trace_allocations=False):
+        """
+        Resets records to start recording processing of a sequence
+
+        :type trace_allocations: bool
+        :param trace_allocations: switch to trace memory allocations
+        """
+
+        with self._lock:
+            self.stages = OrderedDict()
+            self.sequence = {}
+
+        self.trace_allocations = trace_allocations
+        if trace_allocations:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+
+        self._rss0 = return_rss()
+        self._t0 = time.perf_counter()
+
+    def stop_sequence(self):
+        """
+        Stops recording processing of a sequence, recording its duration and memory use
+        """
+
+        duration = time.perf_counter() - self._t0 if self._t0 is not None else None
+        self._t0 = None
+
+        traced_peak = None
+        if self.trace_allocations and tracemalloc.is_tracing():
+            traced_peak = tracemalloc.get_traced_memory()[1]
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+        rss = return_rss()
+        rss_change = rss - self._rss0 if (rss is not None) and (self._rss0 is not None) else None
+
+        with self._lock:
+            self.sequence = {"duration": duration, "rss": rss, "rss_change": rss_change,
+                             "process_peak_rss": return_peak_rss(), "traced_peak": traced_peak}
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Context manager to record stage run in its context. Re-entering the current stage of the thread (e.g. a method
+        calling itself) is recorded as the one stage.
+
+        :type name: str
+        :param name: stage name
+        """
+
+        parents = self._return_stack()
+        if parents and (parents[-1] == name):
+            yield
+            return
+
+        parents.append(name)
+        path = STAGE_SEPARATOR.join(parents)
+
+        allocated0 = tracemalloc.get_traced_memory()[0] if self.trace_allocations else None
+        cpu_time0 = time.thread_time()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - t0
+            cpu_time = time.thread_time() - cpu_time0
+            allocated = None
+            if (allocated0 is not None) and tracemalloc.is_tracing():
+                allocated = tracemalloc.get_traced_memory()[0] - allocated0
+            parents.pop()
+
+            with self._lock:
+                if path not in self.stages:
+                    self.stages[path] = {"calls": 0, "duration": 0., "cpu_time": 0., "allocated": None}
+
+                record = self.stages[path]
+                record["calls"] += 1
+                record["duration"] += duration
+                record["cpu_time"] += cpu_time
+                if allocated is not None:
+                    record["allocated"] = (record["allocated"] or 0) + allocated
+
+    def metrics(self):
+        """
+        Returns records of the last processed sequence
+
+        :return: sequence records, with entries "sequence" (sequence duration and memory use) and "stages" (records by
+        stage path)
+        :rtype: dict
+        """
+
+        with self._lock:
+            return {"sequence": dict(self.sequence),
+                    "stages": OrderedDict((path, dict(record)) for path, record in self.stages.items())}
+
+    def _return_stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+
+def profile_stage(context, name):
+    """
+    Returns context manager to record stage with the profiler of the context, which does nothing if the context has no
+    profiler
+
+    :type context: hypernets_processor.context.Context
+    :param context: processor context
+
+    :type name: str
+    :param name: stage name
+
+    :return: stage context manager
+    """
+
+    profiler = getattr(context, "profiler", None)
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(name)
+
+
+def profile_method(name):
+    """
+    Returns decorator to record method as stage with the profiler of the instance context, i.e. of self.context
+
+    :type name: str
+    :param name: stage name
+
+    :return: method decorator
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with profile_stage(getattr(self, "context", None), name):
+                return method(self, *args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def return_rss():
+    """
+    Returns current resident set size of the process
+
+    :return: resident set size in bytes, None if not available on platform
+    :rtype: int
+    """
+
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def return_peak_rss():
+    """
+    Returns peak resident set size over the lifetime of the process
+
+    :return: peak resident set size in bytes, None if not available on platform
+    :rtype: int
+    """
+
+    if resource is None:
+        return None
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # reported in kilobytes, except on macOS
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+def format_profile_report(metrics):
+    """
+    Returns report of processing time and memory use by stage, summed over processed sequences
+
+    :type metrics: list
+    :param metrics: sequence records, as returned by Profiler.metrics
+
+    :return: report
+    :rtype: str
+    """
+
+    total_duration = sum(m["sequence"].get("duration") or 0. for m in metrics)
+    peak_rss = max((m["sequence"].get("process_peak_rss") or 0 for m in metrics), default=0)
+    traced_peak = max((m["sequence"].get("traced_peak") or 0 for m in metrics), default=0)
+
+    stages = OrderedDict()
+    for m in metrics:
+        for path, record in m["stages"].items():
+            if path not in stages:
+                stages[path] = {"calls": 0, "duration": 0., "cpu_time": 0., "allocated": None}
+            stages[path]["calls"] += record["calls"]
+            stages[path]["duration"] += record["duration"]
+            stages[path]["cpu_time"] += record["cpu_time"]
+            if record["allocated"] is not None:
+                stages[path]["allocated"] = (stages[path]["allocated"] or 0) + record["allocated"]
+
+    width = max([len("stage")] + [2 * path.count(STAGE_SEPARATOR) + len(path.split(STAGE_SEPARATOR)[-1])
+                                  for path in stages])
+
+    lines = ["Processed " + str(len(metrics)) + " sequences in {:.2f} s".format(total_duration),
+             "Process peak RSS: " + _format_bytes(peak_rss) +
+             (", peak traced memory: " + _format_bytes(traced_peak) if traced_peak else ""),
+             "",
+             "{:<{w}}  {:>6}  {:>10}  {:>7}  {:>10}  {:>10}".format(
+                 "stage", "calls", "time (s)", "%", "cpu (s)", "allocated", w=width)]
+
+    # sub-stages listed after their parent stage, indented
+    for path in sorted(stages, key=lambda p: _return_sort_key(p, stages)):
+        record = stages[path]
+        name = "  " * path.count(STAGE_SEPARATOR) + path.split(STAGE_SEPARATOR)[-1]
+        percent = 100. * record["duration"] / total_duration if total_duration > 0 else 0.
+        allocated = _format_bytes(record["allocated"]) if record["allocated"] is not None else "-"
+        lines.append("{:<{w}}  {:>6d}  {:>10.3f}  {:>7.1f}  {:>10.3f}  {:>10}".format(
+            name, record["calls"], record["duration"], percent, record["cpu_time"], allocated, w=width))
+
+    return "\n".join(lines)
+
+
+def _return_sort_key(path, stages):
+    # order of first record of each stage along path, so sub-stages sort under their parent
+    names = path.split(STAGE_SEPARATOR)
+    order = list(stages.keys())
+    return [order.index(STAGE_SEPARATOR.join(names[:i + 1])) if STAGE_SEPARATOR.join(names[:i + 1]) in stages
+            else len(order) for i in range(len(names))]
+
+
+def _format_bytes(n_bytes):
+    for unit in ["B", "kB", "MB"]:
+        if abs(n_bytes) < 1024:
+            return "{:.1f} {}".format(n_bytes, unit)
+        n_bytes /= 1024.
+    return "{:.1f} GB".format(n_bytes)
+
+
+if __name__ == "__main__":
+    pass
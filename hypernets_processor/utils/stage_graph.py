@@ -0,0 +1,161 @@
+"""
+Module for running processing stages as a dependency graph
+"""
+
+from hypernets_processor.version import __version__
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import nullcontext
+import time
+
+
+"""___Authorship___"""
+__author__ = "Sam Hunt"
+__created__ = "19/10/2026"
+__version__ = __version__
+__maintainer__ = "Sam Hunt"
+__email__ = "sam.hunt@npl.co.uk"
+__status__ = "Development"
+
+
+class StageGraph:
+    """
+    Class to run processing stages, declared by their input and output values, as a
+    dependency graph. Stages whose inputs are available are run concurrently, so
+    independent branches (e.g. radiance and irradiance processing) overlap.
+
+    :type max_workers: int
+    :param max_workers: (optional) maximum number of stages run at the same time
+
+    :type profiler: hypernets_processor.utils.profiling.Profiler
+    :param profiler: (optional) profiler to record stages with, stages timed within a stage function are recorded as
+    its sub-stages
+    """
+
+    def __init__(self, max_workers=None, profiler=None):
+        self.max_workers = max_workers
+        self.profiler = profiler
+        self.stages = {}
+        self.durations = {}
+
+    def add_stage(self, name, function, inputs=None, outputs=None):
+        """
+        Adds stage to graph
+
+        :type name: str
+        :param name: stage name
+
+        :type function: callable
+        :param function: stage function, called with the stage input values as positional arguments
+
+        :type inputs: list
+        :param inputs: (optional) names of stage input values
+
+        :type outputs: list
+        :param outputs: (optional) names of stage output values, the function should return
+        a tuple of values if more than one is named
+        """
+
+        if name in self.stages:
+            raise ValueError("Stage already defined: " + name)
+
+        self.stages[name] = {
+            "function": function,
+            "inputs": [] if inputs is None else list(inputs),
+            "outputs": [] if outputs is None else list(outputs),
+        }
+
+    def run(self, values=None):
+        """
+        Runs stages, each once all of its inputs are available
+
+        :type values: dict
+        :param values: (optional) initial values, by name
+
+        :return: all values, by name
+        :rtype: dict
+        """
+
+        values = {} if values is None else dict(values)
+        producers = self._producers()
+
+        for name, stage in self.stages.items():
+            for input_name in stage["inputs"]:
+                if (input_name not in values) and (input_name not in producers):
+                    raise ValueError("Input of stage " + name + " not available: " + input_name)
+
+        self.durations = {}
+        pending = dict(self.stages)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+
+                ready = [name for name, stage in pending.items()
+                         if all(input_name in values for input_name in stage["inputs"])]
+                for name in ready:
+                    stage = pending.pop(name)
+                    inputs = [values[input_name] for input_name in stage["inputs"]]
+                    running[executor.submit(self._run_stage, name, stage["function"], inputs)] = name
+
+                if not running:
+                    raise ValueError("Stages have cyclic dependencies: " + ", ".join(pending))
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        outputs, self.durations[name] = future.result()
+                    except Exception:
+                        for other in running:
+                            other.cancel()
+                        raise
+
+                    names = self.stages[name]["outputs"]
+                    if len(names) == 1:
+                        outputs = (outputs,)
+                    for output_name, output in zip(names, outputs if names else ()):
+                        values[output_name] = output
+
+        return values
+
+    def critical_path(self):
+        """
+        Returns the critical path of the last run, i.e. the chain of dependent stages with
+        the longest total duration, which bounds the run time however many stages are run
+        concurrently
+
+        :return: stage names along critical path and their total duration in seconds
+        :rtype: tuple
+        """
+
+        producers = self._producers()
+        paths = {}
+
+        def longest_path(name):
+            if name not in paths:
+                previous = [longest_path(producers[input_name])
+                            for input_name in self.stages[name]["inputs"]
+                            if input_name in producers]
+                stages, duration = max(previous, key=lambda p: p[1], default=([], 0.))
+                paths[name] = (stages + [name], duration + self.durations.get(name, 0.))
+            return paths[name]
+
+        return max((longest_path(name) for name in self.stages), key=lambda p: p[1],
+                   default=([], 0.))
+
+    def _producers(self):
+        producers = {}
+        for name, stage in self.stages.items():
+            for output_name in stage["outputs"]:
+                producers[output_name] = name
+        return producers
+
+    def _run_stage(self, name, function, inputs):
+        with self.profiler.stage(name) if self.profiler is not None else nullcontext():
+            t0 = time.perf_counter()
+            outputs = function(*inputs)
+            return outputs, time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    pass
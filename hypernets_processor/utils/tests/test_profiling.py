@@ -0,0 +1,167 @@
+"""
+Tests for profiling module
+"""
+
+import unittest
+from unittest.mock import MagicMock
+from hypernets_processor.version import __version__
+from hypernets_processor.utils.profiling import Profiler, profile_method, format_profile_report, return_rss
+from hypernets_processor.utils.stage_graph import StageGraph
+import numpy as np
+import threading
+
+
+"""___Authorship___"""
+__author__ = "Sam Hunt"
+__created__ = "19/10/2026"
+__version__ = __version__
+__maintainer__ = "Sam Hunt"
+__email__ = "sam.hunt@npl.co.uk"
+__status__ = "Development"
+
+
+class Engine:
+    def __init__(self, context):
+        self.context = context
+
+    @profile_method("mc_propagation")
+    def propagate(self, n=1):
+        if n > 1:
+            return self.propagate(n - 1)
+        return np.ones(100000)
+
+    @profile_method("interpolation")
+    def interpolate(self):
+        return self.propagate()
+
+
+class TestProfiler(unittest.TestCase):
+    def test_stage(self):
+        profiler = Profiler()
+        profiler.start_sequence()
+
+        with profiler.stage("calibrate"):
+            with profiler.stage("dark_matching"):
+                pass
+            with profiler.stage("dark_matching"):
+                pass
+
+        profiler.stop_sequence()
+        metrics = profiler.metrics()
+
+        self.assertEqual(list(metrics["stages"].keys()), ["calibrate.dark_matching", "calibrate"])
+        self.assertEqual(metrics["stages"]["calibrate.dark_matching"]["calls"], 2)
+        self.assertEqual(metrics["stages"]["calibrate"]["calls"], 1)
+        self.assertIsNone(metrics["stages"]["calibrate"]["allocated"])
+        self.assertGreaterEqual(metrics["sequence"]["duration"], metrics["stages"]["calibrate"]["duration"])
+        self.assertIsNone(metrics["sequence"]["traced_peak"])
+
+    def test_stage_threads(self):
+        profiler = Profiler()
+        profiler.start_sequence()
+
+        def run():
+            with profiler.stage("write"):
+                pass
+
+        with profiler.stage("process"):
+            thread = threading.Thread(target=run)
+            thread.start()
+            thread.join()
+
+        # stage run on another thread is not a sub-stage
+        self.assertCountEqual(profiler.metrics()["stages"].keys(), ["process", "write"])
+
+    def test_stage_error(self):
+        profiler = Profiler()
+        profiler.start_sequence()
+
+        def fail():
+            with profiler.stage("fail"):
+                raise RuntimeError("stage failed")
+
+        self.assertRaises(RuntimeError, fail)
+
+        with profiler.stage("next"):
+            pass
+
+        self.assertCountEqual(profiler.metrics()["stages"].keys(), ["fail", "next"])
+
+    @unittest.skipIf(return_rss() is None, "resident set size not available on platform")
+    def test_sequence_rss(self):
+        profiler = Profiler()
+
+        profiler.start_sequence()
+        data = np.ones(10000000)
+        profiler.stop_sequence()
+        sequence = profiler.metrics()["sequence"]
+
+        self.assertGreaterEqual(sequence["rss"], data.nbytes)
+        self.assertGreaterEqual(sequence["rss_change"], 0.9 * data.nbytes)
+        self.assertGreaterEqual(sequence["process_peak_rss"], data.nbytes)
+
+        # change is of the sequence, not the process lifetime
+        del data
+        profiler.start_sequence()
+        profiler.stop_sequence()
+        self.assertLess(profiler.metrics()["sequence"]["rss_change"], 10000000)
+
+    def test_trace_allocations(self):
+        context = MagicMock()
+        context.profiler = Profiler()
+        engine = Engine(context)
+
+        context.profiler.start_sequence(trace_allocations=True)
+        data = engine.propagate(3)
+        context.profiler.stop_sequence()
+        metrics = context.profiler.metrics()
+
+        # recursive calls recorded as one stage
+        self.assertEqual(list(metrics["stages"].keys()), ["mc_propagation"])
+        self.assertEqual(metrics["stages"]["mc_propagation"]["calls"], 1)
+        self.assertGreaterEqual(metrics["stages"]["mc_propagation"]["allocated"], data.nbytes)
+        self.assertGreaterEqual(metrics["sequence"]["traced_peak"], data.nbytes)
+
+    def test_profile_method_no_profiler(self):
+        engine = Engine(None)
+        self.assertEqual(len(engine.interpolate()), 100000)
+
+    def test_stage_graph(self):
+        context = MagicMock()
+        context.profiler = Profiler()
+        engine = Engine(context)
+
+        graph = StageGraph(profiler=context.profiler)
+        graph.add_stage("read", lambda: 1, [], ["l0"])
+        graph.add_stage("process_l1c", lambda l0: engine.interpolate(), ["l0"], ["l1c"])
+
+        context.profiler.start_sequence()
+        graph.run()
+        context.profiler.stop_sequence()
+
+        self.assertCountEqual(
+            context.profiler.metrics()["stages"].keys(),
+            ["read", "process_l1c", "process_l1c.interpolation", "process_l1c.interpolation.mc_propagation"]
+        )
+
+    def test_format_profile_report(self):
+        profiler = Profiler()
+        metrics = []
+        for i in range(2):
+            profiler.start_sequence()
+            with profiler.stage("process_l1c"):
+                with profiler.stage("interpolation"):
+                    pass
+            profiler.stop_sequence()
+            metrics.append(profiler.metrics())
+
+        report = format_profile_report(metrics).split("\n")
+
+        self.assertEqual(report[0][:22], "Processed 2 sequences ")
+        self.assertEqual(report[4].split()[:2], ["process_l1c", "2"])
+        self.assertEqual(report[5].split()[:2], ["interpolation", "2"])
+        self.assertEqual(report[5][:15], "  interpolation")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+Tests for stage_graph module
+"""
+
+import unittest
+from hypernets_processor.version import __version__
+from hypernets_processor.utils.stage_graph import StageGraph
+import threading
+import time
+
+
+"""___Authorship___"""
+__author__ = "Sam Hunt"
+__created__ = "19/10/2026"
+__version__ = __version__
+__maintainer__ = "Sam Hunt"
+__email__ = "sam.hunt@npl.co.uk"
+__status__ = "Development"
+
+
+class TestStageGraph(unittest.TestCase):
+    def test_run(self):
+        graph = StageGraph()
+        graph.add_stage("split", lambda x: (x + 1, x + 2), ["x"], ["a", "b"])
+        graph.add_stage("double_a", lambda a: 2 * a, ["a"], ["a2"])
+        graph.add_stage("double_b", lambda b: 2 * b, ["b"], ["b2"])
+        graph.add_stage("sum", lambda a2, b2: a2 + b2, ["a2", "b2"], ["total"])
+
+        values = graph.run({"x": 1})
+
+        self.assertEqual(values["a"], 2)
+        self.assertEqual(values["b2"], 6)
+        self.assertEqual(values["total"], 10)
+
+    def test_run_concurrent(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def branch(x):
+            # only passes if both branches are running at the same time
+            barrier.wait()
+            return x
+
+        graph = StageGraph(max_workers=2)
+        graph.add_stage("branch_1", branch, ["x"], ["y1"])
+        graph.add_stage("branch_2", branch, ["x"], ["y2"])
+
+        values = graph.run({"x": 1})
+
+        self.assertEqual(values["y1"], 1)
+        self.assertEqual(values["y2"], 1)
+
+    def test_run_error(self):
+        def fail(x):
+            raise RuntimeError("stage failed")
+
+        graph = StageGraph()
+        graph.add_stage("fail", fail, ["x"], ["y"])
+        graph.add_stage("after", lambda y: y, ["y"], ["z"])
+
+        self.assertRaises(RuntimeError, graph.run, {"x": 1})
+
+    def test_run_missing_input(self):
+        graph = StageGraph()
+        graph.add_stage("stage", lambda x: x, ["x"], ["y"])
+
+        self.assertRaises(ValueError, graph.run, {})
+
+    def test_critical_path(self):
+        def wait(duration):
+            def stage(*args):
+                time.sleep(duration)
+                return 0
+            return stage
+
+        graph = StageGraph()
+        graph.add_stage("read", wait(0.01), [], ["l0"])
+        graph.add_stage("fast", wait(0.01), ["l0"], ["a"])
+        graph.add_stage("slow", wait(0.2), ["l0"], ["b"])
+        graph.add_stage("merge", wait(0.01), ["a", "b"], ["c"])
+        graph.run()
+
+        stages, duration = graph.critical_path()
+
+        self.assertEqual(stages, ["read", "slow", "merge"])
+        self.assertGreaterEqual(duration, 0.2)
+
+
+if __name__ == "__main__":
+    unittest.main()
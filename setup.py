@@ -119,12 +119,14 @@ setup(
         "freezegun"
         # "psycopg2",
     ],
+    extras_require={"zarr": ["zarr"]},
     entry_points={
         "console_scripts": [
             "hypernets_sequence_processor = hypernets_processor.cli.sequence_processor_cli:cli",
             "hypernets_scheduler = hypernets_processor.cli.scheduler_cli:cli",
             "hypernets_processor_setup = hypernets_processor.cli.setup_processor_cli:cli",
-            "hypernets_processor_job_init = hypernets_processor.cli.init_job_cli:cli"
+            "hypernets_processor_job_init = hypernets_processor.cli.init_job_cli:cli",
+            "hypernets_encoding_benchmark = hypernets_processor.cli.encoding_benchmark_cli:cli"
         ],
     },
 )